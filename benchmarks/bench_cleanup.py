@@ -0,0 +1,130 @@
+"""Benchmark file_deletion's cleanup against the deletion st_app used before, on a synthetic
+BASE_DIR with tens of thousands of files.
+
+The old path scanned every process on the host with `open_files`, checking each handle against
+a list of all the files, then deleted the files with one thread task per file and the
+directories the same way. The new one only scans the app's child processes, renames the
+directory away and removes it in the background; keep-cache mode only walks for stale
+artifacts.
+
+Usage: python benchmarks/bench_cleanup.py [n_files] [n_children]
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from file_deletion import cleanup_base_dir, find_processes_using_files  # noqa: E402
+
+FILES_PER_DIR = 200
+
+
+def make_tree(base_dir, n_files):
+    """Ticker directories with filings and section indexes, plus a few stale artifacts."""
+    for i in range(n_files):
+        directory = os.path.join(base_dir, f'T{i // FILES_PER_DIR:04d}', 'filings')
+        if i % FILES_PER_DIR == 0:
+            os.makedirs(directory)
+        with open(os.path.join(directory, f'{i:08d}_2024-01-01.htm'), 'w') as f:
+            f.write('<html><body>filing</body></html>')
+        if i % 500 == 0:
+            # Orphaned section index and interrupted write
+            open(os.path.join(directory, f'{i:08d}_gone.htm.sections.json'), 'w').close()
+            open(os.path.join(directory, f'{i:08d}.tmp'), 'w').close()
+
+
+def legacy_scan(file_paths):
+    processes = set()
+    for proc in psutil.process_iter(['pid', 'name', 'open_files']):
+        try:
+            for file in proc.info['open_files'] or []:
+                if file.path in file_paths:
+                    processes.add(proc)
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return processes
+
+
+def legacy_delete(base_dir):
+    file_paths, dirs_to_delete = [], []
+    for root, dirs, files in os.walk(base_dir, topdown=False):
+        file_paths.extend(os.path.join(root, name) for name in files)
+        dirs_to_delete.extend(os.path.join(root, name) for name in dirs)
+
+    started = time.perf_counter()
+    legacy_scan(file_paths)
+    scan = time.perf_counter() - started
+
+    with ThreadPoolExecutor() as executor:
+        for future in as_completed([executor.submit(os.remove, path) for path in file_paths]):
+            pass
+    with ThreadPoolExecutor() as executor:
+        for future in as_completed([executor.submit(shutil.rmtree, path, True) for path in dirs_to_delete]):
+            pass
+    return scan
+
+
+def spawn_children(base_dir, n_children):
+    """Idle child processes with a few files open, outside base_dir, so the scans have handles to check."""
+    handles_dir = tempfile.mkdtemp()
+    code = ("import sys, time\n"
+            "files = [open(f'{sys.argv[1]}/h{i}', 'w') for i in range(20)]\n"
+            "time.sleep(600)\n")
+    children = []
+    for n in range(n_children):
+        directory = os.path.join(handles_dir, str(n))
+        os.makedirs(directory)
+        children.append(subprocess.Popen([sys.executable, '-c', code, directory]))
+    time.sleep(1)
+    return children, handles_dir
+
+
+def main():
+    n_files = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    n_children = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    work_dir = tempfile.mkdtemp()
+    base_dir = os.path.join(work_dir, 'sec_data')
+    children, handles_dir = spawn_children(base_dir, n_children)
+    print(f"{n_files} files, {len(psutil.pids())} processes on the host, {n_children} children of this one")
+
+    try:
+        make_tree(base_dir, n_files)
+        started = time.perf_counter()
+        scan = legacy_delete(base_dir)
+        print(f"  legacy: host-wide scan       {scan:8.3f}s")
+        print(f"  legacy: scan + delete        {time.perf_counter() - started:8.3f}s")
+
+        make_tree(base_dir, n_files)
+        started = time.perf_counter()
+        find_processes_using_files(under=base_dir)
+        print(f"  children-only scan           {time.perf_counter() - started:8.3f}s")
+
+        started = time.perf_counter()
+        summary = cleanup_base_dir(base_dir)
+        returned = time.perf_counter() - started
+        for future in summary['pending']:
+            future.result()
+        print(f"  cleanup: base_dir emptied    {returned:8.3f}s")
+        print(f"  cleanup: background removal  {time.perf_counter() - started:8.3f}s")
+
+        make_tree(base_dir, n_files)
+        started = time.perf_counter()
+        summary = cleanup_base_dir(base_dir, keep_cache=True)
+        print(f"  keep-cache: stale removed    {time.perf_counter() - started:8.3f}s  "
+              f"({len(summary['stale'])} stale artifacts)")
+    finally:
+        for child in children:
+            child.kill()
+        shutil.rmtree(work_dir, ignore_errors=True)
+        shutil.rmtree(handles_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
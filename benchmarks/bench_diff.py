@@ -0,0 +1,76 @@
+"""Benchmark sec_diff against the ndiff comparison get_latest_10q_info used before, on
+consecutive PHAT filings.
+
+The old path ran ndiff on `content.splitlines()`, but filing text is one whitespace-joined
+line, so it only ever compared two giant lines. For a meaningful baseline ndiff is also run
+on the same sentence split sec_diff uses (capped by a timeout, it is quadratic).
+
+Usage: python benchmarks/bench_diff.py [ndiff_timeout_seconds]
+"""
+import multiprocessing
+import os
+import sys
+import time
+from difflib import ndiff
+from glob import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from sec_diff import diff_texts, split_passages  # noqa: E402
+from sec_loader import extract_text_from_html  # noqa: E402
+
+
+def ndiff_changes(old_lines, new_lines):
+    diff = list(ndiff(old_lines, new_lines))
+    return (sum(line.startswith('+ ') for line in diff), sum(line.startswith('- ') for line in diff))
+
+
+def _timed_ndiff(old_lines, new_lines, queue):
+    started = time.perf_counter()
+    added, removed = ndiff_changes(old_lines, new_lines)
+    queue.put((time.perf_counter() - started, added, removed))
+
+
+def run_with_timeout(old_lines, new_lines, timeout):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_timed_ndiff, args=(old_lines, new_lines, queue))
+    process.start()
+    process.join(timeout)
+    if process.is_alive():
+        process.terminate()
+        process.join()
+        return None
+    return queue.get()
+
+
+def main():
+    timeout = float(sys.argv[1]) if len(sys.argv) > 1 else 120
+    paths = sorted(glob(os.path.join(ROOT, 'sec_data', 'PHAT', 'filings', '*.htm')))
+    texts = [extract_text_from_html(path) for path in paths]
+
+    for (old_path, old), (new_path, new) in zip(zip(paths, texts), zip(paths[1:], texts[1:])):
+        name = f"{os.path.basename(old_path)[:18]} -> {os.path.basename(new_path)[:18]}"
+        print(name)
+
+        started = time.perf_counter()
+        added, removed = ndiff_changes(old.splitlines(), new.splitlines())
+        print(f"  ndiff on lines (old path)     {time.perf_counter() - started:8.3f}s  "
+              f"+{added} -{removed} lines")
+
+        old_sentences = [p.text for p in split_passages(old)]
+        new_sentences = [p.text for p in split_passages(new)]
+        result = run_with_timeout(old_sentences, new_sentences, timeout)
+        if result is None:
+            print(f"  ndiff on sentences            >{timeout:7.0f}s  (timed out)")
+        else:
+            elapsed, added, removed = result
+            print(f"  ndiff on sentences            {elapsed:8.3f}s  +{added} -{removed} sentences")
+
+        started = time.perf_counter()
+        diff = diff_texts(old, new)
+        print(f"  sec_diff ({diff.method:<15})    {time.perf_counter() - started:8.3f}s  "
+              f"+{len(diff.added)} -{len(diff.removed)} ~{len(diff.modified)} passages")
+
+
+if __name__ == '__main__':
+    main()
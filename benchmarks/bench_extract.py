@@ -0,0 +1,63 @@
+"""Benchmark SECFilingLoader extraction, serial vs process pool, on the PHAT filings replicated
+across synthetic tickers.
+
+Usage: python benchmarks/bench_extract.py [n_documents] [workers ...]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+from glob import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from sec_loader import SECFilingLoader  # noqa: E402
+
+SOURCE_FILINGS = os.path.join(ROOT, 'sec_data', 'PHAT', 'filings')
+DOCS_PER_TICKER = 100
+
+
+def replicate_filings(target_dir, n_documents):
+    """Link the PHAT filings into `n_documents` files spread over tickers of DOCS_PER_TICKER each."""
+    sources = sorted(glob(os.path.join(SOURCE_FILINGS, '*.htm')))
+    tickers = []
+    for i in range(n_documents):
+        ticker = f'T{i // DOCS_PER_TICKER:03d}'
+        filings_dir = os.path.join(target_dir, ticker, 'filings')
+        if ticker not in tickers:
+            os.makedirs(filings_dir)
+            tickers.append(ticker)
+        source = sources[i % len(sources)]
+        target = os.path.join(filings_dir, f'{i:018d}_{os.path.basename(source).split("_")[1]}')
+        try:
+            os.link(source, target)
+        except OSError:
+            os.symlink(source, target)
+    return tickers
+
+
+def main():
+    n_documents = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    worker_counts = [int(w) for w in sys.argv[2:]] or [1, os.cpu_count() or 1]
+
+    work_dir = tempfile.mkdtemp(prefix='bench_extract_')
+    try:
+        tickers = replicate_filings(work_dir, n_documents)
+        print(f"{n_documents} filings across {len(tickers)} tickers, {os.cpu_count()} CPUs")
+        baseline = None
+        for workers in worker_counts:
+            loader = SECFilingLoader(base_dir=work_dir, workers=workers)
+            loader.logger.setLevel('CRITICAL')  # synthetic tickers have no company concepts
+            started = time.perf_counter()
+            df = loader.load_all_filings(tickers)
+            elapsed = time.perf_counter() - started
+            baseline = baseline or elapsed
+            print(f"workers={workers:3d}: {elapsed:7.2f}s  {len(df) / elapsed:7.1f} filings/s  "
+                  f"speedup {baseline / elapsed:.1f}x  ({df['content_length'].sum() / 1024 ** 2:.0f} MB of text)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Measure the peak RSS of filing text extraction against filing size: the selectolax DOM
+(compatibility mode) against text_stream returning a string and writing to a file.
+
+Synthetic filings of growing size are made by repeating the body of a PHAT filing, like a
+10-K with long exhibits. Each measurement runs in a fresh interpreter, and the peak RSS it
+reports is taken relative to the RSS it had before extracting. The DOM's time grows faster
+than the filing (selectolax's text(separator=...) is superlinear), so large sizes take minutes.
+
+Usage: python benchmarks/bench_extract_memory.py [size_mb ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from glob import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ['dom', 'stream', 'stream-to-file']
+
+# Runs in the child: extract `path` with `mode` and print the peak RSS increase in bytes
+CHILD = """
+import json, os, resource, sys, time
+sys.path.insert(0, sys.argv[1])
+from sec_loader import extract_text_from_html
+from text_stream import write_text
+path, mode = sys.argv[2], sys.argv[3]
+scale = 1 if sys.platform == 'darwin' else 1024  # ru_maxrss is in KiB on Linux
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+started = time.perf_counter()
+if mode == 'stream-to-file':
+    with open(os.devnull, 'w', encoding='utf-8') as sink:
+        length = write_text(path, sink)
+else:
+    length = len(extract_text_from_html(path, streaming=(mode == 'stream')))
+elapsed = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+print(json.dumps({'peak': peak - before, 'seconds': elapsed, 'length': length}))
+"""
+
+
+def make_filing(path, size_mb):
+    """A filing of about `size_mb` MB: a PHAT filing's head, its body repeated, and its end."""
+    source = sorted(glob(os.path.join(ROOT, 'sec_data', 'PHAT', 'filings', '*.htm')))[0]
+    with open(source, 'r', encoding='utf-8') as f:
+        html = f.read()
+    body_start = html.index('>', html.lower().index('<body')) + 1
+    body_end = html.lower().rindex('</body>')
+    head, body, tail = html[:body_start], html[body_start:body_end], html[body_end:]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(head)
+        written = len(head)
+        while written < size_mb * 1024 * 1024:
+            f.write(body)
+            written += len(body)
+        f.write(tail)
+
+
+def measure(path, mode):
+    output = subprocess.run([sys.executable, '-c', CHILD, ROOT, path, mode],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [2, 8, 32]
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"{'size':>8}  " + '  '.join(f'{mode:>24}' for mode in MODES))
+        for size_mb in sizes:
+            path = os.path.join(work_dir, f'filing_{size_mb}mb.htm')
+            make_filing(path, size_mb)
+            results = {mode: measure(path, mode) for mode in MODES}
+            lengths = {result['length'] for result in results.values()}
+            cells = [f"{results[mode]['peak'] / 1e6:7.1f} MB peak {results[mode]['seconds']:6.2f}s"
+                     for mode in MODES]
+            print(f"{os.path.getsize(path) / 1e6:6.0f}MB  " + '  '.join(f'{cell:>24}' for cell in cells)
+                  + ('' if len(lengths) == 1 else '  (text differs!)'))
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark nlp_functions.flatten_json_data against the previous list-of-dicts implementation.
+
+Usage: python benchmarks/bench_flatten.py [n_concepts] [records_per_unit]
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nlp_functions import flatten_json_data  # noqa: E402
+
+FORMS = ['10-Q', '10-K', '10-K/A', '8-K', 'S-1']
+PERIODS = ['Q1', 'Q2', 'Q3', 'FY']
+UNITS = ['USD', 'shares', 'USD/shares', 'pure']
+
+
+def make_companyfacts(n_concepts: int = 5000, records_per_unit: int = 60, seed: int = 0) -> dict:
+    """Synthetic companyfacts payload shaped like data.sec.gov/api/xbrl/companyfacts."""
+    rng = random.Random(seed)
+    facts = {'dei': {}, 'us-gaap': {}}
+    for i in range(n_concepts):
+        taxonomy = 'dei' if i % 50 == 0 else 'us-gaap'
+        units = {}
+        for unit in rng.sample(UNITS, rng.randint(1, 2)):
+            records = []
+            for j in range(records_per_unit):
+                year = 2010 + j // 4
+                month = 3 * (j % 4) + 1
+                record = {
+                    'end': f'{year}-{month + 2:02d}-28',
+                    'val': rng.randint(-10 ** 9, 10 ** 9) if unit != 'pure' else rng.random(),
+                    'accn': f'0000950170-{year % 100:02d}-{rng.randint(0, 999999):06d}',
+                    'fy': year,
+                    'fp': rng.choice(PERIODS),
+                    'form': rng.choice(FORMS),
+                    'filed': f'{year}-{month + 3:02d}-15',
+                }
+                if unit != 'shares':
+                    record['start'] = f'{year}-{month:02d}-01'
+                if rng.random() < 0.3:
+                    record['frame'] = f'CY{year}Q{j % 4 + 1}'
+                records.append(record)
+            units[unit] = records
+        facts[taxonomy][f'Concept{i}'] = {'label': f'Concept {i}', 'description': '', 'units': units}
+    return {'cik': 1, 'entityName': 'SYNTHETIC', 'facts': facts}
+
+
+def flatten_json_data_legacy(company_data):
+    """The previous implementation: one dict per fact, then pd.DataFrame and per-column to_datetime."""
+    all_data = []
+    for taxonomy in company_data.get('facts', {}):
+        for concept in company_data['facts'][taxonomy]:
+            units_data = company_data['facts'][taxonomy][concept].get('units', {})
+            for unit_type, values in units_data.items():
+                for record in values:
+                    all_data.append({
+                        'Taxonomy': taxonomy,
+                        'Concept': concept,
+                        'Unit': unit_type,
+                        'Value': record.get('val'),
+                        'Start': record.get('start'),
+                        'End': record.get('end'),
+                        'Accession': record.get('accn'),
+                        'Fiscal Year': record.get('fy'),
+                        'Fiscal Period': record.get('fp'),
+                        'Form': record.get('form'),
+                        'Filed Date': record.get('filed'),
+                        'Frame': record.get('frame'),
+                    })
+    df = pd.DataFrame(all_data)
+    df['Start'] = pd.to_datetime(df['Start'], errors='coerce')
+    df['End'] = pd.to_datetime(df['End'], errors='coerce')
+    df['Filed Date'] = pd.to_datetime(df['Filed Date'], errors='coerce')
+    return df
+
+
+def measure(func, payload):
+    tracemalloc.start()
+    started = time.perf_counter()
+    df = func(payload)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+
+def main():
+    n_concepts = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    records_per_unit = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    payload = make_companyfacts(n_concepts, records_per_unit)
+
+    legacy_df, legacy_time, legacy_peak = measure(flatten_json_data_legacy, payload)
+    new_df, new_time, new_peak = measure(flatten_json_data, payload)
+
+    # Same facts in the same order, only the dtypes differ
+    pd.testing.assert_frame_equal(legacy_df, new_df.astype({c: object for c in
+                                  ['Taxonomy', 'Concept', 'Unit', 'Fiscal Period', 'Form']}), check_dtype=False)
+
+    print(f"facts: {len(new_df):,}")
+    print(f"legacy    : {legacy_time:7.2f}s  peak {legacy_peak / 1024 ** 2:8.1f} MB  "
+          f"frame {legacy_df.memory_usage(deep=True).sum() / 1024 ** 2:8.1f} MB")
+    print(f"columnar  : {new_time:7.2f}s  peak {new_peak / 1024 ** 2:8.1f} MB  "
+          f"frame {new_df.memory_usage(deep=True).sum() / 1024 ** 2:8.1f} MB")
+    print(f"speedup   : {legacy_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
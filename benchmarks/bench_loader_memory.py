@@ -0,0 +1,109 @@
+"""Measure the memory held by SECFilingLoader results on a multi-ticker dataset: the old
+filings x concepts merge against projected, lazy and metadata-only loads, and a fact-level
+join that drags the filing text along against join_concepts.
+
+The PHAT filings and companyfacts are linked into synthetic tickers under their original
+names, so accession numbers still match the facts. The text cache is warmed first, so every
+variant reads the same text and only the retained frames differ.
+
+Usage: python benchmarks/bench_loader_memory.py [n_tickers]
+"""
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from glob import glob
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from sec_loader import SECFilingLoader, join_concepts  # noqa: E402
+
+SOURCE_DIR = os.path.join(ROOT, 'sec_data', 'PHAT')
+
+
+def replicate_ticker(target_dir, n_tickers):
+    """Link PHAT's filings and companyfacts into `n_tickers` synthetic ticker folders."""
+    tickers = [f'T{i:03d}' for i in range(n_tickers)]
+    for ticker in tickers:
+        for sub in ('filings', 'company_concepts'):
+            os.makedirs(os.path.join(target_dir, ticker, sub))
+            for source in glob(os.path.join(SOURCE_DIR, sub, '*')):
+                target = os.path.join(target_dir, ticker, sub, os.path.basename(source))
+                try:
+                    os.link(source, target)
+                except OSError:
+                    os.symlink(source, target)
+    return tickers
+
+
+def legacy_load(loader, tickers):
+    """What load_all_filings returned before: every filing with its text, merged with one row
+    per companyfacts file holding the whole JSON payload."""
+    filings = loader.load_all_filings(tickers)
+    all_data = []
+    for ticker, filings_df in filings.groupby('ticker', sort=False):
+        concepts_data = []
+        for file_path in glob(os.path.join(loader.base_dir, ticker, loader.concepts_dir, '*.json')):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                concepts_data.append(json.load(f))
+        concepts_df = pd.DataFrame(concepts_data)
+        concepts_df['ticker'] = ticker
+        all_data.append(pd.merge(filings_df, concepts_df, on='ticker', how='left'))
+    return pd.concat(all_data, ignore_index=True)
+
+
+def naive_fact_join(loader, tickers):
+    """Facts joined to complete filing rows, so each fact row references the filing text."""
+    filings = loader.load_all_filings(tickers)
+    concepts = loader.load_all_concepts(tickers)
+    return pd.merge(filings, concepts, on=['ticker', 'accession_number'])
+
+
+def measure(name, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    frame_mb = result.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"{name:<34} {len(result):8d} rows  {elapsed:6.2f}s  peak {peak / 1024 ** 2:8.1f} MB  "
+          f"retained {retained / 1024 ** 2:8.1f} MB  frame {frame_mb:8.1f} MB")
+    del result
+
+
+def main():
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    work_dir = tempfile.mkdtemp(prefix='bench_loader_memory_')
+    try:
+        tickers = replicate_ticker(work_dir, n_tickers)
+        loader = SECFilingLoader(base_dir=work_dir, workers=1)
+        loader.logger.setLevel('CRITICAL')
+        n_documents = len(loader.load_all_filings(tickers, columns=['ticker']))
+        loader.load_all_filings(tickers)  # warm the text cache
+        print(f"{n_documents} filings across {len(tickers)} tickers")
+
+        measure("legacy filings x concepts merge", lambda: legacy_load(loader, tickers))
+        measure("all columns", lambda: loader.load_all_filings(tickers))
+        measure("ticker, filing_date, content", lambda: loader.load_all_filings(
+            tickers, columns=['ticker', 'filing_date', 'content']))
+        measure("lazy content handles", lambda: loader.load_all_filings(
+            tickers, columns=['ticker', 'filing_date', 'content'], lazy=True))
+        measure("metadata only", lambda: loader.load_all_filings(
+            tickers, columns=['ticker', 'accession_number', 'filing_date']))
+        measure("facts joined to full filing rows", lambda: naive_fact_join(loader, tickers))
+        measure("join_concepts", lambda: join_concepts(
+            loader.load_all_filings(tickers, columns=['ticker', 'accession_number', 'filing_date']),
+            loader.load_all_concepts(tickers)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark sec_search's FTS5 index against scanning a pandas content column with str.contains,
+on synthetic filings made from the PHAT filings (every tenth one mentions a clinical hold).
+
+FTS5 boolean operators match within one passage, str.contains within the whole filing, so the
+AND query finds fewer filings in the index.
+
+Usage: python benchmarks/bench_search.py [n_filings]
+"""
+import os
+import sys
+import tempfile
+import time
+from glob import glob
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from sec_loader import extract_text_from_html  # noqa: E402
+from sec_search import SearchIndex  # noqa: E402
+from sec_sections import parse_sections  # noqa: E402
+
+QUERIES = [
+    # (FTS5 query, equivalent str.contains regex)
+    ('"clinical hold"', r'clinical hold'),
+    ('"going concern"', r'going concern'),
+    ('"clinical hold" OR "going concern"', r'clinical hold|going concern'),
+    ('"clinical hold" AND vonoprazan', None),
+    ('NEAR(FDA approval, 3)', r'\bFDA\W+(?:\w+\W+){0,3}?approval\b|\bapproval\W+(?:\w+\W+){0,3}?FDA\b'),
+]
+HOLD = ' The FDA placed a clinical hold on our Phase 2 study of T{n:04d}-101 in March. '
+
+
+def make_corpus(n_filings):
+    paths = sorted(glob(os.path.join(ROOT, 'sec_data', 'PHAT', 'filings', '*.htm')))
+    texts = [extract_text_from_html(path) for path in paths]
+    rows = []
+    for n in range(n_filings):
+        text = texts[n % len(texts)]
+        if n % 10 == 0:
+            # Mention it in the middle of the MD&A-ish part of the filing
+            middle = len(text) // 2
+            text = text[:middle] + HOLD.format(n=n) + text[middle:]
+        rows.append({'ticker': f'T{n // 4:04d}', 'accession_number': f'{n:018d}',
+                     'filing_date': f'2024-{n % 12 + 1:02d}-01', 'content': text})
+    return pd.DataFrame(rows)
+
+
+def timed(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    n_filings = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    df = make_corpus(n_filings)
+    print(f"{n_filings} filings, {df['content'].str.len().sum() / 1e6:.0f}M characters")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        index = SearchIndex(os.path.join(work_dir, 'search_index.sqlite'))
+        started = time.perf_counter()
+        for row in df.itertuples(index=False):
+            index.add_document(os.path.join(work_dir, row.ticker, 'filings', f'{row.accession_number}.htm'),
+                               row.ticker, row.accession_number, row.filing_date, row.content,
+                               parse_sections(row.content), commit=False)
+        index.commit()
+        index.optimize()
+        stats = index.stats()
+        print(f"  index build                   {time.perf_counter() - started:8.2f}s  "
+              f"({stats['passages']} passages, {os.path.getsize(index.path) / 1e6:.0f} MB)")
+
+        for query, pattern in QUERIES:
+            print(query)
+            elapsed, hits = timed(lambda: index.search(query))
+            print(f"  fts5 top 100 with snippets    {elapsed * 1000:8.1f}ms  {len(hits)} passages")
+            elapsed, hits = timed(lambda: index.search(query, limit=None, snippets=False))
+            print(f"  fts5 every matching filing    {elapsed * 1000:8.1f}ms  "
+                  f"{hits['accession_number'].nunique()} filings")
+            if pattern is None:
+                def scan():
+                    content = df['content']
+                    return df[content.str.contains('clinical hold', case=False, regex=False)
+                              & content.str.contains('vonoprazan', case=False, regex=False)]
+            else:
+                def scan():
+                    return df[df['content'].str.contains(pattern, case=False, regex=True)]
+            elapsed, matched = timed(scan, repeat=1)
+            print(f"  pandas str.contains           {elapsed * 1000:8.1f}ms  {len(matched)} filings")
+        index.close()
+
+
+if __name__ == '__main__':
+    main()
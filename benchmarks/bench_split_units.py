@@ -0,0 +1,70 @@
+"""Benchmark nlp_functions.split_by_units + filter_by_filed_date against the previous per-unit mask copies.
+
+Usage: python benchmarks/bench_split_units.py [n_concepts] [records_per_unit]
+"""
+import os
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_flatten import make_companyfacts  # noqa: E402
+from nlp_functions import filter_by_filed_date, flatten_json_data, split_by_units  # noqa: E402
+
+START, END = '2015-01-01', '2022-12-31'
+
+
+def legacy_pipeline(df):
+    """Split the unfiltered frame with one mask copy per unit, then filter every copy again."""
+    unit_dfs = {}
+    for unit in df['Unit'].unique():
+        unit_dfs[f"df_{unit.replace('/', '_per_')}"] = df[df['Unit'] == unit].copy()
+    df_filtered = df[(df['Filed Date'] >= START) & (df['Filed Date'] <= END)]
+    filtered_units = {name: unit_df[(unit_df['Filed Date'] >= START) & (unit_df['Filed Date'] <= END)]
+                      for name, unit_df in unit_dfs.items()}
+    return df_filtered, filtered_units
+
+
+def new_pipeline(df):
+    df_filtered = filter_by_filed_date(df, START, END)
+    return df_filtered, split_by_units(df_filtered)
+
+
+def measure(func, df):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func(df)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    n_concepts = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    records_per_unit = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    df = flatten_json_data(make_companyfacts(n_concepts, records_per_unit))
+    df = df.sort_values(['Taxonomy', 'Concept', 'End'])
+    print(f"facts: {len(df):,}  frame {df.memory_usage(deep=True).sum() / 1024 ** 2:.1f} MB")
+
+    (_, legacy_units), legacy_time, legacy_peak = measure(legacy_pipeline, df)
+    (_, new_units), new_time, new_peak = measure(new_pipeline, df)
+
+    # Same rows per unit, in the same order
+    assert legacy_units.keys() == new_units.keys()
+    for name, legacy_df in legacy_units.items():
+        pd.testing.assert_frame_equal(legacy_df.reset_index(drop=True), new_units[name].reset_index(drop=True))
+
+    # Every partition's values should point into the same unit-ordered buffer
+    bases = {id(unit_df['Value'].to_numpy().base) for unit_df in new_units.values()}
+    print(f"partitions: {len(new_units)}, all views of one frame: {len(bases) == 1 and id(None) not in bases}")
+    print(f"legacy : {legacy_time:6.2f}s  peak {legacy_peak / 1024 ** 2:8.1f} MB")
+    print(f"new    : {new_time:6.2f}s  peak {new_peak / 1024 ** 2:8.1f} MB")
+    print(f"speedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
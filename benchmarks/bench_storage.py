@@ -0,0 +1,75 @@
+"""Benchmark the Parquet fact store against the CSV files on disk size and load time.
+
+Usage: python benchmarks/bench_storage.py [n_tickers] [n_concepts] [records_per_unit]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import pandas as pd  # noqa: E402
+from bench_flatten import make_companyfacts  # noqa: E402
+from nlp_functions import flatten_json_data, split_by_units  # noqa: E402
+from sec_storage import CSVFactStore, ParquetFactStore  # noqa: E402
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    n_tickers = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_concepts = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    records_per_unit = int(sys.argv[3]) if len(sys.argv) > 3 else 40
+
+    work_dir = tempfile.mkdtemp(prefix='bench_storage_')
+    try:
+        csv_store = CSVFactStore(os.path.join(work_dir, 'csv'))
+        parquet_store = ParquetFactStore(os.path.join(work_dir, 'parquet'))
+        tickers = [f'T{i:03d}' for i in range(n_tickers)]
+
+        frames = []
+        write_times = {'csv': 0.0, 'parquet': 0.0}
+        for i, ticker in enumerate(tickers):
+            df = flatten_json_data(make_companyfacts(n_concepts, records_per_unit, seed=i))
+            df = df.sort_values(['Taxonomy', 'Concept', 'End'])
+            df['Ticker'] = ticker
+            unit_dfs = split_by_units(df)
+            for store in (csv_store, parquet_store):
+                started = time.perf_counter()
+                store.write_ticker(ticker, df, unit_dfs)
+                write_times[store.name] += time.perf_counter() - started
+            frames.append(df)
+        all_df = pd.concat(frames, ignore_index=True)
+        for store in (csv_store, parquet_store):
+            started = time.perf_counter()
+            store.write_combined(all_df)
+            write_times[store.name] += time.perf_counter() - started
+        print(f"{n_tickers} tickers, {len(all_df):,} facts")
+
+        query = dict(tickers=tickers[:2], concepts=['Concept1', 'Concept2', 'Concept3'], start='2015-01-01')
+        for store in (csv_store, parquet_store):
+            full, full_time = timed(lambda: store.read_facts())
+            filtered, filtered_time = timed(lambda: store.read_facts(**query))
+            print(f"{store.name:8s} disk {dir_size(store.base_dir) / 1024 ** 2:8.1f} MB  "
+                  f"write {write_times[store.name]:6.2f}s  full load {full_time:6.2f}s ({len(full):,} rows)  "
+                  f"filtered load {filtered_time:6.3f}s ({len(filtered):,} rows)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
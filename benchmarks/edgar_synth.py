@@ -0,0 +1,256 @@
+"""Deterministic synthetic EDGAR corpus: companyfacts JSON plus inline-XBRL 10-Q filings laid
+out like BASE_DIR (<ticker>/filings/<accession>_<date>.htm, <ticker>/company_concepts/CIK*.json).
+
+The scale is tickers x filings x facts: every filing tags `facts` concepts for the quarter and
+the prior period, and the companyfacts payload holds exactly those facts, so the HTML and the
+JSON agree (sec_xbrl.extract_inline_facts recovers the payload's 10-Q facts). Filing text is
+boilerplate-heavy like real 10-Qs and each quarter changes a few sentences of the previous one.
+
+Usage: python benchmarks/edgar_synth.py OUTPUT_DIR [tickers] [filings] [facts] [text_kb]
+"""
+import json
+import os
+import random
+import sys
+from dataclasses import asdict, dataclass
+from typing import Dict, List
+
+# Real us-gaap names first, then numbered ones (a real 10-Q tags a few hundred concepts)
+CONCEPTS = [
+    ('CashAndCashEquivalentsAtCarryingValue', 'USD', 'instant'),
+    ('Assets', 'USD', 'instant'),
+    ('Liabilities', 'USD', 'instant'),
+    ('StockholdersEquity', 'USD', 'instant'),
+    ('AccountsPayableCurrent', 'USD', 'instant'),
+    ('ResearchAndDevelopmentExpense', 'USD', 'duration'),
+    ('GeneralAndAdministrativeExpense', 'USD', 'duration'),
+    ('OperatingIncomeLoss', 'USD', 'duration'),
+    ('NetIncomeLoss', 'USD', 'duration'),
+    ('Revenues', 'USD', 'duration'),
+    ('EarningsPerShareBasicAndDiluted', 'USD/shares', 'duration'),
+    ('WeightedAverageNumberOfSharesOutstandingBasicAndDiluted', 'shares', 'duration'),
+    ('CommonStockSharesOutstanding', 'shares', 'instant'),
+    ('EffectiveIncomeTaxRateContinuingOperations', 'pure', 'duration'),
+]
+UNIT_IDS = {'USD': 'U_USD', 'shares': 'U_shares', 'USD/shares': 'U_USD_per_shares', 'pure': 'U_pure'}
+# Quarter -> (period start month, end month-day, filing month-day)
+QUARTERS = {'Q1': (1, '03-31', '05-10'), 'Q2': (4, '06-30', '08-09'), 'Q3': (7, '09-30', '11-08')}
+
+WORDS = ('clinical trial patient study approval regulatory FDA product candidate revenue expense '
+         'research development manufacturing commercial market launch supply agreement license '
+         'collaboration milestone royalty capital liquidity financing cash operations quarter period '
+         'risk uncertainty competition intellectual property patent litigation data safety efficacy '
+         'dose cohort enrollment endpoint submission label payer reimbursement pricing').split()
+ITEMS = [('I', '1', 'Financial Statements'),
+         ('I', '2', "Management's Discussion and Analysis of Financial Condition and Results of Operations"),
+         ('I', '3', 'Quantitative and Qualitative Disclosures About Market Risk'),
+         ('I', '4', 'Controls and Procedures'),
+         ('II', '1', 'Legal Proceedings'),
+         ('II', '1A', 'Risk Factors'),
+         ('II', '6', 'Exhibits')]
+
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    tickers: int = 10
+    filings: int = 6  # 10-Qs per ticker, three per fiscal year
+    facts: int = 150  # concepts tagged per filing, each for the quarter and the prior period
+    text_kb: int = 100  # narrative text per filing
+    seed: int = 0
+
+
+def ticker_names(spec: CorpusSpec) -> List[str]:
+    return [f'SYN{i:03d}' for i in range(spec.tickers)]
+
+
+def _concepts(n: int) -> List[tuple]:
+    concepts = list(CONCEPTS[:n])
+    units = ['USD', 'USD', 'USD', 'shares', 'USD/shares', 'pure']
+    for i in range(len(concepts), n):
+        concepts.append((f'SyntheticConcept{i:04d}', units[i % len(units)], 'instant' if i % 3 == 0 else 'duration'))
+    return concepts
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(8, 24))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _periods(index: int):
+    """Fiscal year, period, (start, end) of the quarter, the same quarter a year before, and the filing date."""
+    fy = 2021 + index // 3
+    fp = ('Q1', 'Q2', 'Q3')[index % 3]
+    start_month, end, filed = QUARTERS[fp]
+    current = (f'{fy}-{start_month:02d}-01', f'{fy}-{end}')
+    prior = (f'{fy - 1}-{start_month:02d}-01', f'{fy - 1}-{end}')
+    return fy, fp, current, prior, f'{fy}-{filed}'
+
+
+def _value(rng: random.Random, unit: str):
+    if unit == 'USD':
+        return rng.randint(-500_000, 2_000_000) * 1000
+    if unit == 'shares':
+        return rng.randint(1_000_000, 90_000_000)
+    if unit == 'USD/shares':
+        return round(rng.randint(-500, 500) / 100, 2)
+    return round(rng.randint(0, 100) / 100, 2)
+
+
+def _format_value(value, unit: str) -> tuple:
+    """(displayed text, scale, decimals, sign) the way filers tag it: USD in thousands, negatives
+    as a sign attribute."""
+    sign = '-' if value < 0 else None
+    value = abs(value)
+    if unit == 'USD':
+        return f'{value // 1000:,}', '3', '-3', sign
+    if unit == 'shares':
+        return f'{value:,}', '0', '0', sign
+    return f'{value:.2f}', '0', '2', sign
+
+
+def _unit_xml(unit: str) -> str:
+    unit_id = UNIT_IDS[unit]
+    measures = {'USD': 'iso4217:USD', 'shares': 'xbrli:shares', 'pure': 'xbrli:pure'}
+    if '/' in unit:
+        return (f'<xbrli:unit id="{unit_id}"><xbrli:divide><xbrli:unitNumerator><xbrli:measure>iso4217:USD'
+                f'</xbrli:measure></xbrli:unitNumerator><xbrli:unitDenominator><xbrli:measure>xbrli:shares'
+                f'</xbrli:measure></xbrli:unitDenominator></xbrli:divide></xbrli:unit>')
+    return f'<xbrli:unit id="{unit_id}"><xbrli:measure>{measures[unit]}</xbrli:measure></xbrli:unit>'
+
+
+def _context_xml(context_id: str, cik: str, start: str, end: str, instant: bool, member: str = '') -> str:
+    period = (f'<xbrli:instant>{end}</xbrli:instant>' if instant
+              else f'<xbrli:startDate>{start}</xbrli:startDate><xbrli:endDate>{end}</xbrli:endDate>')
+    segment = (f'<xbrli:segment><xbrldi:explicitMember dimension="us-gaap:StatementBusinessSegmentsAxis">'
+               f'{member}</xbrldi:explicitMember></xbrli:segment>' if member else '')
+    return (f'<xbrli:context id="{context_id}"><xbrli:entity><xbrli:identifier scheme="http://www.sec.gov/CIK">'
+            f'{cik}</xbrli:identifier>{segment}</xbrli:entity><xbrli:period>{period}</xbrli:period></xbrli:context>')
+
+
+def make_filing_html(name: str, cik: str, fy: int, fp: str, current: tuple, prior: tuple,
+                     facts: List[tuple], paragraphs: List[str]) -> str:
+    """An inline-XBRL 10-Q: hidden dei facts, contexts and units in ix:header, a cover page,
+    the financial statements as tables of ix:nonFraction and the narrative items."""
+    contexts = [_context_xml('c_cur', cik, *current, instant=False), _context_xml('c_pri', cik, *prior, instant=False),
+                _context_xml('i_cur', cik, *current, instant=True), _context_xml('i_pri', cik, *prior, instant=True),
+                _context_xml('c_seg', cik, *current, instant=False, member='syn:ProductMember')]
+    hidden = (f'<ix:nonNumeric name="dei:DocumentType" contextRef="c_cur">10-Q</ix:nonNumeric>'
+              f'<ix:nonNumeric name="dei:AmendmentFlag" contextRef="c_cur">false</ix:nonNumeric>'
+              f'<ix:nonNumeric name="dei:DocumentFiscalYearFocus" contextRef="c_cur">{fy}</ix:nonNumeric>'
+              f'<ix:nonNumeric name="dei:DocumentFiscalPeriodFocus" contextRef="c_cur">{fp}</ix:nonNumeric>'
+              f'<ix:nonNumeric name="dei:EntityCentralIndexKey" contextRef="c_cur">{cik}</ix:nonNumeric>')
+    parts = [
+        '<?xml version="1.0" encoding="utf-8"?>\n<html xmlns="http://www.w3.org/1999/xhtml" '
+        'xmlns:ix="http://www.xbrl.org/2013/inlineXBRL" xmlns:xbrli="http://www.xbrl.org/2003/instance">'
+        f'<head><title>{name} 10-Q</title><style>td {{ padding: 0 4pt; }}</style></head><body>',
+        f'<div style="display:none"><ix:header><ix:hidden>{hidden}</ix:hidden><ix:resources>{"".join(contexts)}'
+        f'{"".join(_unit_xml(unit) for unit in UNIT_IDS)}</ix:resources></ix:header></div>',
+        f'<p style="text-align:center">UNITED STATES SECURITIES AND EXCHANGE COMMISSION</p>'
+        f'<p style="text-align:center"><b>FORM 10-Q</b></p><p>QUARTERLY REPORT PURSUANT TO SECTION 13 OR 15(d) '
+        f'OF THE SECURITIES EXCHANGE ACT OF 1934 for the quarterly period ended {current[1]}</p>'
+        f'<p>{name}, Inc. (Exact name of registrant as specified in its charter)</p>',
+    ]
+    per_item = max(1, len(paragraphs) // len(ITEMS))
+    for n, (part, item, title) in enumerate(ITEMS):
+        if n == 0 or ITEMS[n - 1][0] != part:
+            parts.append(f'<p style="font-weight:bold">PART {part}. {"FINANCIAL INFORMATION" if part == "I" else "OTHER INFORMATION"}</p>')
+        parts.append(f'<p style="font-weight:bold">Item {item}. {title}</p>')
+        if n == 0:
+            rows = []
+            for concept, unit, period_type, current_value, prior_value, segment_value in facts:
+                cells = []
+                for context, value in (('c_cur', current_value), ('c_pri', prior_value), ('c_seg', segment_value)):
+                    if value is None:
+                        cells.append('<td></td>')
+                        continue
+                    if context != 'c_seg' and period_type == 'instant':
+                        context = 'i' + context[1:]
+                    text, scale, decimals, sign = _format_value(value, unit)
+                    sign_attr = f' sign="{sign}"' if sign else ''
+                    cells.append(f'<td><ix:nonFraction name="{concept}" contextRef="{context}" '
+                                 f'unitRef="{UNIT_IDS[unit]}" decimals="{decimals}" scale="{scale}"'
+                                 f'{sign_attr} format="ixt:num-dot-decimal">{text}</ix:nonFraction></td>')
+                rows.append(f'<tr><td>{concept.split(":")[1]}</td>{"".join(cells)}</tr>')
+            parts.append(f'<table>{"".join(rows)}</table>')
+        parts.extend(f'<p>{paragraph}</p>' for paragraph in paragraphs[n * per_item:(n + 1) * per_item])
+    parts.append('</body></html>\n')
+    return ''.join(parts)
+
+
+def write_ticker(base_dir: str, ticker: str, ticker_index: int, spec: CorpusSpec) -> List[str]:
+    """Write one ticker's filings and companyfacts file; returns the filing paths."""
+    rng = random.Random(f'{spec.seed}-{ticker}')
+    cik_number = 9_000_000 + ticker_index
+    cik = f'{cik_number:010d}'
+    concepts = _concepts(spec.facts)
+
+    # The ticker's narrative: about text_kb of sentences, a few of which change every quarter
+    sentences = []
+    while sum(len(s) + 1 for s in sentences) < spec.text_kb * 1024:
+        sentences.append(_sentence(rng))
+
+    filings_dir = os.path.join(base_dir, ticker, 'filings')
+    concepts_dir = os.path.join(base_dir, ticker, 'company_concepts')
+    os.makedirs(filings_dir, exist_ok=True)
+    os.makedirs(concepts_dir, exist_ok=True)
+
+    records: Dict[tuple, List[dict]] = {}
+    paths = []
+    for index in range(spec.filings):
+        fy, fp, current, prior, filed = _periods(index)
+        accession = f'{cik}{fy % 100:02d}{index + 1:06d}'
+        accn = f'{accession[:10]}-{accession[10:12]}-{accession[12:]}'
+        for _ in range(max(1, len(sentences) // 20)):
+            sentences[rng.randrange(len(sentences))] = _sentence(rng)
+        paragraphs = [' '.join(sentences[i:i + 6]) for i in range(0, len(sentences), 6)]
+
+        facts = []
+        for n, (concept, unit, period_type) in enumerate(concepts):
+            current_value, prior_value = _value(rng, unit), _value(rng, unit)
+            segment_value = _value(rng, unit) if n % 10 == 0 else None  # dimensional, not in companyfacts
+            facts.append((f'us-gaap:{concept}', unit, period_type, current_value, prior_value, segment_value))
+            for (start, end), value in ((current, current_value), (prior, prior_value)):
+                record = {'end': end, 'val': value, 'accn': accn, 'fy': fy, 'fp': fp, 'form': '10-Q', 'filed': filed}
+                if period_type == 'duration':
+                    record = {'start': start, **record}
+                records.setdefault((concept, unit), []).append(record)
+
+        path = os.path.join(filings_dir, f'{accession}_{filed}.htm')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(make_filing_html(ticker, cik, fy, fp, current, prior, facts, paragraphs))
+        paths.append(path)
+
+    us_gaap = {}
+    for (concept, unit), unit_records in records.items():
+        us_gaap.setdefault(concept, {'label': concept, 'description': concept, 'units': {}})['units'][unit] = unit_records
+    payload = {'cik': cik_number, 'entityName': f'{ticker}, Inc.', 'facts': {'us-gaap': us_gaap}}
+    with open(os.path.join(concepts_dir, f'CIK{cik}.json'), 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    return paths
+
+
+def write_corpus(base_dir: str, spec: CorpusSpec) -> List[str]:
+    """Write the corpus of `spec` under `base_dir` (skipped when the same spec is already there);
+    returns the tickers."""
+    spec_path = os.path.join(base_dir, 'corpus_spec.json')
+    tickers = ticker_names(spec)
+    if os.path.exists(spec_path):
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == asdict(spec):
+                return tickers
+    os.makedirs(base_dir, exist_ok=True)
+    for index, ticker in enumerate(tickers):
+        write_ticker(base_dir, ticker, index, spec)
+    with open(spec_path, 'w', encoding='utf-8') as f:
+        json.dump(asdict(spec), f)
+    return tickers
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    sizes = [int(arg) for arg in sys.argv[2:6]]
+    spec = CorpusSpec(*sizes)
+    tickers = write_corpus(sys.argv[1], spec)
+    print(f"Wrote {len(tickers)} tickers x {spec.filings} filings x {spec.facts} facts to {sys.argv[1]}")
@@ -0,0 +1,215 @@
+"""Import-time budget: how long `import <module>` takes in a fresh interpreter, per project module,
+checked against benchmarks/import_budget.json so a slower cold start fails the build.
+
+Streamlit reruns, `python sec_download.py` and every worker process start by importing these
+modules, so heavy dependencies belong at their point of use. Each module is imported in a new
+interpreter with `python -X importtime`, once to warm up and then `repeat` times. What is checked
+is its best time without the part spent importing numpy and pandas (BASELINE_PACKAGES): most
+modules need them at import, and their import time swings by a third from one interpreter to the
+next here, drowning the module's own cost.
+
+Budgets are multiples of the import time of pandas itself, measured the same way in the same run,
+so they carry over between machines; save them again after upgrading pandas or Python. A module
+that did not load pandas when the budget was saved fails if it starts to, and independently of
+the timings, so does a module that pulls in one of HEAVY_MODULES at import time (sec_db is exempt:
+sqlalchemy is what it is for). A lazy import moved into a function can leave a name behind, so
+every module of the tree is also checked for undefined names with pyflakes (see
+requirements-dev.txt).
+
+tests/test_import_budget.py runs the import and pyflakes checks; the timing check takes about
+half a minute and only runs with IMPORT_BUDGET=1 set.
+
+Usage:
+  python benchmarks/import_budget.py [--modules sec_loader,...] [--repeat 5]
+                                     [--budget benchmarks/import_budget.json]
+                                     [--save-budget [--headroom 2]]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+DEFAULT_BUDGET = os.path.join(BENCH_DIR, 'import_budget.json')
+MODULES = ['config', 'sec_metrics', 'sec_jobs', 'file_deletion', 'sec_storage', 'nlp_functions', 'sec_client',
+           'sec_download', 'sec_diff', 'sec_search', 'sec_xbrl', 'sec_loader', 'sec_processor', 'sec_monitor']
+# Dependencies only imported where they are used: database access, HTML parsing, HTTP, process
+# management and the full-text search watcher
+HEAVY_MODULES = ('sqlalchemy', 'selectolax', 'aiohttp', 'psutil', 'datamule')
+
+BASELINE = 'pandas'
+BASELINE_PACKAGES = ('numpy', 'pandas')  # left out of the module timings
+HEADROOM = 2.0  # a module's best time without pandas varies by up to a third between runs
+MIN_SLACK = 0.02  # of the baseline, on top of the headroom: small imports are mostly noise
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def measure(module):
+    """Cumulative import time of `module` in microseconds, the part of it spent importing
+    BASELINE_PACKAGES and the modules importing it loaded."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               capture_output=True, text=True, cwd=ROOT)
+    if completed.returncode != 0:
+        raise RuntimeError(f"import {module} failed: {completed.stderr.strip().splitlines()[-1]}")
+    cumulative, baseline, loaded = None, 0, set()
+    # An import is printed after the imports it triggered, so in reverse every line follows its
+    # parent: the nearest earlier line with a smaller indent
+    parents = []  # (indent, inside a baseline package) of the current line's ancestors
+    matches = [IMPORT_LINE.match(line) for line in completed.stderr.splitlines()]
+    for match in reversed([match for match in matches if match]):
+        indent, name = len(match.group(3)), match.group(4)
+        while parents and parents[-1][0] >= indent:
+            parents.pop()
+        inside = bool(parents) and parents[-1][1]
+        is_baseline = name.split('.')[0] in BASELINE_PACKAGES
+        if is_baseline and not inside:
+            baseline += int(match.group(2))
+        if name == module and not indent:
+            cumulative = int(match.group(2))
+        parents.append((indent, inside or is_baseline))
+        loaded.add(name)
+    return cumulative, baseline, loaded
+
+
+def check(modules, repeat, warmup=True):
+    """Per module, the best warm import time in ms without BASELINE_PACKAGES, whether it loads
+    them, and the heavy dependencies and other project modules it loads."""
+    results = {}
+    for module in modules:
+        if warmup:
+            measure(module)  # byte-compiles and pulls the files into the page cache
+        times = []
+        for _ in range(repeat):
+            cumulative, baseline, loaded = measure(module)
+            times.append(cumulative - baseline)
+        heavy = sorted({name.split('.')[0] for name in loaded} & set(HEAVY_MODULES))
+        results[module] = {'ms': round(min(times) / 1000, 1), 'heavy': heavy, 'baseline': BASELINE in loaded,
+                           'imports': sorted(name for name in loaded & set(MODULES) if name != module)}
+    return results
+
+
+def measure_baseline(repeat):
+    """Best warm `import pandas` time in ms, the unit budgets are expressed in."""
+    measure(BASELINE)
+    return round(min(measure(BASELINE)[0] for _ in range(repeat)) / 1000, 1)
+
+
+def make_budget(results, baseline_ms, headroom=HEADROOM):
+    """Budgets of `headroom` times the measurements plus MIN_SLACK, as multiples of the baseline.
+    A module's budget never exceeds that of a module importing it (importing sec_loader also
+    imports sec_xbrl) when both load pandas or neither does; otherwise the importer can get the
+    dependency's stdlib imports for free through pandas."""
+    budget = {module: round(result['ms'] / baseline_ms * headroom + MIN_SLACK, 3)
+              for module, result in results.items()}
+    for module, result in results.items():
+        for dependency in result['imports']:
+            if dependency in budget and results[dependency]['baseline'] == result['baseline']:
+                budget[dependency] = min(budget[dependency], budget[module])
+    return {'budget': budget,
+            'without_baseline': sorted(module for module, result in results.items() if not result['baseline'])}
+
+
+def problems(results, budget, baseline_ms=None):
+    """Per module, what fails the check against a saved `budget`: over its budget (only with a
+    baseline time), loading pandas when it did not before, or heavy dependencies."""
+    found = {}
+    for module, result in results.items():
+        limit = budget.get('budget', {}).get(module)
+        messages = []
+        if limit is not None and baseline_ms and result['ms'] > limit * baseline_ms:
+            messages.append(f"OVER BUDGET ({result['ms'] / baseline_ms:.3f} > {limit:.3f} x {BASELINE})")
+        heavy = result['heavy'] if module != 'sec_db' else []
+        if result['baseline'] and module in budget.get('without_baseline', []):
+            heavy = [BASELINE] + heavy
+        if heavy:
+            messages.append(f"IMPORTS {', '.join(heavy)}")
+        if messages:
+            found[module] = messages
+    return found
+
+
+def load_budget(path=DEFAULT_BUDGET):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def undefined_names(paths=None):
+    """pyflakes' undefined-name messages ("file:line: undefined name 'x'") for the project modules."""
+    from glob import glob
+    from pyflakes import messages
+    from pyflakes.api import checkPath
+    from pyflakes.reporter import Reporter
+
+    undefined = (messages.UndefinedName, messages.UndefinedLocal, messages.UndefinedExport)
+
+    class _Collector(Reporter):
+        def __init__(self):
+            super().__init__(None, None)
+            self.found = []
+
+        def unexpectedError(self, filename, msg):
+            self.found.append(f'{filename}: {msg}')
+
+        def syntaxError(self, filename, msg, lineno, offset, text):
+            self.found.append(f'{filename}:{lineno}: {msg}')
+
+        def flake(self, message):
+            if isinstance(message, undefined):
+                self.found.append(str(message))
+
+    collector = _Collector()
+    for path in paths or sorted(glob(os.path.join(ROOT, '*.py')) + glob(os.path.join(BENCH_DIR, '*.py'))):
+        checkPath(path, collector)
+    return collector.found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modules', default=','.join(MODULES), help='comma-separated, default all')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget', default=DEFAULT_BUDGET)
+    parser.add_argument('--save-budget', action='store_true',
+                        help='store the measured times times --headroom as the budget')
+    parser.add_argument('--headroom', type=float, default=HEADROOM)
+    args = parser.parse_args()
+
+    modules = [name.strip() for name in args.modules.split(',') if name.strip()]
+    baseline_ms = measure_baseline(args.repeat)
+    results = check(modules, args.repeat)
+
+    if args.save_budget:
+        import pandas
+
+        budget = make_budget(results, baseline_ms, args.headroom)
+        with open(args.budget, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], BASELINE: pandas.__version__, **budget}, f, indent=2)
+        print(f"Saved the budget to {args.budget}")
+    elif os.path.exists(args.budget):
+        budget = load_budget(args.budget)
+    else:
+        print(f"No budget at {args.budget}, only checking for heavy imports")
+        budget = {}
+
+    failed = False
+    for message in undefined_names():
+        print(f"  {message}")
+        failed = True
+    found = problems(results, budget, baseline_ms)
+    failed = failed or bool(found)
+    print(f"  {BASELINE:16s} {baseline_ms:8.1f} ms  (the unit; module times below are without it)")
+    for module, result in results.items():
+        limit = budget.get('budget', {}).get(module)
+        status = ' '.join(found.get(module, ['ok']))
+        limit_text = f'{limit:6.3f} x budget' if limit is not None else '       - budget'
+        print(f"  {module:16s} {result['ms']:8.1f} ms  {result['ms'] / baseline_ms:6.3f} x  {limit_text}  {status}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,284 @@
+"""Benchmark suite: time and peak memory of the hot paths of nlp_functions, sec_loader,
+sec_processor and sec_xbrl on a synthetic EDGAR corpus (see edgar_synth.py), reported as JSON
+and compared with a stored baseline.
+
+Every case runs in a fresh interpreter: inputs are prepared untimed, one warm-up run fills
+whatever the code caches on disk (section indexes), then `repeat` timed runs give the median
+and best time. Peak RSS is how far the warm-up run raises the process's RSS high-water mark
+(Linux, reset through /proc/self/clear_refs; elsewhere only measured when it rises above
+everything before), peak Python heap is traced by tracemalloc in a separate run. Worker
+processes (extraction, diff and fact pools) are not included. The text and search caches are
+off so every run does the work.
+
+A case is a regression when it fails, or when its best time (less noisy than the median), or its
+peak RSS when at least MIN_RSS_MB, is more than `--tolerance` above the baseline's; comparisons
+across different corpus specs or machines only warn.
+
+Usage:
+  python benchmarks/suite.py [--tickers 10 --filings 6 --facts 150 --text-kb 100 --seed 0]
+                             [--cases flatten_json_data,...] [--repeat 5] [--corpus DIR]
+                             [--output report.json] [--baseline benchmarks/baseline.json]
+                             [--save-baseline] [--tolerance 0.25] [--fail-on-regression]
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCH_DIR)
+from edgar_synth import CorpusSpec, ticker_names, write_corpus  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+FILING_COLUMNS = ['ticker', 'filing_date', 'content']  # what load_sec_data asks for
+MIN_RSS_MB = 5  # smaller peaks are allocator noise, not compared
+
+
+# Each case is a setup(corpus_dir, tickers) returning the timed callable; imports happen in setup
+# so they are not timed either
+
+def setup_flatten_json_data(corpus_dir, tickers):
+    from glob import glob
+    from nlp_functions import flatten_json_data
+
+    payloads = []
+    for ticker in tickers:
+        for path in glob(os.path.join(corpus_dir, ticker, 'company_concepts', '*.json')):
+            with open(path, 'r', encoding='utf-8') as f:
+                payloads.append(json.load(f))
+    return lambda: [flatten_json_data(payload) for payload in payloads]
+
+
+def setup_split_by_units(corpus_dir, tickers):
+    import pandas as pd
+    from nlp_functions import split_by_units
+
+    frames = setup_flatten_json_data(corpus_dir, tickers)()
+    df = pd.concat(frames, ignore_index=True)
+    return lambda: split_by_units(df)
+
+
+def _loader(corpus_dir):
+    from sec_loader import SECFilingLoader
+    return SECFilingLoader(base_dir=corpus_dir, use_cache=False, use_search_index=False)
+
+
+def setup_load_all_filings(corpus_dir, tickers):
+    loader = _loader(corpus_dir)
+    return lambda: loader.load_all_filings(tickers, columns=FILING_COLUMNS)
+
+
+def setup_extract_text_from_html(corpus_dir, tickers):
+    from sec_loader import extract_text_from_html
+
+    paths = [path for ticker in tickers for path in sorted(_loader(corpus_dir).list_filings(ticker))]
+    return lambda: [extract_text_from_html(path) for path in paths]
+
+
+def setup_get_latest_10q_info(corpus_dir, tickers):
+    import pandas as pd
+    from sec_processor import get_latest_10q_info
+
+    filings = _loader(corpus_dir).load_all_filings(tickers, columns=FILING_COLUMNS)
+    filings['filing_date'] = pd.to_datetime(filings['filing_date'], errors='coerce')
+    return lambda: get_latest_10q_info(filings)
+
+
+def setup_load_inline_facts(corpus_dir, tickers):
+    loader = _loader(corpus_dir)
+    return lambda: loader.load_inline_facts(tickers)
+
+
+CASES = {
+    'flatten_json_data': setup_flatten_json_data,
+    'split_by_units': setup_split_by_units,
+    'load_all_filings': setup_load_all_filings,
+    'extract_text_from_html': setup_extract_text_from_html,
+    'get_latest_10q_info': setup_get_latest_10q_info,
+    'load_inline_facts': setup_load_inline_facts,
+}
+
+
+def _status_kb(field):
+    try:
+        with open('/proc/self/status', 'r') as f:
+            return int(re.search(rf'^{field}:\s+(\d+)', f.read(), re.MULTILINE).group(1))
+    except (OSError, AttributeError):
+        return None
+
+
+def _reset_peak_rss():
+    """Reset the RSS high-water mark (Linux); returns False where that is not possible."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_bytes():
+    hwm = _status_kb('VmHWM')
+    if hwm is not None:
+        return hwm * 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+
+
+def run_case(name, corpus_dir, tickers, repeat):
+    """Run one case in this process and return its measurements."""
+    run = CASES[name](corpus_dir, tickers)
+
+    # Peak RSS is taken on the warm-up run: later runs reuse the memory the allocator kept
+    _reset_peak_rss()
+    rss_kb = _status_kb('VmRSS')
+    before = rss_kb * 1024 if rss_kb is not None else _peak_rss_bytes()
+    run()
+    peak_rss = max(0, _peak_rss_bytes() - before)
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    run()
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds_median': statistics.median(times), 'seconds_min': min(times), 'runs': repeat,
+            'peak_rss_mb': round(peak_rss / 1e6, 2), 'peak_python_mb': round(peak_traced / 1e6, 2)}
+
+
+def run_suite(spec, cases, repeat, corpus_dir):
+    write_corpus(corpus_dir, spec)
+    results = {}
+    for name in cases:
+        command = [sys.executable, os.path.abspath(__file__), '--child', name, '--corpus', corpus_dir,
+                   '--repeat', str(repeat), '--tickers', str(spec.tickers)]
+        completed = subprocess.run(command, capture_output=True, text=True, cwd=ROOT)
+        if completed.returncode != 0:
+            results[name] = {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr else 'failed'}
+        else:
+            results[name] = json.loads(completed.stdout.strip().splitlines()[-1])
+        print_result(name, results[name])
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=ROOT).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'machine': platform.machine(),
+            'cpus': os.cpu_count(), 'commit': commit, 'created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def print_result(name, result):
+    if 'error' in result:
+        print(f"  {name:24s} failed: {result['error']}")
+    else:
+        print(f"  {name:24s} {result['seconds_median']:8.3f}s median  {result['seconds_min']:8.3f}s best  "
+              f"{result['peak_rss_mb']:8.1f} MB RSS  {result['peak_python_mb']:8.1f} MB Python")
+
+
+def compare(report, baseline, tolerance):
+    """Per case, the ratios to the baseline and whether it regressed; prints a table."""
+    if baseline['spec'] != report['spec']:
+        print(f"Warning: the baseline was run on another corpus {baseline['spec']}, ratios are not comparable")
+    if baseline['environment'].get('machine') != report['environment'].get('machine') or \
+            baseline['environment'].get('cpus') != report['environment'].get('cpus'):
+        print("Warning: the baseline was run on another machine")
+
+    comparison = {}
+    print(f"Against the baseline of {baseline['environment'].get('created')} "
+          f"(commit {baseline['environment'].get('commit')}), tolerance {tolerance:.0%}:")
+    for name, result in report['results'].items():
+        base = baseline['results'].get(name)
+        if 'error' in result:
+            # A case that crashes is the worst regression there is
+            comparison[name] = {'time_ratio': None, 'rss_ratio': None, 'regressed': True, 'error': result['error']}
+            print(f"  {name:24s} failed: {result['error']}  REGRESSION")
+            continue
+        if base is None or 'error' in base:
+            continue
+        time_ratio = result['seconds_min'] / base['seconds_min'] if base['seconds_min'] else None
+        rss_ratio = result['peak_rss_mb'] / base['peak_rss_mb'] if base['peak_rss_mb'] >= MIN_RSS_MB else None
+        regressed = any(ratio is not None and ratio > 1 + tolerance for ratio in (time_ratio, rss_ratio))
+        comparison[name] = {'time_ratio': time_ratio, 'rss_ratio': rss_ratio, 'regressed': regressed}
+        time_text = f'{time_ratio:6.2f}x time' if time_ratio is not None else '     - time'
+        rss_text = f'{rss_ratio:6.2f}x RSS' if rss_ratio is not None else '     - RSS'
+        print(f"  {name:24s} {time_text}  {rss_text}  {'REGRESSION' if regressed else 'ok'}")
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = CorpusSpec()
+    parser.add_argument('--tickers', type=int, default=defaults.tickers)
+    parser.add_argument('--filings', type=int, default=defaults.filings, help='10-Qs per ticker')
+    parser.add_argument('--facts', type=int, default=defaults.facts, help='concepts tagged per filing')
+    parser.add_argument('--text-kb', type=int, default=defaults.text_kb, help='narrative text per filing')
+    parser.add_argument('--seed', type=int, default=defaults.seed)
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated, default all')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--corpus', help='keep the generated corpus here (reused when the spec matches)')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store this report as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--fail-on-regression', action='store_true')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    spec = CorpusSpec(args.tickers, args.filings, args.facts, args.text_kb, args.seed)
+    if args.child:
+        print(json.dumps(run_case(args.child, args.corpus, ticker_names(spec), args.repeat)))
+        return 0
+
+    cases = [name.strip() for name in args.cases.split(',') if name.strip()]
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown cases {unknown}, choose from {list(CASES)}")
+
+    print(f"Corpus: {spec.tickers} tickers x {spec.filings} filings x {spec.facts} facts, {spec.text_kb} KB text")
+    if args.corpus:
+        results = run_suite(spec, cases, args.repeat, args.corpus)
+    else:
+        with tempfile.TemporaryDirectory() as corpus_dir:
+            results = run_suite(spec, cases, args.repeat, corpus_dir)
+    report = {'spec': asdict(spec), 'environment': environment(), 'repeat': args.repeat, 'results': results}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    # A crashing case fails the run with or without a baseline to compare with
+    regressed = any('error' in result for result in results.values())
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report['comparison'] = compare(report, json.load(f), args.tolerance)
+        regressed = regressed or any(case['regressed'] for case in report['comparison'].values())
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+from config import CONFIG  # Import the config dictionary
+
+COMPANY_TICKERS_PATH = '/files/company_tickers.json'
+INPUT_TICKERS_FILE = os.path.join('Input_Data', 'Complete-List-of-Biotech-Stocks-Listed-on-NASDAQ-Jan-1-24.xlsx')
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600  # SEC updates the mapping daily, but new listings are rare
+
+
+def default_index_path() -> str:
+    return os.path.join(CONFIG['BASE_DIR'], '.cache', 'cik_index.json')
+
+
+def load_input_tickers(path: str = INPUT_TICKERS_FILE) -> List[str]:
+    """Read the ticker universe from the NASDAQ biotech list in Input_Data."""
+    import pandas as pd
+    df = pd.read_excel(path)
+    return [str(t).strip().upper() for t in df['Ticker'].dropna()]
+
+
+class CIKIndex:
+    """Persisted ticker -> CIK map bulk-loaded from SEC's company_tickers.json.
+
+    Lookups are plain dict reads and never touch the network; the whole mapping is
+    re-downloaded (one request) only when the on-disk copy is older than the TTL.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = path or default_index_path()
+        self.ttl_seconds = ttl_seconds
+        self.updated_at = 0.0
+        self._ciks: Dict[str, str] = {}
+        self._names: Dict[str, str] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._ciks)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker.upper() in self._ciks
+
+    def is_stale(self) -> bool:
+        return not self._ciks or (time.time() - self.updated_at) > self.ttl_seconds
+
+    def load(self) -> bool:
+        """Load the persisted index, returns False if there is none yet."""
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        self.updated_at = data.get('updated_at', 0.0)
+        self._ciks = data.get('ciks', {})
+        self._names = data.get('names', {})
+        return True
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'updated_at': self.updated_at, 'ciks': self._ciks, 'names': self._names}, f)
+        os.replace(tmp_path, self.path)
+
+    def load_mapping(self, mapping: dict, restrict_to: Optional[Iterable[str]] = None) -> None:
+        """Replace the index with SEC's company_tickers payload ({"0": {"cik_str", "ticker", "title"}, ...}).
+
+        `restrict_to` keeps only the given tickers, e.g. the Input_Data universe.
+        """
+        wanted = {t.upper() for t in restrict_to} if restrict_to is not None else None
+        ciks, names = {}, {}
+        for entry in mapping.values():
+            ticker = str(entry['ticker']).upper()
+            if wanted is not None and ticker not in wanted:
+                continue
+            # The first entry wins, SEC lists a company's primary ticker first
+            if ticker not in ciks:
+                ciks[ticker] = str(entry['cik_str']).zfill(10)
+                names[ticker] = entry.get('title', '')
+        self._ciks = ciks
+        self._names = names
+        self.updated_at = time.time()
+        self.save()
+
+    def load_from_file(self, mapping_path: str, restrict_to: Optional[Iterable[str]] = None) -> None:
+        """Build the index from a local copy of company_tickers.json (e.g. a test fixture)."""
+        with open(mapping_path, 'r', encoding='utf-8') as f:
+            self.load_mapping(json.load(f), restrict_to=restrict_to)
+
+    async def refresh(self, client, restrict_to: Optional[Iterable[str]] = None) -> None:
+        """Download the mapping once through the shared SECClient and persist it."""
+        mapping = await client.get_json(f'{client.www_url}{COMPANY_TICKERS_PATH}')
+        self.load_mapping(mapping, restrict_to=restrict_to)
+
+    async def ensure_fresh(self, client) -> None:
+        """Refresh the index if it is missing or past its TTL (safe to call from many tasks)."""
+        if not self.is_stale():
+            return
+        # The index can outlive an event loop (e.g. across Streamlit reruns), so bind the lock per loop
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            if self.is_stale():
+                await self.refresh(client)
+
+    def lookup(self, ticker: str) -> str:
+        """Return the 10-digit CIK for `ticker`, raising ValueError if it is unknown."""
+        try:
+            return self._ciks[ticker.upper()]
+        except KeyError:
+            raise ValueError(f"Failed to fetch CIK for ticker: {ticker}") from None
+
+    def name(self, ticker: str) -> str:
+        return self._names.get(ticker.upper(), '')
+
+    def missing(self, tickers: Iterable[str]) -> List[str]:
+        """Tickers from `tickers` that the index cannot resolve."""
+        return [t for t in tickers if t.upper() not in self._ciks]
+
+
+_default_index: Optional[CIKIndex] = None
+
+
+def get_cik_index() -> CIKIndex:
+    """Process-wide index stored under BASE_DIR."""
+    global _default_index
+    if _default_index is None or _default_index.path != default_index_path():
+        _default_index = CIKIndex()
+    return _default_index
+
+
+# Build or refresh the persisted index from the command line:
+#   python cik_index.py                      # download from SEC
+#   python cik_index.py company_tickers.json # load a local mapping file
+#   python cik_index.py --input-data         # keep only the Input_Data tickers
+if __name__ == '__main__':
+    import sys
+    from sec_client import SECClient
+
+    args = sys.argv[1:]
+    restrict_to = load_input_tickers() if '--input-data' in args else None
+    files = [a for a in args if not a.startswith('--')]
+    index = CIKIndex()
+    if files:
+        index.load_from_file(files[0], restrict_to=restrict_to)
+    else:
+        async def _refresh():
+            async with SECClient() as client:
+                await index.refresh(client, restrict_to=restrict_to)
+        asyncio.run(_refresh())
+    print(f"CIK index with {len(index)} tickers saved to {index.path}")
+    if restrict_to is not None:
+        missing = index.missing(restrict_to)
+        if missing:
+            print(f"{len(missing)} Input_Data tickers not found at SEC: {', '.join(missing)}")
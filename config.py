@@ -8,5 +8,15 @@ CONFIG = {
     'END_DATE': today_date,  # This will set the END_DATE to today's date
     'BASE_DIR': 'sec_data',
     'USER_AGENT': 'Your Name your@email.com',
-    'DATABASE_URL': 'NA'
+    'DATABASE_URL': 'NA',
+    'MAX_CONCURRENCY': 8,  # Tickers processed at the same time
+    'REQUESTS_PER_SECOND': 8,  # Global cap on EDGAR requests, must stay under SEC's limit of 10
+    'CONNECTOR_LIMIT': 10,  # Pooled keep-alive connections shared by all EDGAR requests
+    'HTTP_CACHE_MAX_MB': 2048,  # Size cap of the on-disk EDGAR response cache (LRU eviction)
+    'STORAGE_BACKEND': 'parquet',  # Fact storage: 'parquet' (partitioned, typed) or 'csv' (legacy files)
+    'EXTRACT_WORKERS': 0,  # Processes for filing text extraction, 0 = one per CPU core, 1 = no pool
+    'TEXT_CACHE': True,  # Reuse extracted filing text from BASE_DIR/.cache/text_cache.sqlite
+    'STREAM_EXTRACT_MB': 4,  # Filings this large or larger are extracted by streaming (text_stream.py), None = never
+    'FILING_FORMS': ['10-Q'],  # Filing documents to download (amendments such as 10-Q/A included)
+    'SEARCH_INDEX': True  # Full-text index of extracted filings in BASE_DIR/.cache/search_index.sqlite
 }
@@ -1,78 +1,219 @@
 import os
 import shutil
-import psutil
-import streamlit as st
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable, List, Optional
 
-# Function to find processes using files and kill them
-def kill_processes_using_files(file_paths):
-    processes_to_terminate = set()
-    
-    # Iterate over all processes and find those using any of the files
-    for proc in psutil.process_iter(['pid', 'name', 'open_files']):
+if TYPE_CHECKING:
+    import psutil
+
+# Deleted trees are renamed to a sibling `<base_dir>.trash-<pid>-<ns>` and removed in the background
+TRASH_MARKER = '.trash-'
+# Interrupted atomic writes (manifest, section indexes, cache bodies, Ticker=<x>.tmp partitions)
+TMP_SUFFIX = '.tmp'
+SECTIONS_SUFFIX = '.sections.json'
+
+_remover: Optional[ThreadPoolExecutor] = None
+_remover_lock = threading.Lock()
+
+
+# Function to find our own child processes (extraction pool workers, download subprocesses) that
+# have any of `file_paths`, or any file under `under`, open. Other processes on the host are not
+# scanned: only the app's children can hold files in its data directory.
+def find_processes_using_files(file_paths: Iterable[str] = (), under: Optional[str] = None) -> List['psutil.Process']:
+    import psutil  # only needed when there is something to clean up
+
+    targets = {os.path.realpath(path) for path in file_paths}
+    prefix = os.path.join(os.path.realpath(under), '') if under else None
+    try:
+        children = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        return []
+
+    processes = []
+    for proc in children:
         try:
-            for file in proc.info['open_files'] or []:
-                if file.path in file_paths:
-                    processes_to_terminate.add(proc)
+            for file in proc.open_files():
+                if file.path in targets or (prefix is not None and file.path.startswith(prefix)):
+                    processes.append(proc)
+                    break
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
             continue
+    return processes
 
-    # Now terminate all processes
-    for proc in processes_to_terminate:
-        st.warning(f"Process {proc.info['name']} (PID: {proc.info['pid']}) is using a file. Terminating process.")
-        proc.terminate()  # Forcefully terminate the process
-        proc.wait()  # Wait for the process to terminate
-        st.info(f"Process {proc.info['name']} terminated.")
 
-# Function to delete a single file
-def delete_file(file_path):
-    try:
-        # Force delete the file
-        os.remove(file_path)
-        st.info(f"Deleted file {file_path}")
-    except PermissionError as e:
-        st.error(f"PermissionError: {e} while deleting file {file_path}")
-    except Exception as e:
-        st.error(f"Error deleting file {file_path}: {str(e)}")
-
-# Function to delete a single directory
-def delete_directory(dir_path):
-    try:
-        # Force delete the directory and all its contents
-        shutil.rmtree(dir_path)
-        st.info(f"Deleted directory {dir_path}")
-    except PermissionError as e:
-        st.error(f"PermissionError: {e} while deleting directory {dir_path}")
-    except Exception as e:
-        st.error(f"Error deleting directory {dir_path}: {str(e)}")
-
-# Function to delete all files and folders in a directory forcefully
-def delete_existing_files(base_dir):
+# Function to terminate processes, killing those still alive after `timeout` seconds
+def terminate_processes(processes: List['psutil.Process'], timeout: float = 5.0) -> List[str]:
+    import psutil
+
+    terminated = []
+    for proc in processes:
+        try:
+            terminated.append(f"{proc.name()} (PID: {proc.pid})")
+            proc.terminate()
+        except psutil.NoSuchProcess:
+            continue
+    _, alive = psutil.wait_procs(processes, timeout=timeout)
+    for proc in alive:
+        proc.kill()
+    psutil.wait_procs(alive, timeout=timeout)
+    return terminated
+
+
+# Function to find processes using files and kill them
+def kill_processes_using_files(file_paths: Iterable[str] = (), under: Optional[str] = None) -> List[str]:
+    return terminate_processes(find_processes_using_files(file_paths, under=under))
+
+
+def _get_remover() -> ThreadPoolExecutor:
+    global _remover
+    with _remover_lock:
+        if _remover is None:
+            # One thread: removals are disk bound, and a later cleanup queues behind an earlier one
+            _remover = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-remover')
+        return _remover
+
+
+# Function to delete a directory tree in the background
+def remove_tree_async(path: str) -> Future:
+    return _get_remover().submit(shutil.rmtree, path, True)
+
+
+# Function to delete a file or directory right away
+def remove_path(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def leftover_trash(base_dir: str) -> List[str]:
+    """Trash directories of `base_dir` whose removal was interrupted (e.g. the app was stopped)."""
+    base_dir = os.path.abspath(base_dir)
+    parent, prefix = os.path.dirname(base_dir), os.path.basename(base_dir) + TRASH_MARKER
+    return [os.path.join(parent, name) for name in os.listdir(parent) if name.startswith(prefix)]
+
+
+# Function to empty a directory by renaming it away, which is one atomic metadata operation however
+# many files it holds. Paths in `preserve` (relative to base_dir) are moved back into the new empty
+# directory. Returns the trash directory, which still has to be removed.
+def move_to_trash(base_dir: str, preserve: Iterable[str] = ()) -> Optional[str]:
+    if not os.path.exists(base_dir):
+        return None
+    base_dir = os.path.abspath(base_dir)
+    trash = f'{base_dir}{TRASH_MARKER}{os.getpid()}-{time.time_ns()}'
+    os.replace(base_dir, trash)
+    os.makedirs(base_dir, exist_ok=True)
+    for relative_path in preserve:
+        source = os.path.join(trash, relative_path)
+        if os.path.exists(source):
+            target = os.path.join(base_dir, relative_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+    return trash
+
+
+# Function to empty a directory by deleting its entries, keeping the paths in `preserve` (relative to
+# base_dir, e.g. '.cache/pipeline.lock') and the directories leading to them
+def delete_in_place(base_dir: str, preserve: Iterable[str] = ()) -> None:
+    kept = {os.path.normpath(path) for path in preserve}
+    # '.cache/pipeline.lock' keeps '.cache', whose other entries are still deleted
+    parents = {os.path.dirname(path) for path in kept}
+    for path in list(parents):
+        while path:
+            parents.add(path)
+            path = os.path.dirname(path)
+
+    stack = ['']
+    while stack:
+        relative_dir = stack.pop()
+        for entry in os.scandir(os.path.join(base_dir, relative_dir)):
+            relative_path = os.path.join(relative_dir, entry.name)
+            if relative_path in kept:
+                continue
+            if relative_path in parents and entry.is_dir(follow_symlinks=False):
+                stack.append(relative_path)
+            else:
+                remove_path(entry.path)
+
+
+def find_stale_artifacts(base_dir: str) -> List[str]:
+    """Leftovers of interrupted or outdated work under `base_dir`, which are safe to delete.
+
+    That is `*.tmp` files and directories, and section indexes whose filing is gone, changed
+    or was parsed by an older parser. Data and caches are left alone.
+    """
+    from sec_sections import load_index
+
+    stale = []
+    stack = [base_dir]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.name.endswith(TMP_SUFFIX):
+                stale.append(entry.path)
+            elif entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.name.endswith(SECTIONS_SUFFIX):
+                source = entry.path[:-len(SECTIONS_SUFFIX)]
+                if not os.path.exists(source) or load_index(source) is None:
+                    stale.append(entry.path)
+    return stale
+
+
+# Function to clean up a data directory without a UI:
+#   keep_cache=False empties base_dir (rename, then background removal), keeping `preserve`;
+#   keep_cache=True only deletes stale artifacts, so the data and the HTTP and text caches stay.
+# Trash left by earlier cleanups is removed in both modes. Returns what was done; with `wait`
+# the background removals have finished when it returns.
+def cleanup_base_dir(base_dir: str, keep_cache: bool = False, preserve: Iterable[str] = (),
+                     wait: bool = False) -> dict:
+    summary = {'base_dir': base_dir, 'keep_cache': keep_cache, 'terminated': [], 'stale': [],
+               'trash': None, 'pending': []}
     if os.path.exists(base_dir):
-        # Collect all file paths and directories in base_dir
-        file_paths = []
-        dirs_to_delete = []
-        for root, dirs, files in os.walk(base_dir, topdown=False):
-            for name in files:
-                file_paths.append(os.path.join(root, name))
-            for name in dirs:
-                dirs_to_delete.append(os.path.join(root, name))
-
-        # Step 1: Kill processes using any of the files
-        kill_processes_using_files(file_paths)
-        
-        # Step 2: Delete files using threading for faster execution
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(delete_file, file_path) for file_path in file_paths]
-            for future in as_completed(futures):
-                pass  # Wait for all file deletions to complete
-        
-        # Step 3: Delete directories (in parallel for faster execution)
-        with ThreadPoolExecutor() as executor:
-            futures = [executor.submit(delete_directory, dir_path) for dir_path in dirs_to_delete]
-            for future in as_completed(futures):
-                pass  # Wait for all directory deletions to complete
+        summary['terminated'] = kill_processes_using_files(under=base_dir)
+    summary['pending'] = [remove_tree_async(path) for path in leftover_trash(base_dir)]
 
-        st.info(f"All files and directories in {base_dir} have been deleted.")
+    if keep_cache:
+        if os.path.exists(base_dir):
+            summary['stale'] = find_stale_artifacts(base_dir)
+            for path in summary['stale']:
+                remove_path(path)
     else:
+        try:
+            summary['trash'] = move_to_trash(base_dir, preserve=preserve)
+        except OSError:
+            # Cannot rename (base_dir is a mount point, or files are locked): delete in place
+            delete_in_place(base_dir, preserve=preserve)
+        if summary['trash'] is not None:
+            summary['pending'].append(remove_tree_async(summary['trash']))
+
+    if wait:
+        for future in summary['pending']:
+            future.result()
+    return summary
+
+
+# Function to delete all files and folders in a directory, reporting to the Streamlit page
+def delete_existing_files(base_dir: str, keep_cache: bool = False):
+    import streamlit as st
+
+    if not os.path.exists(base_dir):
         st.warning(f"Directory {base_dir} does not exist.")
+        return None
+
+    summary = cleanup_base_dir(base_dir, keep_cache=keep_cache)
+    for process in summary['terminated']:
+        st.warning(f"Process {process} was using a file and has been terminated.")
+    if keep_cache:
+        st.info(f"Removed {len(summary['stale'])} stale files and directories in {base_dir}, caches kept.")
+    else:
+        st.info(f"All files and directories in {base_dir} have been deleted.")
+    return summary
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from config import CONFIG  # Import the config dictionary
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3  # 2 GB
+
+
+def default_cache_dir() -> str:
+    return os.path.join(CONFIG['BASE_DIR'], '.cache', 'http')
+
+
+class CacheEntry:
+    def __init__(self, key: str, url: str, etag: Optional[str], last_modified: Optional[str],
+                 size: int, stored_at: float, last_access: float):
+        self.key = key
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.size = size
+        self.stored_at = stored_at
+        self.last_access = last_access
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional-GET headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self) -> dict:
+        return dict(self.__dict__)
+
+
+class HTTPCache:
+    """On-disk store of response bodies plus their ETag/Last-Modified validators.
+
+    Each URL maps to `<sha256>.body` and `<sha256>.json` under `cache_dir`. When the total
+    body size goes over `max_bytes`, the least recently used entries are evicted.
+    Methods are blocking; SECClient calls them from a worker thread.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(CONFIG.get('HTTP_CACHE_MAX_MB', DEFAULT_MAX_BYTES // 1024 ** 2)) * 1024 ** 2
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CacheEntry] = {}
+        self.total_bytes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._scan()
+
+    @staticmethod
+    def key_for(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _paths(self, key: str):
+        base = os.path.join(self.cache_dir, key)
+        return f'{base}.body', f'{base}.json'
+
+    def _scan(self) -> None:
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.cache_dir, name), 'r', encoding='utf-8') as f:
+                    entry = CacheEntry(**json.load(f))
+            except (OSError, ValueError, TypeError):
+                continue
+            if os.path.exists(self._paths(entry.key)[0]):
+                self._entries[entry.key] = entry
+                self.total_bytes += entry.size
+
+    def _write_meta(self, entry: CacheEntry) -> None:
+        meta_path = self._paths(entry.key)[1]
+        with open(f'{meta_path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(entry.to_dict(), f)
+        os.replace(f'{meta_path}.tmp', meta_path)
+
+    def lookup(self, url: str) -> Optional[CacheEntry]:
+        return self._entries.get(self.key_for(url))
+
+    def read(self, entry: CacheEntry) -> Optional[bytes]:
+        """Return the cached body and mark the entry as recently used (None if it vanished)."""
+        body_path = self._paths(entry.key)[0]
+        try:
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except OSError:
+            self.remove(entry.key)
+            return None
+        with self._lock:
+            entry.last_access = time.time()
+            self._write_meta(entry)
+        return body
+
+    def store(self, url: str, headers, body: bytes) -> Optional[CacheEntry]:
+        """Save a 200 response. Responses without any validator are not cacheable and are skipped."""
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return None
+        if len(body) > self.max_bytes:
+            return None
+        key = self.key_for(url)
+        body_path, _ = self._paths(key)
+        now = time.time()
+        entry = CacheEntry(key, url, etag, last_modified, len(body), now, now)
+        with self._lock:
+            with open(f'{body_path}.tmp', 'wb') as f:
+                f.write(body)
+            os.replace(f'{body_path}.tmp', body_path)
+            self._write_meta(entry)
+            previous = self._entries.get(key)
+            if previous is not None:
+                self.total_bytes -= previous.size
+            self._entries[key] = entry
+            self.total_bytes += entry.size
+            self._evict()
+        return entry
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+            for path in self._paths(key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _evict(self) -> None:
+        # Caller holds the lock
+        if self.total_bytes <= self.max_bytes:
+            return
+        for entry in sorted(self._entries.values(), key=lambda e: e.last_access):
+            if self.total_bytes <= self.max_bytes:
+                break
+            self._entries.pop(entry.key)
+            self.total_bytes -= entry.size
+            for path in self._paths(entry.key):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self.remove(key)
@@ -1,95 +1,134 @@
-import datamule as dm
+import numpy as np
 import pandas as pd
-import aiohttp
 import asyncio
+import json
 from collections import defaultdict
+from cik_index import get_cik_index
 
-# Function to fetch CIK using the ticker symbol from SEC's EDGAR system
-async def fetch_cik_from_ticker(ticker, headers):
-    url = f'https://www.sec.gov/cgi-bin/browse-edgar?CIK={ticker}&action=getcompany'
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, headers=headers) as response:
-            if response.status == 200:
-                html = await response.text()
-                # Extract the CIK from the page's HTML
-                start_index = html.find('CIK=') + len('CIK=') 
-                end_index = html.find('&amp;', start_index)
-                cik = html[start_index:end_index]
-                return cik
-            else:
-                raise ValueError(f"Failed to fetch CIK for ticker: {ticker}")
-
-# Define the function to pull SEC data for a given ticker
-async def pull_sec_data_single_ticker(ticker, downloader):
-    # Function to fetch company data using CIK
-    async def fetch_company_data(cik, headers):
-        url = f'https://data.sec.gov/api/xbrl/companyfacts/CIK{str(cik).zfill(10)}.json'
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, headers=headers) as response:
-                return await response.json()
-
-    # Function to flatten the JSON data from the SEC API
-    def flatten_json_data(company_data):
-        all_data = []
-        
-        # Iterate through all taxonomies (dei, us-gaap, etc.)
-        for taxonomy in company_data.get('facts', {}):
-            # Iterate through all concepts within each taxonomy
-            for concept in company_data['facts'][taxonomy]:
-                # Get the units data
-                units_data = company_data['facts'][taxonomy][concept].get('units', {})
-                
-                # Iterate through all unit types
-                for unit_type, values in units_data.items():
-                    # Process each individual record
-                    for record in values:
-                        data_point = {
-                            'Taxonomy': taxonomy,
-                            'Concept': concept,
-                            'Unit': unit_type,
-                            'Value': record.get('val'),
-                            'Start': record.get('start'),
-                            'End': record.get('end'),
-                            'Accession': record.get('accn'),
-                            'Fiscal Year': record.get('fy'),
-                            'Fiscal Period': record.get('fp'),
-                            'Form': record.get('form'),
-                            'Filed Date': record.get('filed'),
-                            'Frame': record.get('frame')
-                        }
-                        all_data.append(data_point)
-        
-        return all_data
-
-    # Function to split the DataFrame by unit types
-    def split_by_units(df):
-        dfs = {}
-        for unit in df['Unit'].unique():
-            unit_name = unit.replace('/', '_per_')
-            dfs[f'df_{unit_name}'] = df[df['Unit'] == unit].copy()
-        return dfs
+# Function to resolve a ticker's CIK from the persisted cik_index.CIKIndex.
+# Lookups are local dict reads; the client is only used to (re)build a missing or expired index.
+async def fetch_cik_from_ticker(ticker, client, index=None):
+    if index is None:
+        index = get_cik_index()
+    await index.ensure_fresh(client)
+    return index.lookup(ticker)
 
-    # Fetch the CIK for the ticker
-    cik = await fetch_cik_from_ticker(ticker, downloader.headers)
+# Output columns of flatten_json_data and the companyfacts record key each one comes from
+FACT_COLUMNS = ['Taxonomy', 'Concept', 'Unit', 'Value', 'Start', 'End', 'Accession',
+                'Fiscal Year', 'Fiscal Period', 'Form', 'Filed Date', 'Frame']
+RECORD_FIELDS = [('Value', 'val'), ('Start', 'start'), ('End', 'end'), ('Accession', 'accn'),
+                 ('Fiscal Year', 'fy'), ('Fiscal Period', 'fp'), ('Form', 'form'),
+                 ('Filed Date', 'filed'), ('Frame', 'frame')]
+DATE_COLUMNS = ['Start', 'End', 'Filed Date']
+CATEGORICAL_COLUMNS = ['Fiscal Period', 'Form']
+
+# Build a categorical column from one label per (taxonomy, concept, unit) group repeated `counts` times
+def _repeat_categorical(labels, counts):
+    categories = sorted(set(labels))
+    positions = {label: i for i, label in enumerate(categories)}
+    group_codes = np.fromiter((positions[label] for label in labels), dtype=np.int32, count=len(labels))
+    return pd.Categorical.from_codes(np.repeat(group_codes, counts), categories=categories)
+
+# Function to flatten the JSON data from the SEC API.
+# Records are appended straight into per-column lists (one list comprehension per field and
+# unit group) instead of building a dict per fact, Taxonomy/Concept/Unit/Form/Fiscal Period
+# come back as categoricals and the date columns are parsed in one vectorized pass each.
+def flatten_json_data(company_data):
+    group_taxonomies, group_concepts, group_units, counts = [], [], [], []
+    columns = {name: [] for name, _ in RECORD_FIELDS}
+
+    # Iterate through all taxonomies (dei, us-gaap, etc.), their concepts and unit types
+    for taxonomy, concepts in company_data.get('facts', {}).items():
+        for concept, concept_data in concepts.items():
+            for unit_type, values in concept_data.get('units', {}).items():
+                group_taxonomies.append(taxonomy)
+                group_concepts.append(concept)
+                group_units.append(unit_type)
+                counts.append(len(values))
+                for name, key in RECORD_FIELDS:
+                    columns[name].extend([record.get(key) for record in values])
+
+    counts = np.asarray(counts, dtype=np.int64)
+    data = {
+        'Taxonomy': _repeat_categorical(group_taxonomies, counts),
+        'Concept': _repeat_categorical(group_concepts, counts),
+        'Unit': _repeat_categorical(group_units, counts),
+    }
+    for name, _ in RECORD_FIELDS:
+        if name in DATE_COLUMNS:
+            data[name] = pd.to_datetime(pd.Series(columns[name], dtype=object), format='%Y-%m-%d', errors='coerce')
+        elif name in CATEGORICAL_COLUMNS:
+            data[name] = pd.Categorical(columns[name])
+        else:
+            data[name] = pd.Series(columns[name])
+        # Free each list as soon as its column is built
+        columns[name] = None
+
+    # Columns are already in FACT_COLUMNS order; passing `columns=` would make pandas
+    # round-trip every column through an object array
+    return pd.DataFrame(data)
 
-    # Fetch the company's financial data using the CIK
-    company_data = await fetch_company_data(cik, downloader.headers)
+# Function to split the DataFrame by unit types.
+# One stable sort groups the rows of each unit together (keeping their existing order), and each
+# unit is then returned as a contiguous `iloc` slice of that frame, i.e. a view rather than a copy.
+# Treat the partitions as read-only; call .copy() before modifying one.
+def split_by_units(df):
+    if df.empty:
+        return {}
+    ordered = df.sort_values('Unit', kind='stable')
+    units = ordered['Unit']
+    codes = units.cat.codes.to_numpy() if isinstance(units.dtype, pd.CategoricalDtype) else pd.factorize(units)[0]
+    boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(ordered)]))
 
-    # Flatten the JSON data into a list of records
-    flattened_data = flatten_json_data(company_data)
+    dfs = {}
+    for start, end in zip(starts, ends):
+        unit_name = str(units.iat[start]).replace('/', '_per_')
+        dfs[f'df_{unit_name}'] = ordered.iloc[start:end]
+    return dfs
 
-    # Convert the flattened data into a pandas DataFrame
-    df = pd.DataFrame(flattened_data)
+# Keep the facts filed between `start` and `end` (inclusive), either bound may be None
+def filter_by_filed_date(df, start=None, end=None):
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (df['Filed Date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (df['Filed Date'] <= pd.Timestamp(end)).to_numpy()
+    return df if mask.all() else df[mask]
 
-    # Clean the DataFrame by converting date columns to datetime
-    df['Start'] = pd.to_datetime(df['Start'], errors='coerce')
-    df['End'] = pd.to_datetime(df['End'], errors='coerce')
-    df['Filed Date'] = pd.to_datetime(df['Filed Date'], errors='coerce')
+# Function to download a company's raw companyfacts JSON (revalidated against the on-disk HTTP cache)
+async def fetch_company_facts(cik, client):
+    url = f'{client.data_url}/api/xbrl/companyfacts/CIK{str(cik).zfill(10)}.json'
+    # Unchanged facts come back as a 304 and are served from the cache
+    return await client.get_bytes(url, use_cache=True)
+
+# Define the function to pull SEC data for a given ticker.
+# `client` is the run's shared sec_client.SECClient; pass `cik` when it is already known
+# to skip the index lookup. The Filed Date filter (`start`/`end`) and the Ticker column are
+# applied once, before the frame is partitioned by unit.
+async def pull_sec_data_single_ticker(ticker, client, cik=None, start=None, end=None, company_data=None):
+    # Fetch the CIK for the ticker
+    if cik is None:
+        cik = await fetch_cik_from_ticker(ticker, client)
+
+    # Fetch the company's financial data using the CIK, unless the caller already has it
+    if company_data is None:
+        company_data = json.loads(await fetch_company_facts(cik, client))
+
+    # Flatten the JSON data into a typed DataFrame (dates already parsed)
+    df = flatten_json_data(company_data)
+
+    # Filter by the start and end dates before anything else touches the rows
+    df = filter_by_filed_date(df, start, end)
 
     # Sort the DataFrame by taxonomy, concept, and end date
     df = df.sort_values(['Taxonomy', 'Concept', 'End'])
 
-    # Optionally, split the DataFrame by units (optional)
+    # Add a column for the ticker
+    df['Ticker'] = ticker
+
+    # Split the DataFrame by units into views of one unit-ordered frame
     unit_dfs = split_by_units(df)
 
     # Return the main DataFrame and the split DataFrames by unit type
@@ -97,8 +136,8 @@ async def pull_sec_data_single_ticker(ticker, downloader):
 
 # # Example of how to call the function
 # async def main(ticker):
-#     downloader = dm.Downloader()
-#     df, unit_dfs = await pull_sec_ticker(ticker, downloader)
+#     async with SECClient() as client:
+#         df, unit_dfs = await pull_sec_data_single_ticker(ticker, client)
 #    
 #     # Optionally, save to CSV
 #     df.to_csv(f'sec_data_ticker_{ticker}.csv', index=False)
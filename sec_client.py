@@ -0,0 +1,203 @@
+import asyncio
+import json
+import random
+import time
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit
+
+from config import CONFIG  # Import the config dictionary
+import sec_metrics
+from http_cache import HTTPCache
+from sec_scheduler import RateLimiter
+
+if TYPE_CHECKING:
+    import aiohttp
+
+SEC_WWW_URL = 'https://www.sec.gov'
+SEC_DATA_URL = 'https://data.sec.gov'
+
+# Status codes worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class SECRequestError(Exception):
+    """Raised when EDGAR returns a non-success status after all retries."""
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"HTTP {status} for {url}")
+        self.url = url
+        self.status = status
+
+
+class SECResponse:
+    def __init__(self, url: str, status: int, headers, body: bytes, from_cache: bool = False):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.from_cache = from_cache
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status < 300
+
+    def text(self, encoding: str = 'utf-8') -> str:
+        return self.body.decode(encoding, errors='replace')
+
+
+class SECClient:
+    """Single pooled, keep-alive HTTP client for every EDGAR request.
+
+    One aiohttp session (and so one connection pool) is shared by all fetchers of a run,
+    the SEC User-Agent is applied once, every attempt goes through the shared RateLimiter,
+    and 429/5xx responses or connection errors are retried with exponential backoff.
+    With an HTTPCache, `use_cache=True` requests are revalidated with If-None-Match /
+    If-Modified-Since and a 304 is answered from disk.
+
+    Use as an async context manager:
+
+        async with SECClient() as client:
+            data = await client.get_json(url)
+    """
+
+    def __init__(
+        self,
+        user_agent: Optional[str] = None,
+        connector_limit: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_retries: int = 4,
+        backoff: float = 0.5,
+        timeout: float = 60,
+        www_url: str = SEC_WWW_URL,
+        data_url: str = SEC_DATA_URL,
+        cache: Optional[HTTPCache] = None,
+    ):
+        self.user_agent = user_agent or CONFIG['USER_AGENT']
+        self.connector_limit = connector_limit or CONFIG.get('CONNECTOR_LIMIT', 10)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_second or CONFIG.get('REQUESTS_PER_SECOND', 8))
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.www_url = www_url.rstrip('/')
+        self.data_url = data_url.rstrip('/')
+        self.cache = cache
+        self.session: Optional['aiohttp.ClientSession'] = None
+        self.stats = {'requests': 0, 'retries': 0, 'bytes': 0, 'errors': 0, 'cache_hits': 0, 'bytes_saved': 0}
+
+    async def open(self) -> 'SECClient':
+        if self.session is None or self.session.closed:
+            # aiohttp is imported with the first session, importing this module stays cheap
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.connector_limit,
+                limit_per_host=self.connector_limit,
+                keepalive_timeout=30,
+                ttl_dns_cache=300,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers={'User-Agent': self.user_agent, 'Accept-Encoding': 'gzip, deflate'},
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self
+
+    async def close(self) -> None:
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) + random.uniform(0, self.backoff)
+
+    async def _fetch(self, url: str, headers: Optional[dict] = None) -> SECResponse:
+        """GET `url`, retrying throttled/failed attempts. Returns the final response whatever its status."""
+        import aiohttp  # already loaded by open()
+
+        await self.open()
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            waited = time.perf_counter()
+            await self.limiter.acquire()
+            started = time.perf_counter()
+            sec_metrics.observe('rate_limit_wait_seconds', started - waited)
+            self.stats['requests'] += 1
+            sec_metrics.count('http_requests', host=host)
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    body = await response.read()
+                    self.stats['bytes'] += len(body)
+                    sec_metrics.count('http_bytes', len(body), host=host)
+                    # EDGAR latency, from sending the request to the whole body
+                    sec_metrics.observe('http_seconds', time.perf_counter() - started, host=host)
+                    if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                        delay = self._retry_delay(attempt, response.headers.get('Retry-After'))
+                    else:
+                        return SECResponse(url, response.status, response.headers, body)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt >= self.max_retries:
+                    self.stats['errors'] += 1
+                    sec_metrics.count('http_errors', host=host)
+                    raise
+                delay = self._retry_delay(attempt)
+            attempt += 1
+            self.stats['retries'] += 1
+            sec_metrics.count('http_retries', host=host)
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str, headers: Optional[dict] = None, use_cache: bool = False) -> SECResponse:
+        """GET `url`; with `use_cache` the on-disk copy is revalidated and reused on 304."""
+        if not use_cache or self.cache is None:
+            return await self._fetch(url, headers)
+
+        entry = self.cache.lookup(url)
+        if entry is not None:
+            headers = {**(headers or {}), **entry.validators()}
+        response = await self._fetch(url, headers)
+
+        if response.status == 304 and entry is not None:
+            body = await asyncio.to_thread(self.cache.read, entry)
+            if body is not None:
+                self.stats['cache_hits'] += 1
+                self.stats['bytes_saved'] += len(body)
+                sec_metrics.count('http_cache_hits')
+                return SECResponse(url, 200, response.headers, body, from_cache=True)
+            # The body was evicted between lookup and read, fetch it unconditionally
+            response = await self._fetch(url)
+        if response.status == 200:
+            await asyncio.to_thread(self.cache.store, url, response.headers, response.body)
+        return response
+
+    async def get_ok(self, url: str, headers: Optional[dict] = None, use_cache: bool = False) -> SECResponse:
+        """GET `url` and raise SECRequestError unless the final status is 2xx."""
+        response = await self.get(url, headers=headers, use_cache=use_cache)
+        if not response.ok:
+            self.stats['errors'] += 1
+            sec_metrics.count('http_errors', host=urlsplit(url).netloc)
+            raise SECRequestError(url, response.status)
+        return response
+
+    async def get_bytes(self, url: str, use_cache: bool = False) -> bytes:
+        return (await self.get_ok(url, use_cache=use_cache)).body
+
+    async def get_text(self, url: str, use_cache: bool = False) -> str:
+        return (await self.get_ok(url, use_cache=use_cache)).text()
+
+    async def get_json(self, url: str, use_cache: bool = False):
+        return json.loads((await self.get_ok(url, use_cache=use_cache)).body)
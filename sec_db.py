@@ -0,0 +1,322 @@
+import io
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import column, create_engine, inspect, select, table
+
+from config import CONFIG  # Import the config dictionary
+
+FACTS_TABLE = 'sec_facts'
+FILINGS_TABLE = 'filings_data'
+
+# Column name -> (PostgreSQL type, SQLite type)
+FACT_SCHEMA = {
+    'fact_id': ('BIGINT PRIMARY KEY', 'INTEGER PRIMARY KEY'),
+    'Ticker': ('TEXT NOT NULL', 'TEXT NOT NULL'),
+    'Accession': ('TEXT NOT NULL', 'TEXT NOT NULL'),
+    'Taxonomy': ('TEXT', 'TEXT'),
+    'Concept': ('TEXT NOT NULL', 'TEXT NOT NULL'),
+    'Unit': ('TEXT NOT NULL', 'TEXT NOT NULL'),
+    'Value': ('DOUBLE PRECISION', 'REAL'),
+    'Start': ('DATE', 'TEXT'),
+    'End': ('DATE', 'TEXT'),
+    'Fiscal Year': ('INTEGER', 'INTEGER'),
+    'Fiscal Period': ('TEXT', 'TEXT'),
+    'Form': ('TEXT', 'TEXT'),
+    'Filed Date': ('DATE', 'TEXT'),
+    'Frame': ('TEXT', 'TEXT'),
+}
+FILING_SCHEMA = {
+    'accession_number': ('TEXT PRIMARY KEY', 'TEXT PRIMARY KEY'),
+    'ticker': ('TEXT NOT NULL', 'TEXT NOT NULL'),
+    'filing_date': ('DATE', 'TEXT'),
+    'file_size': ('DOUBLE PRECISION', 'REAL'),
+    'form': ('TEXT', 'TEXT'),
+    'content_length': ('INTEGER', 'INTEGER'),
+    'content': ('TEXT', 'TEXT'),
+}
+# What the date and ticker queries of the app filter on
+INDEXES = [
+    (FACTS_TABLE, 'ix_sec_facts_ticker_filed', ['Ticker', 'Filed Date']),
+    (FACTS_TABLE, 'ix_sec_facts_filed', ['Filed Date']),
+    (FACTS_TABLE, 'ix_sec_facts_concept', ['Concept', 'End']),
+    (FILINGS_TABLE, 'ix_filings_data_ticker_date', ['ticker', 'filing_date']),
+    (FILINGS_TABLE, 'ix_filings_data_date', ['filing_date']),
+    (FILINGS_TABLE, 'ix_filings_data_form', ['form', 'filing_date']),
+]
+# A fact is identified by the filing that reported it and what it measures over which period.
+# Start is part of it: a Q3 10-Q reports both the three and the nine months ending on the same End.
+FACT_KEY = ['Ticker', 'Accession', 'Taxonomy', 'Concept', 'Unit', 'Start', 'End']
+DATE_COLUMNS = ['Start', 'End', 'Filed Date', 'filing_date']
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+_engines: Dict[str, object] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(url: Optional[str] = None):
+    """Process-wide pooled engine for `url` (default CONFIG['DATABASE_URL']), created on first use.
+
+    PostgreSQL connections are pinged before reuse and recycled every 30 minutes, so idle
+    connections dropped by a hosted server are replaced instead of failing a query.
+    """
+    url = url or CONFIG['DATABASE_URL']
+    with _engines_lock:
+        if url not in _engines:
+            options = {}
+            if url.startswith('postgresql'):
+                options = {'pool_size': 5, 'max_overflow': 5, 'pool_pre_ping': True, 'pool_recycle': 1800}
+            _engines[url] = create_engine(url, **options)
+        return _engines[url]
+
+
+def dispose_engines() -> None:
+    """Close every pooled connection (e.g. before forking worker processes)."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def check_connection(url: Optional[str] = None) -> dict:
+    """Server time and version through the pooled engine, to check that the database is reachable."""
+    engine = get_engine(url)
+    query = "SELECT NOW(), version()" if engine.dialect.name == 'postgresql' \
+        else "SELECT datetime('now'), sqlite_version()"
+    with engine.connect() as conn:
+        now, version = conn.exec_driver_sql(query).one()
+    return {'dialect': engine.dialect.name, 'time': now, 'version': version}
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def fact_ids(df: pd.DataFrame) -> np.ndarray:
+    """Stable signed 64-bit id of each fact row, hashed from FACT_KEY."""
+    key = pd.DataFrame({col: df[col].astype(str) for col in FACT_KEY})
+    return pd.util.hash_pandas_object(key, index=False).to_numpy().view(np.int64)
+
+
+def _chunks(frames: Iterable[pd.DataFrame], chunk_size: int):
+    # Split oversized frames so no batch sent to the database holds more than chunk_size rows
+    for frame in frames:
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+
+
+class DatabaseSink:
+    """Bulk upserts of facts and filings into CONFIG['DATABASE_URL'].
+
+    PostgreSQL batches are streamed with COPY FROM STDIN into a temporary table and merged with
+    INSERT ... ON CONFLICT DO UPDATE; SQLite batches use executemany with the same upsert.
+    Facts are keyed by `fact_id` (a hash of FACT_KEY), filings by accession number, so loading the
+    same data twice leaves one row each. Batches hold at most `chunk_size` rows and commit one by one.
+    """
+
+    def __init__(self, url: Optional[str] = None, engine=None, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.engine = engine if engine is not None else get_engine(url)
+        self.dialect = self.engine.dialect.name
+        if self.dialect not in ('postgresql', 'sqlite'):
+            raise ValueError(f"Unsupported database {self.dialect!r}, expected PostgreSQL or SQLite")
+        self.chunk_size = chunk_size
+
+    def create_schema(self) -> None:
+        type_index = 0 if self.dialect == 'postgresql' else 1
+        with self.engine.begin() as conn:
+            for table_name, schema in ((FACTS_TABLE, FACT_SCHEMA), (FILINGS_TABLE, FILING_SCHEMA)):
+                columns = ', '.join(f'{_quote(name)} {types[type_index]}' for name, types in schema.items())
+                conn.exec_driver_sql(f'CREATE TABLE IF NOT EXISTS {table_name} ({columns})')
+                # CREATE TABLE IF NOT EXISTS leaves a table of an older schema as it is, e.g. filings_data
+                # without `form`; add the missing columns before indexing them
+                existing = {c['name'] for c in inspect(conn).get_columns(table_name)}
+                for name, types in schema.items():
+                    if name not in existing:
+                        conn.exec_driver_sql(f'ALTER TABLE {table_name} '
+                                             f'ADD COLUMN {_quote(name)} {types[type_index]}')
+            for table_name, name, columns in INDEXES:
+                conn.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS {name} ON {table_name} '
+                                     f'({", ".join(_quote(c) for c in columns)})')
+
+    @staticmethod
+    def _prepare(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+        df = df[[c for c in schema if c in df.columns]].copy()
+        for col in df.columns:
+            if col in DATE_COLUMNS:
+                df[col] = pd.to_datetime(df[col], errors='coerce').dt.strftime('%Y-%m-%d')
+            elif isinstance(df[col].dtype, pd.CategoricalDtype):
+                df[col] = df[col].astype(object)
+        return df.astype(object).where(df.notna(), None)
+
+    def _upsert(self, table: str, df: pd.DataFrame, key: str) -> None:
+        columns = list(df.columns)
+        quoted = ', '.join(_quote(c) for c in columns)
+        updates = ', '.join(f'{_quote(c)} = excluded.{_quote(c)}' for c in columns if c != key)
+        raw = self.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if self.dialect == 'postgresql':
+                staging = f'{table}_staging'
+                cursor.execute(f'CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {table} INCLUDING DEFAULTS)')
+                cursor.execute(f'TRUNCATE {staging}')
+                buffer = io.StringIO()
+                df.to_csv(buffer, index=False, header=False)
+                buffer.seek(0)
+                cursor.copy_expert(f'COPY {staging} ({quoted}) FROM STDIN WITH (FORMAT csv)', buffer)
+                cursor.execute(f'INSERT INTO {table} ({quoted}) SELECT {quoted} FROM {staging} '
+                               f'ON CONFLICT ({_quote(key)}) DO UPDATE SET {updates}')
+            else:
+                placeholders = ', '.join('?' for _ in columns)
+                cursor.executemany(f'INSERT INTO {table} ({quoted}) VALUES ({placeholders}) '
+                                   f'ON CONFLICT ({_quote(key)}) DO UPDATE SET {updates}',
+                                   df.itertuples(index=False, name=None))
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            raise
+        finally:
+            raw.close()
+
+    def upsert_facts(self, frames: Iterable[pd.DataFrame]) -> int:
+        """Upsert fact batches (e.g. FactStore.iter_facts), returns the number of rows sent."""
+        if isinstance(frames, pd.DataFrame):
+            frames = [frames]
+        rows = 0
+        for chunk in _chunks(frames, self.chunk_size):
+            # The same fact can be repeated inside one batch; COPY + ON CONFLICT would reject that
+            prepared = self._prepare(chunk, FACT_SCHEMA)
+            prepared.insert(0, 'fact_id', fact_ids(chunk))
+            prepared = prepared.drop_duplicates('fact_id', keep='last')
+            self._upsert(FACTS_TABLE, prepared, 'fact_id')
+            rows += len(prepared)
+        return rows
+
+    def upsert_filings(self, filings: pd.DataFrame, batch_size: int = 100) -> int:
+        """Upsert filings, reading lazy FilingText contents `batch_size` filings at a time."""
+        from sec_loader import filing_text
+        from sec_sections import detect_form
+
+        rows = 0
+        for start in range(0, len(filings), batch_size):
+            batch = filings.iloc[start:start + batch_size].copy()
+            if 'content' in batch.columns:
+                batch['content'] = [filing_text(content) for content in batch['content']]
+                batch['content_length'] = batch['content'].str.len()
+                batch['form'] = [detect_form(content) for content in batch['content']]
+            prepared = self._prepare(batch, FILING_SCHEMA).drop_duplicates('accession_number', keep='last')
+            self._upsert(FILINGS_TABLE, prepared, 'accession_number')
+            rows += len(prepared)
+        return rows
+
+
+def load_to_database(tickers: Optional[List[str]] = None, url: Optional[str] = None,
+                     chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict:
+    """Upsert the fact store and the filings of `tickers` (default CONFIG['TICKERS']) into the database."""
+    from sec_loader import SECFilingLoader
+    from sec_storage import get_fact_store
+
+    tickers = tickers if tickers is not None else CONFIG['TICKERS']
+    sink = DatabaseSink(url, chunk_size=chunk_size)
+    sink.create_schema()
+    facts = sink.upsert_facts(get_fact_store(CONFIG['BASE_DIR']).iter_facts(batch_size=chunk_size, tickers=tickers))
+
+    # Filing text is only read batch by batch while upserting
+    loader = SECFilingLoader(base_dir=CONFIG['BASE_DIR'])
+    filings_df = loader.load_all_filings(
+        tickers, columns=['ticker', 'accession_number', 'filing_date', 'file_size', 'content'], lazy=True)
+    filings = sink.upsert_filings(filings_df)
+    return {'facts': facts, 'filings': filings}
+
+
+
+def _table(name: str, schema: dict):
+    return table(name, *(column(col) for col in schema))
+
+
+def _read(statement, url: Optional[str], chunksize: Optional[int], dates: List[str]
+          ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    engine = get_engine(url)
+    if chunksize is None:
+        with engine.connect() as conn:
+            return pd.read_sql(statement, conn, parse_dates=dates)
+
+    def _stream():
+        # stream_results makes PostgreSQL use a server-side cursor, so only one chunk is in memory
+        with engine.connect().execution_options(stream_results=True) as conn:
+            yield from pd.read_sql(statement, conn, parse_dates=dates, chunksize=chunksize)
+    return _stream()
+
+
+def query_facts(tickers: Optional[List[str]] = None, start: Optional[str] = None, end: Optional[str] = None,
+                forms: Optional[List[str]] = None, concepts: Optional[List[str]] = None,
+                columns: Optional[List[str]] = None, limit: Optional[int] = None,
+                chunksize: Optional[int] = None, url: Optional[str] = None
+                ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Facts matching the filters (Filed Date between start and end), filtered in SQL.
+
+    Only `columns` are selected (default: every fact column but fact_id). With `chunksize` an
+    iterator of DataFrames is returned instead of one DataFrame.
+    """
+    facts = _table(FACTS_TABLE, FACT_SCHEMA)
+    columns = columns or [c for c in FACT_SCHEMA if c != 'fact_id']
+    statement = select(*(facts.c[col] for col in columns))
+    if tickers is not None:
+        statement = statement.where(facts.c['Ticker'].in_(list(tickers)))
+    if forms is not None:
+        statement = statement.where(facts.c['Form'].in_(list(forms)))
+    if concepts is not None:
+        statement = statement.where(facts.c['Concept'].in_(list(concepts)))
+    if start is not None:
+        statement = statement.where(facts.c['Filed Date'] >= str(pd.Timestamp(start).date()))
+    if end is not None:
+        statement = statement.where(facts.c['Filed Date'] <= str(pd.Timestamp(end).date()))
+    statement = statement.order_by(facts.c['Ticker'], facts.c['Filed Date'].desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    return _read(statement, url, chunksize, [c for c in columns if c in DATE_COLUMNS])
+
+
+def query_filings(tickers: Optional[List[str]] = None, start: Optional[str] = None, end: Optional[str] = None,
+                  forms: Optional[List[str]] = None, columns: Optional[List[str]] = None,
+                  limit: Optional[int] = None, chunksize: Optional[int] = None, url: Optional[str] = None
+                  ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """Filings matching the filters (filing_date between start and end), latest first.
+
+    The full text is only selected when `columns` asks for 'content'.
+    """
+    filings = _table(FILINGS_TABLE, FILING_SCHEMA)
+    columns = columns or [c for c in FILING_SCHEMA if c != 'content']
+    statement = select(*(filings.c[col] for col in columns))
+    if tickers is not None:
+        statement = statement.where(filings.c['ticker'].in_(list(tickers)))
+    if forms is not None:
+        statement = statement.where(filings.c['form'].in_(list(forms)))
+    if start is not None:
+        statement = statement.where(filings.c['filing_date'] >= str(pd.Timestamp(start).date()))
+    if end is not None:
+        statement = statement.where(filings.c['filing_date'] <= str(pd.Timestamp(end).date()))
+    statement = statement.order_by(filings.c['filing_date'].desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    return _read(statement, url, chunksize, [c for c in columns if c in DATE_COLUMNS])
+
+# Upsert BASE_DIR into the database, or check that it is reachable:
+#   python sec_db.py load [--url URL]
+#   python sec_db.py check [--url URL]
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load SEC data into the database or check the connection.")
+    parser.add_argument('command', choices=['load', 'check'])
+    parser.add_argument('--url', help="database URL (default: CONFIG['DATABASE_URL'])")
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        info = check_connection(args.url)
+        print(f"Connected to {info['dialect']}, server time {info['time']}, version {info['version']}")
+    else:
+        counts = load_to_database(url=args.url)
+        print(f"Upserted {counts['facts']} facts and {counts['filings']} filings.")
@@ -0,0 +1,266 @@
+import hashlib
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Iterable, List, Optional, Tuple
+
+import sec_metrics
+from sec_sections import SectionIndex, parse_sections
+
+# Sentence ends: terminal punctuation followed by whitespace and an upper-case letter, digit,
+# quote or bracket. Filing text is one whitespace-joined line, so this is the only structure left.
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?;])\s+(?=[A-Z0-9"\'(\[])')
+
+# Above this edit distance Myers gives up and the passages are compared as fingerprint sets
+DEFAULT_MAX_EDITS = 4000
+# Removed/added passages at least this similar are reported as one modified passage
+MODIFIED_RATIO = 0.6
+# How far ahead in a changed block a removed passage looks for its modified counterpart
+PAIRING_WINDOW = 8
+
+
+@dataclass
+class Passage:
+    index: int
+    section: str
+    text: str
+
+
+@dataclass
+class DiffResult:
+    added: List[Passage] = field(default_factory=list)
+    removed: List[Passage] = field(default_factory=list)
+    modified: List[Tuple[Passage, Passage]] = field(default_factory=list)
+    method: str = 'myers'
+
+    @property
+    def unchanged(self) -> bool:
+        return not (self.added or self.removed or self.modified)
+
+
+def split_passages(text: str, min_length: int = 3, sections: Optional[SectionIndex] = None) -> List[Passage]:
+    """Split cleaned filing text into sentences, labelled with the item section they fall in."""
+    text = ' '.join(text.split())
+    if sections is None:
+        sections = parse_sections(text)
+    boundaries = sorted((s.start, s.name) for s in sections.sections)
+    passages = []
+    section, next_boundary = '', 0
+    offset = 0
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        start = text.find(sentence, offset)
+        offset = start + len(sentence)
+        while next_boundary < len(boundaries) and boundaries[next_boundary][0] <= start:
+            section = boundaries[next_boundary][1]
+            next_boundary += 1
+        if len(sentence) >= min_length:
+            passages.append(Passage(len(passages), section, sentence))
+    return passages
+
+
+def fingerprint(text: str) -> int:
+    """64-bit hash of a passage, insensitive to case and whitespace."""
+    normalised = ' '.join(text.lower().split()).encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(normalised, digest_size=8).digest(), 'little')
+
+
+def myers_diff(a: List[int], b: List[int], max_edits: Optional[int] = None) -> Optional[List[Tuple[str, int, int]]]:
+    """Myers' O((N+M)D) shortest edit script between two hash sequences.
+
+    Returns ('equal' | 'delete' | 'insert', i, j) operations in order, where i / j index `a` / `b`,
+    or None when more than `max_edits` edits would be needed.
+    """
+    # Common prefix and suffix cost nothing and are most of a quarter-on-quarter filing
+    prefix = 0
+    while prefix < len(a) and prefix < len(b) and a[prefix] == b[prefix]:
+        prefix += 1
+    suffix = 0
+    while (suffix < len(a) - prefix and suffix < len(b) - prefix
+           and a[len(a) - 1 - suffix] == b[len(b) - 1 - suffix]):
+        suffix += 1
+    a_mid, b_mid = a[prefix:len(a) - suffix], b[prefix:len(b) - suffix]
+    n, m = len(a_mid), len(b_mid)
+    limit = n + m if max_edits is None else min(n + m, max_edits)
+
+    # v[offset + k] is the furthest x reached on diagonal k. After round d its diagonals -d, -d+2, ..., d
+    # are appended to `trace` (round d starts at d * (d + 1) // 2): flat ints, about 2 * D**2 bytes
+    # for D edits, instead of a dict copy of the whole frontier per round
+    offset = limit + 1
+    v = array('i', bytes(4 * (2 * limit + 3)))
+    trace = array('i')
+    rounds = None
+    if n == 0 and m == 0:
+        rounds = 0
+    for d in range(limit + 1):
+        if rounds is not None:
+            break
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a_mid[x] == b_mid[y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                rounds = d
+                break
+        trace.extend(v[offset - d:offset + d + 1:2])
+    if rounds is None:
+        return None
+
+    def _frontier(d, k):
+        return trace[d * (d + 1) // 2 + (k + d) // 2]
+
+    # Walk the saved frontiers backwards to recover the edit script
+    ops = []
+    x, y = n, m
+    for d in range(rounds, 0, -1):
+        k = x - y
+        if k == -d or (k != d and _frontier(d - 1, k - 1) < _frontier(d - 1, k + 1)):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = _frontier(d - 1, prev_k)
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            ops.append(('equal', x, y))
+        if x == prev_x:
+            ops.append(('insert', x, prev_y))
+        else:
+            ops.append(('delete', prev_x, y))
+        x, y = prev_x, prev_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        ops.append(('equal', x, y))
+    ops.reverse()
+
+    script = [('equal', i, i) for i in range(prefix)]
+    script.extend((op, i + prefix, j + prefix) for op, i, j in ops)
+    script.extend(('equal', len(a) - suffix + s, len(b) - suffix + s) for s in range(suffix))
+    return script
+
+
+def _similar(old: str, new: str) -> bool:
+    matcher = SequenceMatcher(None, old.split(), new.split(), autojunk=False)
+    return matcher.real_quick_ratio() >= MODIFIED_RATIO and matcher.quick_ratio() >= MODIFIED_RATIO \
+        and matcher.ratio() >= MODIFIED_RATIO
+
+
+def _pair_block(removed: List[Passage], added: List[Passage], result: DiffResult) -> None:
+    """Report removed/added passages of one changed block, pairing similar ones as modified."""
+    j = 0
+    for old in removed:
+        match = None
+        for candidate in range(j, min(j + PAIRING_WINDOW, len(added))):
+            if _similar(old.text, added[candidate].text):
+                match = candidate
+                break
+        if match is None:
+            result.removed.append(old)
+            continue
+        result.added.extend(added[j:match])
+        result.modified.append((old, added[match]))
+        j = match + 1
+    result.added.extend(added[j:])
+
+
+def diff_passages(old: List[Passage], new: List[Passage], max_edits: int = DEFAULT_MAX_EDITS) -> DiffResult:
+    """Align two passage lists on their fingerprints and classify the changes."""
+    old_hashes = [fingerprint(p.text) for p in old]
+    new_hashes = [fingerprint(p.text) for p in new]
+    script = myers_diff(old_hashes, new_hashes, max_edits=max_edits)
+
+    if script is None:
+        # Too different for an alignment to mean much, compare the fingerprint sets instead
+        result = DiffResult(method='fingerprint-set')
+        old_set, new_set = set(old_hashes), set(new_hashes)
+        removed = [p for p, h in zip(old, old_hashes) if h not in new_set]
+        added = [p for p, h in zip(new, new_hashes) if h not in old_set]
+        _pair_block(removed, added, result)
+        return result
+
+    result = DiffResult()
+    removed, added = [], []
+    for op, i, j in script:
+        if op == 'equal':
+            if removed or added:
+                _pair_block(removed, added, result)
+                removed, added = [], []
+        elif op == 'delete':
+            removed.append(old[i])
+        else:
+            added.append(new[j])
+    if removed or added:
+        _pair_block(removed, added, result)
+    return result
+
+
+def diff_texts(old_text: str, new_text: str, max_edits: int = DEFAULT_MAX_EDITS,
+               section: Optional[str] = None) -> DiffResult:
+    """Diff two filing texts, or only their `section` item (e.g. 'risk_factors') when given."""
+    if section is not None:
+        old_text = parse_sections(old_text).slice(old_text, section) or ''
+        new_text = parse_sections(new_text).slice(new_text, section) or ''
+    return diff_passages(split_passages(old_text), split_passages(new_text), max_edits=max_edits)
+
+
+def format_diff(result: DiffResult, max_passages: Optional[int] = None) -> str:
+    """Readable report of a DiffResult, grouped as added / removed / modified passages."""
+    if result.unchanged:
+        return "No differences"
+
+    def _label(passage):
+        return f"[{passage.section}] " if passage.section else ""
+
+    def _limited(items):
+        return items if max_passages is None else items[:max_passages]
+
+    output = []
+    if result.added:
+        output.append(f"Added passages ({len(result.added)}, in the latest filing):")
+        for p in _limited(result.added):
+            output.append(f"  Passage {p.index + 1}: {_label(p)}{p.text}")
+    if result.removed:
+        output.append(f"Removed passages ({len(result.removed)}, from the previous filing):")
+        for p in _limited(result.removed):
+            output.append(f"  Passage {p.index + 1}: {_label(p)}{p.text}")
+    if result.modified:
+        output.append(f"Modified passages ({len(result.modified)}):")
+        for old, new in _limited(result.modified):
+            output.append(f"  Passage {old.index + 1} -> {new.index + 1}: {_label(new)}\n"
+                          f"    - {old.text}\n    + {new.text}")
+    return "\n\n".join(output)
+
+
+def _compare_worker(pair) -> str:
+    from sec_loader import filing_text
+
+    previous, latest = pair
+    if previous is None:
+        return "No previous filing to compare"
+    return format_diff(diff_texts(filing_text(previous), filing_text(latest)))
+
+
+def compare_filings(pairs: Iterable[Tuple[Optional[object], object]], workers: Optional[int] = None) -> List[str]:
+    """Diff reports for (previous, latest) filing contents, one process per pair when possible.
+
+    Contents may be strings or lazy FilingText handles (which are then read in the workers).
+    """
+    from sec_loader import resolve_workers
+
+    pairs = list(pairs)
+    workers = min(resolve_workers(workers), len(pairs))
+    sec_metrics.count('filings_compared', len(pairs))
+    with sec_metrics.span('diff'):
+        if workers <= 1:
+            return [_compare_worker(pair) for pair in pairs]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(_compare_worker, pairs))
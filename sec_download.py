@@ -1,112 +1,218 @@
 import os
+import hashlib
 import pandas as pd
 import asyncio
-from nlp_functions import pull_sec_data_single_ticker, fetch_cik_from_ticker
-import datamule as dm
-import aiohttp
-import subprocess
+import json
+import sys
+from nlp_functions import pull_sec_data_single_ticker, fetch_cik_from_ticker, fetch_company_facts, split_by_units
 from config import CONFIG  # Import the config dictionary
+import sec_metrics
+from http_cache import HTTPCache
+from sec_client import SECClient
+from text_cache import file_sha256
+from sec_manifest import IngestManifest, default_manifest_path
+from sec_scheduler import print_progress, run_tickers
+from sec_storage import get_fact_store
+
+# Function to list a company's filings of the given forms (and their amendments) filed between start and end,
+# from the submissions API instead of scraping the browse-edgar page
+async def fetch_filing_index(cik, client, forms, start=None, end=None):
+    data = await client.get_json(f'{client.data_url}/submissions/CIK{str(cik).zfill(10)}.json', use_cache=True)
+    recent = data.get('filings', {}).get('recent', {})
+    filings = []
+    for accession, form, filed, document in zip(recent.get('accessionNumber', []), recent.get('form', []),
+                                                recent.get('filingDate', []), recent.get('primaryDocument', [])):
+        if form.split('/')[0] not in forms or not document:
+            continue
+        if (start and filed < start) or (end and filed > end):
+            continue
+        filings.append({'accession': accession.replace('-', ''), 'form': form, 'filed': filed, 'document': document})
+    return filings
+
+# Function to save a downloaded document and hash it on the way, run in a thread off the event loop
+def write_filing(filing_path, body):
+    with open(filing_path, 'wb') as f:
+        f.write(body)
+    return hashlib.sha256(body).hexdigest()
+
+# Function to download one filing document (an entry of fetch_filing_index) unless the manifest already has it.
+# Returns the path of the document on disk and whether it was downloaded, or None if the download failed.
+async def download_filing(ticker, cik, filing, filing_dir, client, manifest=None, force=False):
+    accession = filing['accession']
+    extension = os.path.splitext(filing['document'])[1] or '.htm'
+    filing_name = f"{accession}_{filing['filed']}{extension}"
+    filing_path = os.path.join(filing_dir, filing_name)
+    filing_url = f"{client.www_url}/Archives/edgar/data/{int(cik)}/{accession}/{filing['document']}"
+
+    if manifest is not None and not force:
+        if manifest.has_filing(ticker, accession):
+            return manifest.filing(ticker, accession)['path'], False
+        if os.path.exists(filing_path):
+            # Downloaded before the manifest existed (or by the notebook), keep it
+            sha256 = await asyncio.to_thread(file_sha256, filing_path)
+            manifest.record_filing(ticker, cik, accession, filing['form'], filing['filed'], filing_path, filing_url,
+                                   sha256=sha256)
+            return filing_path, False
 
-# Function to download filings for a given ticker
-async def download_filings(ticker, cik, base_dir):
-    url = f'https://www.sec.gov/cgi-bin/browse-edgar?CIK={cik}&action=getcompany'
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                html = await response.text()
-                filing_links = []
-                start_index = html.find('<a href="')
-                while start_index != -1:
-                    end_index = html.find('"', start_index + 9)
-                    link = html[start_index + 9:end_index]
-                    if link.endswith('.htm') or link.endswith('.xml'):
-                        filing_links.append('https://www.sec.gov' + link)
-                    start_index = html.find('<a href="', end_index)
-                
-                filing_dir = os.path.join(base_dir, ticker, 'filings')
-                if not os.path.exists(filing_dir):
-                    os.makedirs(filing_dir)
-
-                for filing_url in filing_links:
-                    filing_name = filing_url.split('/')[-1]
-                    filing_path = os.path.join(filing_dir, filing_name)
-                    
-                    try:
-                        async with session.get(filing_url) as filing_response:
-                            if filing_response.status == 200:
-                                with open(filing_path, 'wb') as f:
-                                    f.write(await filing_response.read())
-                                print(f"Downloaded filing: {filing_name}")
-                            else:
-                                print(f"Failed to download filing: {filing_name}")
-                    except Exception as e:
-                        print(f"Error downloading filing {filing_url}: {str(e)}")
-            else:
-                print(f"Failed to fetch filings page for ticker {ticker}")
-
-# Function to process SEC data for multiple tickers and save as CSV
-async def process_sec_data(tickers, start, end, base_dir):
+    try:
+        # Revalidated through the HTTP cache: a full refresh does not download unchanged documents again
+        filing_response = await client.get(filing_url, use_cache=True)
+        if filing_response.status == 200:
+            os.makedirs(filing_dir, exist_ok=True)
+            sha256 = await asyncio.to_thread(write_filing, filing_path, filing_response.body)
+            if manifest is not None:
+                manifest.record_filing(ticker, cik, accession, filing['form'], filing['filed'], filing_path,
+                                       filing_url, sha256=sha256)
+            sec_metrics.count('filings_downloaded', ticker=ticker)
+            sec_metrics.count('filing_bytes', len(filing_response.body), ticker=ticker)
+            print(f"Downloaded filing: {filing_name}")
+            return filing_path, True
+        print(f"Failed to download filing: {filing_name}")
+    except Exception as e:
+        print(f"Error downloading filing {filing_url}: {str(e)}")
+    return None
+
+# Function to download the filings of a ticker that are not on disk yet. Filings are saved as
+# <accession>_<filing date>.htm and recorded in the manifest; with `force` everything is downloaded again.
+async def download_filings(ticker, cik, base_dir, client, manifest=None, start=None, end=None, forms=None,
+                           force=False):
+    forms = forms or CONFIG.get('FILING_FORMS', ['10-Q'])
+    try:
+        filings = await fetch_filing_index(cik, client, forms, start=start, end=end)
+    except Exception as e:
+        print(f"Failed to fetch filings index for ticker {ticker}: {str(e)}")
+        return 0
+
+    filing_dir = os.path.join(base_dir, ticker, 'filings')
+    if not os.path.exists(filing_dir):
+        os.makedirs(filing_dir)
+
+    downloaded = 0
+    for filing in filings:
+        result = await download_filing(ticker, cik, filing, filing_dir, client, manifest=manifest, force=force)
+        if result is not None and result[1]:
+            downloaded += 1
+    return downloaded
+
+# Save the raw companyfacts JSON where SECFilingLoader.load_company_concepts reads it
+# (blocking, so it runs in a worker thread)
+def save_company_concepts(ticker, cik, body, base_dir):
+    concepts_dir = os.path.join(base_dir, ticker, 'company_concepts')
+    os.makedirs(concepts_dir, exist_ok=True)
+    concepts_path = os.path.join(concepts_dir, f'CIK{str(cik).zfill(10)}.json')
+    with open(f'{concepts_path}.tmp', 'wb') as f:
+        f.write(body)
+    os.replace(f'{concepts_path}.tmp', concepts_path)
+
+# Write a ticker's filtered facts and per-unit partitions (blocking, so it runs in a worker thread)
+def save_ticker_data(ticker, df_filtered, unit_dfs, store):
+    with sec_metrics.span('fact_write', ticker=ticker):
+        store.write_ticker(ticker, df_filtered, unit_dfs)
+    print(f"Data for ticker {ticker} ({', '.join(unit_dfs)}) saved successfully to the {store.name} store.")
+
+# Append a ticker's new fact rows to the store (blocking, so it runs in a worker thread)
+def append_ticker_data(ticker, df_new, unit_dfs, store):
+    with sec_metrics.span('fact_write', ticker=ticker):
+        store.append_ticker(ticker, df_new, unit_dfs)
+    print(f"Appended {len(df_new)} new facts for ticker {ticker} to the {store.name} store.")
+
+# Function to pull, save and download filings for a single ticker. With a manifest only what is new
+# since the last run is written: fact rows of unseen accessions are appended and known filings are skipped.
+# Returns the fact rows written and whether they were appended (False means the ticker was rewritten).
+async def process_ticker(ticker, start, end, base_dir, client, store, manifest=None, full=False):
+    # Look the CIK up once and reuse it for the facts and the filings
+    with sec_metrics.span('cik_lookup', ticker=ticker):
+        cik = await fetch_cik_from_ticker(ticker, client)
+
+    # Download the companyfacts once: keep the raw JSON for the loader and flatten it for the fact store
+    with sec_metrics.span('companyfacts_fetch', ticker=ticker):
+        body = await fetch_company_facts(cik, client)
+    await asyncio.to_thread(save_company_concepts, ticker, cik, body, base_dir)
+
+    # Pull SEC data for the single ticker, filtered by the start and end dates
+    with sec_metrics.span('flatten', ticker=ticker):
+        df_filtered, unit_dfs = await pull_sec_data_single_ticker(ticker, client, cik=cik, start=start, end=end,
+                                                                  company_data=json.loads(body))
+
+    incremental = (manifest is not None and not full and manifest.can_append_facts(ticker, start, end)
+                   and store.has_ticker(ticker))
+    if incremental:
+        df_new = df_filtered[~df_filtered['Accession'].isin(manifest.fact_accessions(ticker))]
+        if df_new.empty:
+            print(f"No new facts for ticker {ticker}.")
+        else:
+            await asyncio.to_thread(append_ticker_data, ticker, df_new, split_by_units(df_new), store)
+    else:
+        df_new = df_filtered
+        # Storage writes are blocking, keep them off the event loop so other tickers keep downloading
+        await asyncio.to_thread(save_ticker_data, ticker, df_filtered, unit_dfs, store)
+
+    if manifest is not None:
+        manifest.record_facts(ticker, cik, df_new, start, end, replace=not incremental)
+    sec_metrics.count('facts', len(df_new), ticker=ticker)
+
+    # Download the filing documents not already on disk
+    with sec_metrics.span('filings_download', ticker=ticker):
+        await download_filings(ticker, cik, base_dir, client, manifest=manifest, start=start, end=end, force=full)
+
+    if manifest is not None:
+        manifest.save()
+    return df_new, incremental
+
+# Function to process SEC data for multiple tickers and save it to the configured fact store.
+# Tickers run concurrently (at most `max_concurrency` at a time) over one pooled SECClient,
+# whose RateLimiter keeps every request of the run under EDGAR's fair-access limit.
+# The ingestion manifest in base_dir makes reruns incremental; `full=True` rewrites and re-downloads everything.
+async def process_sec_data(tickers, start, end, base_dir, max_concurrency=None, requests_per_second=None, client=None,
+                           full=False, on_progress=print_progress):
     if not os.path.exists(base_dir):
         os.makedirs(base_dir)
 
-    downloader = dm.Downloader()
-    all_data = []
-
-    for ticker in tickers:
-        try:
-            # Pull SEC data for the single ticker
-            df, unit_dfs = await pull_sec_data_single_ticker(ticker, downloader)
-            # Filter by the start and end dates
-            df_filtered = df[(df['Filed Date'] >= start) & (df['Filed Date'] <= end)]
-
-            # Add a column for the ticker
-            df_filtered['Ticker'] = ticker
-
-            # Create directory for the ticker's data
-            ticker_dir = os.path.join(base_dir, ticker)
-            if not os.path.exists(ticker_dir):
-                os.makedirs(ticker_dir)
+    if max_concurrency is None:
+        max_concurrency = CONFIG.get('MAX_CONCURRENCY', 8)
 
-            # Save the filtered data for the ticker
-            df_filtered.to_csv(f'{ticker_dir}/sec_data_{ticker}.csv', index=False)
-            print(f"Data for ticker {ticker} saved successfully.")
+    # A client passed in belongs to the caller, who may reuse it after this run
+    owns_client = client is None
+    if owns_client:
+        client = SECClient(requests_per_second=requests_per_second, cache=HTTPCache())
+    store = get_fact_store(base_dir)
+    manifest = IngestManifest(default_manifest_path(base_dir))
 
-            # Process each unit dataframe, filter and save
-            for unit_name, unit_df in unit_dfs.items():
-                unit_df_filtered = unit_df[(unit_df['Filed Date'] >= start) & (unit_df['Filed Date'] <= end)]
-                # Add the ticker to the unit dataframe as well
-                unit_df_filtered['Ticker'] = ticker
-                unit_df_filtered.to_csv(f'{ticker_dir}/{unit_name}_{ticker}.csv', index=False)
-                print(f"Unit data for {unit_name} of ticker {ticker} saved successfully.")
+    async def worker(ticker):
+        # Spans inside a ticker measure wall time, waits on the rate limiter and other tickers included
+        with sec_metrics.span('ticker', ticker=ticker):
+            return await process_ticker(ticker, start, end, base_dir, client, store, manifest=manifest, full=full)
 
-            # Append the filtered data to the all_data list
-            all_data.append(df_filtered)
-
-            # Fetch CIK and download filings (not sure what this is for, but leaving as is)
-            cik = await fetch_cik_from_ticker(ticker, downloader.headers)
-            await download_filings(ticker, cik, base_dir)
-
-        except Exception as e:
-            print(f"Failed to process data for ticker {ticker}: {str(e)}")
+    await client.open()
+    try:
+        summary = await run_tickers(tickers, worker, max_concurrency=max_concurrency, on_progress=on_progress)
+    finally:
+        if owns_client:
+            await client.close()
+    print(f"Processed {len(summary.succeeded)}/{len(tickers)} tickers in {summary.elapsed:.1f}s "
+          f"({client.stats['requests']} requests, {client.stats['retries']} retries, "
+          f"{client.stats['cache_hits']} served from cache, {client.stats['bytes'] / 1024 ** 2:.1f} MB downloaded).")
+    for result in summary.failed:
+        print(f"Failed to process data for ticker {result.ticker}: {result.error}")
+
+    all_data = [result.value[0] for result in summary.succeeded]
+    if not all_data:
+        print("No ticker data was downloaded, skipping the combined data.")
+        return summary
 
     # Combine all data into a single DataFrame
     all_data_df = pd.concat(all_data, ignore_index=True)
-    
-    # Save the combined data with tickers to a CSV file
-    all_data_df.to_csv(f'{base_dir}/sec_data_all_tickers.csv', index=False)
-    print(f"Combined data for all tickers saved to sec_data_all_tickers.csv.")
 
-# Function to run the Jupyter notebook
-def run_notebook(notebook_path):
-    try:
-        print(f"Running Jupyter notebook: {notebook_path}")
-        subprocess.run(['jupyter', 'nbconvert', '--to', 'notebook', '--execute', notebook_path], check=True)
-        print(f"Successfully ran notebook: {notebook_path}")
-    except subprocess.CalledProcessError as e:
-        print(f"Error running notebook: {e}")
-    except Exception as e:
-        print(f"An unexpected error occurred while running the notebook: {e}")
+    # Save the combined data with tickers (the CSV backend writes sec_data_all_tickers.csv)
+    with sec_metrics.span('combined_write'):
+        if not any(result.value[1] for result in summary.succeeded):
+            await asyncio.to_thread(store.write_combined, all_data_df)
+        else:
+            # Some tickers only appended rows: keep their stored rows, replace the rewritten tickers
+            rewritten = [result.ticker for result in summary.succeeded if not result.value[1]]
+            await asyncio.to_thread(store.update_combined, all_data_df, rewritten)
+    print(f"Combined data for all tickers saved to the {store.name} store ({len(all_data_df)} new or rewritten facts).")
+    return summary
 
 # Main function to run the processing
 def main():
@@ -115,13 +221,11 @@ def main():
     start = CONFIG['START_DATE']
     end = CONFIG['END_DATE']
     base_dir = CONFIG['BASE_DIR']
-    notebook_path = 'sec_filings_download.ipynb'  # Path to your Jupyter notebook
-
-    # Run the process
-    asyncio.run(process_sec_data(tickers, start, end, base_dir))
 
-    # Run the Jupyter notebook after processing SEC data
-    run_notebook(notebook_path)
+    # Run the process, only fetching what is new since the last run unless --full is given
+    full = '--full' in sys.argv[1:]
+    # This also saves the company concepts and the 10-Q documents that sec_filings_download.ipynb used to fetch
+    asyncio.run(process_sec_data(tickers, start, end, base_dir, full=full))
 
 # Run the script
 if __name__ == '__main__':
@@ -0,0 +1,305 @@
+import asyncio
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from config import CONFIG  # Import the config dictionary
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+MAX_MESSAGES = 200  # Log lines kept per job for the UI
+MAX_FINISHED_JOBS = 20  # Finished jobs kept in the table
+LOCK_FILE = os.path.join('.cache', 'pipeline.lock')  # Relative to BASE_DIR
+
+
+class JobAlreadyRunning(RuntimeError):
+    """Raised when a pipeline run is requested while another one is still active."""
+
+    def __init__(self, job: 'Job'):
+        super().__init__(f"Job {job.name} ({job.id}) is already {job.status}")
+        self.job = job
+
+
+@dataclass
+class Job:
+    id: str
+    name: str
+    status: str = QUEUED
+    stage: str = ''
+    done: int = 0
+    total: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    result: object = None
+    messages: deque = field(default_factory=lambda: deque(maxlen=MAX_MESSAGES))
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def fraction(self) -> float:
+        return self.done / self.total if self.total else 0.0
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def log(self, message: str) -> None:
+        self.messages.append(f"{time.strftime('%H:%M:%S')} {message}")
+
+    def set_stage(self, stage: str, total: int = 0) -> None:
+        self.stage, self.done, self.total = stage, 0, total
+        self.log(f"Stage: {stage}")
+
+    def advance(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        self.done = done
+        if total is not None:
+            self.total = total
+        if message:
+            self.log(message)
+
+    def snapshot(self) -> dict:
+        """Plain copy of the job for rendering, safe to read while the worker keeps updating it."""
+        return {'id': self.id, 'name': self.name, 'status': self.status, 'stage': self.stage,
+                'done': self.done, 'total': self.total, 'fraction': self.fraction, 'elapsed': self.elapsed,
+                'error': self.error, 'messages': list(self.messages)}
+
+
+class PipelineLock:
+    """Lock file with the owner's PID, so two app processes sharing a BASE_DIR never run at once.
+
+    A lock left by a process that no longer exists is taken over.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def acquire(self) -> bool:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if self._owner_alive():
+                    return False
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with os.fdopen(fd, 'w') as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def _owner_alive(self) -> bool:
+        try:
+            with open(self.path, 'r') as f:
+                pid = int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return False
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def release(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class JobRunner:
+    """In-process job table with one worker thread per job and at most one active job.
+
+    Streamlit reruns the app script for every interaction and user, but imported modules are
+    shared, so the module-level runner (get_job_runner) is what all sessions see. The UI polls
+    `latest()` / `get()` instead of blocking on the run.
+    """
+
+    def __init__(self, lock_path: Optional[str] = None):
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._file_lock = PipelineLock(lock_path) if lock_path else None
+
+    def start(self, name: str, func: Callable[..., object], *args, **kwargs) -> Job:
+        """Run `func(job, *args, **kwargs)` in a background thread, raising JobAlreadyRunning
+        if a job is still active here or in another process holding the lock file."""
+        with self._lock:
+            active = self.active()
+            if active is not None:
+                raise JobAlreadyRunning(active)
+            job = Job(id=uuid.uuid4().hex[:12], name=name)
+            if self._file_lock is not None and not self._file_lock.acquire():
+                job.status = FAILED
+                job.error = "Another process is already running the pipeline on this data directory"
+                raise JobAlreadyRunning(job)
+            self._jobs[job.id] = job
+            self._prune()
+        thread = threading.Thread(target=self._run, args=(job, func, args, kwargs), name=f'job-{job.id}',
+                                  daemon=True)
+        thread.start()
+        return job
+
+    def _run(self, job: Job, func, args, kwargs) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        job.log(f"Started {job.name}")
+        status = FAILED
+        try:
+            job.result = func(job, *args, **kwargs)
+            status = SUCCEEDED
+            job.log(f"Finished in {job.elapsed:.1f}s")
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.log(traceback.format_exc(limit=5))
+        finally:
+            job.finished_at = time.time()
+            if self._file_lock is not None:
+                self._file_lock.release()
+            # Finished only once the lock file is gone, so a start() that sees it inactive can take the lock
+            job.status = status
+
+    def _prune(self) -> None:
+        # Caller holds the lock
+        finished = sorted((j for j in self._jobs.values() if not j.active), key=lambda j: j.created_at)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def active(self) -> Optional[Job]:
+        for job in list(self._jobs.values()):
+            if job.active:
+                return job
+        return None
+
+    def latest(self) -> Optional[Job]:
+        jobs = list(self._jobs.values())
+        return max(jobs, key=lambda j: j.created_at) if jobs else None
+
+    def jobs(self) -> List[Job]:
+        return sorted(self._jobs.values(), key=lambda j: j.created_at, reverse=True)
+
+
+_runner: Optional[JobRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Process-wide runner whose lock file lives under BASE_DIR/.cache."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(os.path.join(CONFIG['BASE_DIR'], LOCK_FILE))
+        return _runner
+
+
+# Pipeline stages, importable and usable without the UI
+
+
+def cleanup_stage(job: Job, base_dir: str, keep_cache: bool = False) -> dict:
+    """Empty base_dir for a full refresh, or with `keep_cache` only delete its stale artifacts."""
+    from file_deletion import cleanup_base_dir
+    from sec_loader import close_text_caches
+    from sec_search import close_search_indexes
+
+    job.set_stage('cleanup')
+    if not keep_cache:
+        # The text cache and search index are deleted with the rest, do not keep writing to the open files
+        close_text_caches(base_dir)
+        close_search_indexes(base_dir)
+    # The lock file of this run stays in place
+    summary = cleanup_base_dir(base_dir, keep_cache=keep_cache, preserve=[LOCK_FILE])
+    for process in summary['terminated']:
+        job.log(f"Terminated {process}, which was using a file in {base_dir}")
+    if keep_cache:
+        job.log(f"Removed {len(summary['stale'])} stale files and directories, caches kept")
+    else:
+        job.log(f"Emptied {base_dir}, the old files are removed in the background")
+    return summary
+
+
+def download_stage(job: Job, tickers: List[str], start: str, end: str, base_dir: str, full: bool = False):
+    """Facts, company concepts and filing documents of every ticker (sec_download.process_sec_data)."""
+    from sec_download import process_sec_data
+
+    job.set_stage('download', total=len(tickers))
+
+    def on_progress(done, total, result):
+        status = 'ok' if result.ok else f'failed: {result.error}'
+        job.advance(done, total, f"[{done}/{total}] {result.ticker} {status} ({result.elapsed:.1f}s)")
+
+    summary = asyncio.run(process_sec_data(tickers, start, end, base_dir, full=full, on_progress=on_progress))
+    if not summary.succeeded:
+        raise RuntimeError(f"No ticker could be downloaded ({len(summary.failed)} failed)")
+    return summary
+
+
+def extract_stage(job: Job, tickers: List[str], base_dir: str) -> int:
+    """Extract the text (into the text cache), section index and full-text entry of every downloaded filing."""
+    from sec_loader import SECFilingLoader
+
+    loader = SECFilingLoader(base_dir=base_dir)
+    file_paths = [path for ticker in tickers for path in loader.list_filings(ticker)]
+    job.set_stage('extract', total=len(file_paths))
+    for done, (file_path, clean_text) in enumerate(loader.iter_extracted_texts(file_paths), start=1):
+        if clean_text:
+            loader.index_filing(file_path, clean_text)
+        job.advance(done, message=f"Extracted {os.path.basename(file_path)}" if done % 25 == 0 else None)
+    job.log(f"Extracted {len(file_paths)} filings")
+    return len(file_paths)
+
+
+def run_pipeline(job: Job, tickers: Optional[List[str]] = None, start: Optional[str] = None,
+                 end: Optional[str] = None, base_dir: Optional[str] = None, full: bool = False,
+                 keep_cache: bool = False) -> dict:
+    """Download then extract, for CONFIG's tickers and dates unless given. Job entry point.
+
+    A `full` refresh first cleans up base_dir (see cleanup_stage) and downloads everything again.
+    The result includes the run's metrics report, which is also written to BASE_DIR/.cache/metrics.
+    """
+    import sec_metrics
+
+    tickers = tickers if tickers is not None else CONFIG['TICKERS']
+    start = start or CONFIG['START_DATE']
+    end = end or CONFIG['END_DATE']
+    base_dir = base_dir or CONFIG['BASE_DIR']
+
+    # Timings and counters of this run go to BASE_DIR/.cache/metrics (see sec_metrics.py), also when it fails
+    metrics = sec_metrics.start_run('pipeline')
+    try:
+        if full:
+            with metrics.span('cleanup'):
+                cleanup_stage(job, base_dir, keep_cache=keep_cache)
+        with metrics.span('download'):
+            summary = download_stage(job, tickers, start, end, base_dir, full=full)
+        with metrics.span('extract'):
+            filings = extract_stage(job, [r.ticker for r in summary.succeeded], base_dir)
+    finally:
+        report_path, _ = metrics.write(sec_metrics.default_metrics_dir(base_dir))
+        job.log(f"Run report written to {report_path}")
+    return {'succeeded': [r.ticker for r in summary.succeeded],
+            'failed': {r.ticker: str(r.error) for r in summary.failed}, 'filings': filings,
+            'metrics': metrics.report()}
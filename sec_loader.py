@@ -1,121 +1,428 @@
 import os
 import logging
+import time
 import warnings
 import json
 import pandas as pd
-from datetime import datetime
 from glob import glob
-from typing import List, Optional
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from config import CONFIG  # Import the config dictionary
-from selectolax.parser import HTMLParser
-from sqlalchemy import create_engine
+import sec_metrics
+from sec_storage import get_fact_store
+from text_cache import TextCache
+from text_stream import extract_text as stream_text
+from nlp_functions import CATEGORICAL_COLUMNS, FACT_COLUMNS, flatten_json_data
+from sec_search import SearchIndex, default_index_path, shared_search_index
+from sec_sections import SectionIndex, detect_form, load_index, parse_sections, save_index
 
-# Suppress warnings
-warnings.filterwarnings("ignore")
+_initialized = False
 
-# Get today's date
-today = datetime.today()
-today_date = today.strftime('%Y-%m-%d')
 
-tickers = CONFIG['TICKERS']
-start = CONFIG['START_DATE']
-end = CONFIG['END_DATE']
-base_dir = CONFIG['BASE_DIR']
+# Function to set up logging and suppress library warnings, once per process. Called by SECFilingLoader
+# rather than at import, so importing this module (st_app, sec_processor, worker processes) has no side effects
+def init_loader() -> None:
+    global _initialized
+    if not _initialized:
+        warnings.filterwarnings("ignore")
+        logging.basicConfig(level=logging.INFO)
+        _initialized = True
+
+
+def extract_text_from_html(file_path: str, streaming: Optional[bool] = None) -> str:
+    """Extract clean text from HTML filing using selectolax (faster than BeautifulSoup).
+
+    The selectolax DOM needs about ten times the file size in memory and its text() slows down
+    more than linearly, so filings of CONFIG['STREAM_EXTRACT_MB'] or more are streamed through
+    text_stream.py instead, which gives the same text in flat memory. `streaming` forces one or
+    the other; False is the compatibility mode, always the DOM.
+    """
+    if streaming is None:
+        limit = CONFIG.get('STREAM_EXTRACT_MB')
+        streaming = limit is not None and os.path.getsize(file_path) >= limit * 1024 * 1024
+    if streaming:
+        return stream_text(file_path)
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        html_content = f.read()
+    
+    # Parse HTML using selectolax (imported here: it is only needed when a filing is parsed)
+    from selectolax.parser import HTMLParser
+    tree = HTMLParser(html_content)
+    
+    # Remove script and style elements
+    for tag in tree.css('script'):
+        tag.decompose()
+    for tag in tree.css('style'):
+        tag.decompose()
+    
+    # Extract text with newlines between elements
+    if tree.body:
+        text = tree.body.text(separator='\n')
+        # Clean up extra whitespace
+        text = ' '.join(text.split())
+        return text
+    return ""
+
+def _extract_worker(file_path: str) -> Tuple[str, Optional[str], float]:
+    """Process-pool entry point, returns (text, error, seconds) so one bad filing does not stop the
+    pool and the parse time can be recorded in the parent's metrics."""
+    started = time.perf_counter()
+    try:
+        return extract_text_from_html(file_path), None, time.perf_counter() - started
+    except Exception as e:
+        return "", str(e), time.perf_counter() - started
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """Worker processes for text extraction: CONFIG['EXTRACT_WORKERS'] by default, 0 means one per CPU."""
+    if workers is None:
+        workers = CONFIG.get('EXTRACT_WORKERS', 0)
+    return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+# Columns load_all_filings can return; content/content_length need the text to be extracted
+FILING_COLUMNS = ['ticker', 'accession_number', 'filing_date', 'file_path', 'file_size', 'content', 'content_length']
+TEXT_COLUMNS = {'content', 'content_length'}
+
+_text_caches: Dict[str, TextCache] = {}
+
+def _shared_text_cache(path: str) -> TextCache:
+    if path not in _text_caches:
+        _text_caches[path] = TextCache(path)
+    return _text_caches[path]
+
+def close_text_caches(under: Optional[str] = None) -> None:
+    """Close the shared text caches (those stored under `under` only), e.g. before their directory is deleted."""
+    prefix = os.path.join(os.path.abspath(under), '') if under else ''
+    for path in [p for p in _text_caches if os.path.abspath(p).startswith(prefix)]:
+        _text_caches.pop(path).close()
+
+class FilingText:
+    """Handle to a filing's cleaned text, which is only extracted (or read from the text cache)
+    when `read()` is called and is not kept in memory afterwards."""
+
+    __slots__ = ('file_path', 'cache_path')
+
+    def __init__(self, file_path: str, cache_path: Optional[str] = None):
+        self.file_path = file_path
+        self.cache_path = cache_path
+
+    def read(self) -> str:
+        cache = _shared_text_cache(self.cache_path) if self.cache_path else None
+        if cache is not None:
+            text = cache.get(self.file_path)
+            if text is not None:
+                return text
+        text = extract_text_from_html(self.file_path)
+        if cache is not None:
+            cache.put(self.file_path, text)
+        return text
+
+    def __str__(self) -> str:
+        return self.read()
+
+    def __repr__(self) -> str:
+        return f"FilingText({self.file_path!r})"
+
+def filing_text(content) -> str:
+    """Text of a `content` value, whether it is a loaded string or a lazy FilingText."""
+    return content.read() if isinstance(content, FilingText) else content
 
 class SECFilingLoader:
-    def __init__(self, base_dir: str = 'sec_data', concepts_dir: str = 'company_concepts'):
+    def __init__(self, base_dir: str = 'sec_data', concepts_dir: str = 'company_concepts',
+                 workers: Optional[int] = None, use_cache: Optional[bool] = None,
+                 use_search_index: Optional[bool] = None):
         self.base_dir = base_dir
         self.concepts_dir = concepts_dir  # Directory where Company Concepts are stored
-        logging.basicConfig(level=logging.INFO)
+        self.workers = resolve_workers(workers)  # 1 extracts in this process
+        if use_cache is None:
+            use_cache = CONFIG.get('TEXT_CACHE', True)
+        # Extracted text is cached under the loader's own base_dir
+        self.text_cache_path = os.path.join(base_dir, '.cache', 'text_cache.sqlite') if use_cache else None
+        self.text_cache = _shared_text_cache(self.text_cache_path) if use_cache else None
+        if use_search_index is None:
+            use_search_index = CONFIG.get('SEARCH_INDEX', True)
+        # Extracted filings are added to the full-text index as they go by (see sec_search.py)
+        self.search_index: Optional[SearchIndex] = (shared_search_index(default_index_path(base_dir))
+                                                    if use_search_index else None)
+        init_loader()
         self.logger = logging.getLogger(__name__)
 
     def extract_text_from_html(self, file_path: str) -> str:
-        """Extract clean text from HTML filing using selectolax (faster than BeautifulSoup)."""
+        """Extract clean text from HTML filing, logging and returning "" on failure."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            # Parse HTML using selectolax
-            tree = HTMLParser(html_content)
-            
-            # Remove script and style elements
-            for tag in tree.css('script'):
-                tag.decompose()
-            for tag in tree.css('style'):
-                tag.decompose()
-            
-            # Extract text with newlines between elements
-            if tree.body:
-                text = tree.body.text(separator='\n')
-                # Clean up extra whitespace
-                text = ' '.join(text.split())
-                return text
-            return ""
-            
+            return extract_text_from_html(file_path)
         except Exception as e:
             self.logger.error(f"Error extracting text from {file_path}: {str(e)}")
             return ""
 
-    def classify_filing_type(self, content: str, filename: str) -> str:
-        """Classify the filing type as 10-Q or 10-K based on the content or filename."""
-        if '10-K' in content or '10-K' in filename:
-            return '10-K'
-        elif '10-Q' in content or '10-Q' in filename:
-            return '10-Q'
+    def iter_extracted_texts(self, file_paths: List[str]) -> Iterator[Tuple[str, str]]:
+        """Yield (file_path, clean_text) in input order, streaming results as they are ready.
+
+        Filings already in the text cache are served from it; the rest are parsed in a process
+        pool when there is more than one worker (selectolax holds the GIL, so threads would not
+        help), otherwise in this process, and then added to the cache.
+        """
+        cached = {}
+        if self.text_cache is not None:
+            for file_path in file_paths:
+                text = self.text_cache.get(file_path)
+                if text is not None:
+                    cached[file_path] = text
+        misses = [file_path for file_path in file_paths if file_path not in cached]
+        sec_metrics.count('text_cache_hits', len(cached))
+
+        extracted = self._extract_uncached(misses)
+        for file_path in file_paths:
+            if file_path in cached:
+                yield file_path, cached.pop(file_path)
+                continue
+            miss_path, clean_text, error = next(extracted)
+            if error is None and self.text_cache is not None:
+                self.text_cache.put(miss_path, clean_text)
+            yield miss_path, clean_text
+
+    def _extract_uncached(self, file_paths: List[str]) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """Yield (file_path, clean_text, error) in input order."""
+        if self.workers <= 1 or len(file_paths) < 2:
+            for file_path in file_paths:
+                clean_text, error, seconds = _extract_worker(file_path)
+                self._record_extraction(file_path, error, seconds)
+                yield file_path, clean_text, error
+            return
+
+        workers = min(self.workers, len(file_paths))
+        # Small chunks keep results streaming back in order without much IPC overhead
+        chunksize = max(1, min(8, len(file_paths) // (workers * 4)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_extract_worker, file_paths, chunksize=chunksize)
+            for file_path, (clean_text, error, seconds) in zip(file_paths, results):
+                self._record_extraction(file_path, error, seconds)
+                yield file_path, clean_text, error
+
+    def _record_extraction(self, file_path: str, error: Optional[str], seconds: float) -> None:
+        # Parse time per filing (measured in the worker) as the html_parse stage
+        sec_metrics.observe(sec_metrics.STAGE_SECONDS, seconds, stage='html_parse')
+        if error is not None:
+            sec_metrics.count('extract_errors')
+            self.logger.error(f"Error extracting text from {file_path}: {error}")
         else:
+            sec_metrics.count('filings_extracted')
+
+    def classify_filing_type(self, content: str, filename: str) -> str:
+        """Classify the filing type as 10-Q or 10-K from the cover page, falling back to the filename.
+
+        Amendments (10-Q/A, 10-K/A) are classified as their base form.
+        """
+        form = detect_form(content, filename)
+        if form is None:
             return 'Other'  # You could also use 'Unknown' if you prefer
+        return form.split('/')[0]
+
+    def section_index(self, file_path: str, text: Optional[str] = None) -> SectionIndex:
+        """Item offsets of a filing, read from `<filing>.sections.json` or parsed and saved there."""
+        index = load_index(file_path)
+        if index is None:
+            if text is None:
+                text = FilingText(file_path, self.text_cache_path).read()
+            index = parse_sections(text, filename=os.path.basename(file_path))
+            try:
+                save_index(file_path, index)
+            except OSError as e:
+                self.logger.error(f"Error saving section index for {file_path}: {str(e)}")
+        return index
+
+    def index_filing(self, file_path: str, text: str) -> SectionIndex:
+        """Index freshly extracted text: its item sections and, if not there yet, its full-text entry."""
+        with sec_metrics.span('section_index'):
+            sections = self.section_index(file_path, text)
+        if self.search_index is not None and self.search_index.needs_update(file_path):
+            parsed = self._parse_filing_name(file_path)
+            if parsed is not None:
+                # Filings live in <base_dir>/<ticker>/filings/
+                ticker = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(file_path))))
+                with sec_metrics.span('search_index'):
+                    self.search_index.add_document(file_path, ticker, parsed[0], parsed[1], text, sections)
+        return sections
+
+    def build_search_index(self, tickers: Optional[List[str]] = None) -> int:
+        """Add the filings of `tickers` that are not in the full-text index (or changed) and drop
+        deleted ones. Returns the number of filings indexed."""
+        if self.search_index is None:
+            raise ValueError("The search index is disabled (use_search_index=False / CONFIG['SEARCH_INDEX'])")
+        if tickers is None:
+            tickers = self._default_tickers()
+        file_paths = [file_path for ticker in tickers for file_path in self.list_filings(ticker)
+                      if self.search_index.needs_update(file_path)]
+        indexed = 0
+        for file_path, clean_text in self.iter_extracted_texts(file_paths):
+            if clean_text:
+                self.index_filing(file_path, clean_text)
+                indexed += 1
+        self.search_index.remove_missing(tickers)
+        return indexed
+
+    def load_inline_facts(self, tickers: Optional[List[str]] = None,
+                          file_paths: Optional[List[str]] = None) -> pd.DataFrame:
+        """Facts tagged in the downloaded filings themselves (see sec_xbrl.py), in the flatten_json_data
+        schema plus Ticker, without waiting for the companyfacts API to pick the filings up.
+
+        Filings are parsed in a process pool like the text extraction, `file_paths` overrides `tickers`.
+        """
+        from sec_xbrl import _facts_worker
+
+        if file_paths is None:
+            file_paths = [file_path for ticker in (tickers or self._default_tickers())
+                          for file_path in sorted(self.list_filings(ticker))]
+        if self.workers <= 1 or len(file_paths) < 2:
+            results = map(_facts_worker, file_paths)
+            frames = self._collect_facts(results)
+        else:
+            workers = min(self.workers, len(file_paths))
+            chunksize = max(1, min(8, len(file_paths) // (workers * 4)))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                frames = self._collect_facts(pool.map(_facts_worker, file_paths, chunksize=chunksize))
+        if not frames:
+            return pd.DataFrame(columns=FACT_COLUMNS + ['Ticker'])
+
+        df = pd.concat(frames, ignore_index=True)
+        # concat turns categoricals with different categories back into objects
+        for column in ['Taxonomy', 'Concept', 'Unit'] + CATEGORICAL_COLUMNS:
+            df[column] = df[column].astype('category')
+        return df
+
+    def _collect_facts(self, results) -> List[pd.DataFrame]:
+        frames = []
+        for file_path, facts, error in results:
+            if error is not None:
+                self.logger.error(f"Error extracting facts from {file_path}: {error}")
+                continue
+            # Filings live in <base_dir>/<ticker>/filings/
+            facts['Ticker'] = os.path.basename(os.path.dirname(os.path.dirname(os.path.abspath(file_path))))
+            frames.append(facts)
+        return frames
+
+    def load_section(self, file_path: str, name: str) -> Optional[str]:
+        """Text of one item of a filing (e.g. 'risk_factors', 'mda'), None if the filing lacks it."""
+        index = self.section_index(file_path)
+        section = index.get(name)
+        if section is None:
+            return None
+        return FilingText(file_path, self.text_cache_path).read()[section.start:section.end]
+
+    def load_filing_sections(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        """One row per item of every filing: form, section name, part, item and character offsets."""
+        if tickers is None:
+            tickers = self._default_tickers()
+        rows = []
+        for ticker in tickers:
+            for file_path in self.list_filings(ticker):
+                parsed = self._parse_filing_name(file_path)
+                if parsed is None:
+                    continue
+                index = self.section_index(file_path)
+                for section in index.sections:
+                    rows.append({'ticker': ticker, 'accession_number': parsed[0], 'filing_date': parsed[1],
+                                 'form': index.form, 'section': section.name, 'part': section.part,
+                                 'item': section.item, 'start': section.start, 'end': section.end,
+                                 'file_path': file_path})
+        df = pd.DataFrame(rows)
+        if not df.empty:
+            df['filing_date'] = pd.to_datetime(df['filing_date'])
+        return df
+
+    def list_filings(self, ticker: str) -> List[str]:
+        """Paths of the downloaded .htm filings of a ticker."""
+        filings_path = os.path.join(self.base_dir, ticker, 'filings')
+        return glob(os.path.join(filings_path, '*.htm'))
+
+    def _parse_filing_name(self, file_path: str) -> Optional[Tuple[str, str]]:
+        """(accession_number, filing_date) from '<accession>_<date>.htm', None if it does not match."""
+        try:
+            filename = os.path.basename(file_path)
+            accession_num, filing_date = filename.replace('.htm', '').split('_')
+            return accession_num, filing_date
+        except Exception as e:
+            self.logger.error(f"Error processing file {file_path}: {str(e)}")
+            return None
+
+    def _filings_frame(self, filings_data: List[dict]) -> pd.DataFrame:
+        # Convert to DataFrame
+        df = pd.DataFrame(filings_data)
+        
+        # Convert dates and format columns
+        df['filing_date'] = pd.to_datetime(df['filing_date'])
+        df['file_size'] = df['file_size'] / 1024  # Convert to KB
+        
+        # Sort by filing date
+        return df.sort_values('filing_date', ascending=False)
+
+    def _load_filings_for(self, ticker_files: Dict[str, List[str]], columns: Optional[List[str]] = None,
+                          lazy: bool = False) -> Dict[str, pd.DataFrame]:
+        """Load the filings of several tickers in one pass (one pool for all of them).
+
+        Only `columns` are returned. The text is only extracted when content/content_length
+        are requested and `lazy` is False; with `lazy` the content column holds FilingText handles.
+        """
+        columns = list(FILING_COLUMNS if columns is None else columns)
+        unknown = [c for c in columns if c not in FILING_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown filing columns {unknown}, expected a subset of {FILING_COLUMNS}")
+
+        names = {}
+        for ticker, files in ticker_files.items():
+            for file_path in files:
+                parsed = self._parse_filing_name(file_path)
+                if parsed is not None:
+                    names[file_path] = (ticker, parsed)
+
+        if lazy or not TEXT_COLUMNS.intersection(columns):
+            texts = ((file_path, None) for file_path in names)
+        else:
+            texts = self.iter_extracted_texts(list(names))
+
+        filings_data = defaultdict(list)
+        for file_path, clean_text in texts:
+            ticker, (accession_num, filing_date) = names[file_path]
+            filing_info = {
+                'ticker': ticker,  # Ensure 'ticker' is added
+                'accession_number': accession_num,
+                'filing_date': filing_date,
+                'file_path': file_path,
+                'file_size': os.path.getsize(file_path),
+            }
+            if 'content' in columns:
+                filing_info['content'] = FilingText(file_path, self.text_cache_path) if lazy else clean_text
+            if 'content_length' in columns:
+                filing_info['content_length'] = pd.NA if lazy else len(clean_text)
+            if clean_text:
+                # The text is at hand, index its items and words now so neither needs a re-parse
+                self.index_filing(file_path, clean_text)
+            filings_data[ticker].append(filing_info)
+        return {ticker: self._filings_frame(filings_data[ticker])[columns] if filings_data[ticker]
+                else pd.DataFrame(columns=columns)
+                for ticker in ticker_files}
 
     def load_filings(self, ticker: str) -> pd.DataFrame:
         """Load SEC filings data with full text content for a specific ticker."""
         try:
-            filings_path = os.path.join(self.base_dir, ticker, 'filings')
-            filing_files = glob(os.path.join(filings_path, '*.htm'))
+            filing_files = self.list_filings(ticker)
             
             if not filing_files:
                 raise FileNotFoundError(f"No filings found for {ticker}")
             
-            filings_data = []
-            for file_path in filing_files:
-                try:
-                    filename = os.path.basename(file_path)
-                    accession_num, filing_date = filename.replace('.htm', '').split('_')
-                    
-                    # Read and clean the file content
-                    clean_text = self.extract_text_from_html(file_path)
-                    
-                    filing_info = {
-                        'ticker': ticker,  # Ensure 'ticker' is added
-                        'accession_number': accession_num,
-                        'filing_date': filing_date,
-                        'file_path': file_path,
-                        'file_size': os.path.getsize(file_path),
-                        'content': clean_text,
-                        'content_length': len(clean_text),
-                    }
-                    filings_data.append(filing_info)
-                    
-                except Exception as e:
-                    self.logger.error(f"Error processing file {file_path}: {str(e)}")
-                    continue
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(filings_data)
-            
-            # Convert dates and format columns
-            df['filing_date'] = pd.to_datetime(df['filing_date'])
-            df['file_size'] = df['file_size'] / 1024  # Convert to KB
-            
-            # Sort by filing date
-            df = df.sort_values('filing_date', ascending=False)
-            
-            return df
+            return self._load_filings_for({ticker: filing_files})[ticker]
             
         except Exception as e:
             self.logger.error(f"Error loading filings for {ticker}: {str(e)}")
             return pd.DataFrame()
 
     def load_company_concepts(self, ticker: str) -> pd.DataFrame:
-        """Load Company Concepts data for a specific ticker."""
+        """Load Company Concepts data for a specific ticker as one row per reported fact.
+
+        The companyfacts JSON is flattened like the download pipeline does, plus `ticker` and an
+        `accession_number` without dashes, the key that joins facts to the filing reporting them.
+        """
         try:
             concepts_path = os.path.join(self.base_dir, ticker, self.concepts_dir)
             concepts_files = glob(os.path.join(concepts_path, '*.json'))
@@ -126,11 +433,12 @@ class SECFilingLoader:
             concepts_data = []
             for file_path in concepts_files:
                 with open(file_path, 'r', encoding='utf-8') as f:
-                    concepts_data.append(json.load(f))
+                    concepts_data.append(flatten_json_data(json.load(f)))
             
             # Convert to DataFrame
-            concepts_df = pd.DataFrame(concepts_data)
+            concepts_df = pd.concat(concepts_data, ignore_index=True)
             concepts_df['ticker'] = ticker  # Ensure 'ticker' is added
+            concepts_df['accession_number'] = concepts_df['Accession'].str.replace('-', '', regex=False)
             
             return concepts_df
         
@@ -138,57 +446,97 @@ class SECFilingLoader:
             self.logger.error(f"Error loading company concepts for {ticker}: {str(e)}")
             return pd.DataFrame()
 
-    def load_all_filings(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
-        """Load filings and company concepts data with text for multiple tickers."""
-        all_data = []  # List to hold the DataFrames for all tickers
+    def _default_tickers(self) -> List[str]:
+        # Ticker folders are the ones holding filings or company concepts, this skips
+        # the .cache folder and the Parquet fact store
+        return [d for d in os.listdir(self.base_dir)
+                if os.path.isdir(os.path.join(self.base_dir, d, 'filings'))
+                or os.path.isdir(os.path.join(self.base_dir, d, self.concepts_dir))]
+
+    def load_all_filings(self, tickers: Optional[List[str]] = None, columns: Optional[List[str]] = None,
+                         lazy: bool = False) -> pd.DataFrame:
+        """Load one row per filing for multiple tickers, with only the requested `columns`.
+
+        Company concepts are no longer merged in (that repeated every filing's text once per
+        concept row); load them with `load_all_concepts` and combine with `join_concepts`.
+        With `lazy=True` the content column holds FilingText handles instead of strings.
+        """
         if tickers is None:
             # Get all tickers from the base directory
-            tickers = [d for d in os.listdir(self.base_dir) if os.path.isdir(os.path.join(self.base_dir, d))]
+            tickers = self._default_tickers()
         
+        # Extract the filings of all tickers together so the process pool is shared
+        ticker_files = {}
         for ticker in tickers:
-            self.logger.info(f"Loading filings and company concepts for {ticker}...")
-            
-            # Load SEC filings
-            filings_df = self.load_filings(ticker)
-            
-            # Load Company Concepts
-            concepts_df = self.load_company_concepts(ticker)
-            
-            # Merge both dataframes if they are not empty
-            if not filings_df.empty and not concepts_df.empty:
-                merged_df = pd.merge(filings_df, concepts_df, on='ticker', how='left')
-                all_data.append(merged_df)
-                self.logger.info(f"Loaded {len(filings_df)} filings and concepts for {ticker}")
-            elif not filings_df.empty:
+            ticker_files[ticker] = self.list_filings(ticker)
+            if not ticker_files[ticker]:
+                self.logger.error(f"Error loading filings for {ticker}: No filings found for {ticker}")
+        filings_by_ticker = self._load_filings_for(ticker_files, columns=columns, lazy=lazy)
+
+        all_data = []  # List to hold the DataFrames for all tickers
+        for ticker in tickers:
+            filings_df = filings_by_ticker[ticker]
+            if not filings_df.empty:
                 all_data.append(filings_df)
                 self.logger.info(f"Loaded {len(filings_df)} filings for {ticker}")
-            elif not concepts_df.empty:
-                all_data.append(concepts_df)
-                self.logger.info(f"Loaded company concepts for {ticker}")
+
+        if not all_data:
+            return pd.DataFrame(columns=list(FILING_COLUMNS if columns is None else columns))
         
         # Concatenate all dataframes into a single DataFrame
-        all_data_df = pd.concat(all_data, ignore_index=True)
-        
-        # Return the merged data for all tickers as a single DataFrame
-        return all_data_df
+        return pd.concat(all_data, ignore_index=True)
+
+    def load_all_concepts(self, tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        """Company concepts of multiple tickers as one fact table (see load_company_concepts)."""
+        if tickers is None:
+            tickers = self._default_tickers()
+        frames = [df for df in (self.load_company_concepts(ticker) for ticker in tickers) if not df.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+def join_concepts(filings_df: pd.DataFrame, concepts_df: pd.DataFrame, how: str = 'inner') -> pd.DataFrame:
+    """Attach to each filing the facts it reported, matched on (ticker, accession_number).
+
+    Each fact row lists its period (Start/End, Fiscal Year/Period). The filings' content column
+    is left out so the text is not repeated on every fact row; join it back by accession if needed.
+    """
+    filing_cols = [c for c in filings_df.columns if c not in TEXT_COLUMNS]
+    return pd.merge(filings_df[filing_cols], concepts_df, on=['ticker', 'accession_number'], how=how)
+
+def data_version(tickers: Optional[List[str]] = None, base_dir: Optional[str] = None) -> tuple:
+    """Cache key of what load_sec_data returns: the config it reads plus the modification times of
+    the fact store, the ingestion manifest and each ticker's filings and concepts directories.
+
+    Downloads add, replace or remove files in those directories, which updates their mtimes, so
+    the key changes whenever the data does. Only stats directories, never lists the filings.
+    """
+    from sec_manifest import default_manifest_path
+
+    tickers = tickers if tickers is not None else CONFIG['TICKERS']
+    base_dir = base_dir or CONFIG['BASE_DIR']
+
+    def _mtime(path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return 0
+
+    directories = tuple((ticker, _mtime(os.path.join(base_dir, ticker, 'filings')),
+                         _mtime(os.path.join(base_dir, ticker, 'company_concepts'))) for ticker in tickers)
+    return (tuple(tickers), CONFIG['START_DATE'], CONFIG['END_DATE'], base_dir, CONFIG.get('STORAGE_BACKEND'),
+            get_fact_store(base_dir).last_modified(), _mtime(default_manifest_path(base_dir)), directories)
 
 def load_sec_data():
     # Create an instance of the SECFilingLoader
     loader = SECFilingLoader(base_dir=CONFIG['BASE_DIR'])
 
-    # Load all filings and company concepts for specified tickers
-    all_data_df = loader.load_all_filings(tickers=CONFIG['TICKERS'])
-
-    # Extract required columns
+    # Load all filings for specified tickers, materialising only the required columns
     required_cols = ["ticker", "filing_date", "content"]  # Adjust columns as needed
-    all_data_df_min = all_data_df[required_cols]
+    all_data_df_min = loader.load_all_filings(tickers=CONFIG['TICKERS'], columns=required_cols)
 
-    # Load SEC facts (assuming the CSV path is correct)
-    sec_facts_file_path = os.path.join(CONFIG['BASE_DIR'], 'sec_data_all_tickers.csv')
-    df_sec_facts = pd.read_csv(sec_facts_file_path)
+    # Load SEC facts for the configured tickers from the fact store (dates come back typed)
+    df_sec_facts = get_fact_store(CONFIG['BASE_DIR']).read_facts(tickers=CONFIG['TICKERS'])
 
-    # Convert 'Filed Date' and 'filing_date' columns to datetime, if not already
-    df_sec_facts['Filed Date'] = pd.to_datetime(df_sec_facts['Filed Date'], errors='coerce')
+    # Convert 'filing_date' column to datetime, if not already
     all_data_df_min['filing_date'] = pd.to_datetime(all_data_df_min['filing_date'], errors='coerce')
 
     # Sort both DataFrames by their respective date columns, latest at the top
@@ -200,29 +548,32 @@ def load_sec_data():
 
 
 def load_sec_data_db():
-    # Create database engine
-    engine = create_engine(CONFIG['DATABASE_URL'])
-    
+    """Upsert the fact store and the filings of CONFIG['TICKERS'] into CONFIG['DATABASE_URL'].
+
+    Returns the number of fact and filing rows written, see sec_db.DatabaseSink.
+    """
+    from sec_db import load_to_database
+
     try:
-        # Load data from CSV files first
-        df_sec_facts = pd.read_csv(os.path.join(CONFIG['BASE_DIR'], 'sec_data_all_tickers.csv'))
-        all_data_df_min = pd.read_csv(os.path.join(CONFIG['BASE_DIR'], 'filings_data.csv'))
-        
-        # Save to PostgreSQL
-        df_sec_facts.to_sql('sec_facts', engine, if_exists='replace', index=False)
-        all_data_df_min.to_sql('filings_data', engine, if_exists='replace', index=False)
-        
-        return df_sec_facts, all_data_df_min
-        
+        counts = load_to_database(CONFIG['TICKERS'])
+        return counts['facts'], counts['filings']
+
     except Exception as e:
         print(f"Error loading data: {e}")
-        return pd.DataFrame(), pd.DataFrame()
+        return 0, 0
 
-def read_from_database():
-    engine = create_engine(CONFIG['DATABASE_URL'])
-    
-    # Read from PostgreSQL
-    df_sec_facts = pd.read_sql_table('sec_facts', engine)
-    all_data_df_min = pd.read_sql_table('filings_data', engine)
-    
-    return df_sec_facts, all_data_df_min
\ No newline at end of file
+def read_from_database(tickers: Optional[List[str]] = None, limit: Optional[int] = None,
+                       start: Optional[str] = None, end: Optional[str] = None):
+    """Facts and filings (ticker, filing_date, content) of `tickers` between `start` and `end`
+    (default START_DATE and END_DATE), filtered in SQL over the pooled engine of sec_db; `limit`
+    caps the rows of each table."""
+    from sec_db import query_facts, query_filings
+
+    tickers = tickers if tickers is not None else CONFIG['TICKERS']
+    start = start or CONFIG['START_DATE']
+    end = end or CONFIG['END_DATE']
+    df_sec_facts = query_facts(tickers=tickers, start=start, end=end, limit=limit)
+    all_data_df_min = query_filings(tickers=tickers, start=start, end=end, limit=limit,
+                                    columns=['ticker', 'filing_date', 'content'])
+
+    return df_sec_facts, all_data_df_min
@@ -0,0 +1,140 @@
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from config import CONFIG  # Import the config dictionary
+from text_cache import file_sha256
+
+MANIFEST_FILE = 'ingest_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def default_manifest_path(base_dir: Optional[str] = None) -> str:
+    return os.path.join(base_dir or CONFIG['BASE_DIR'], MANIFEST_FILE)
+
+
+class IngestManifest:
+    """Record of what a previous run already put under BASE_DIR, so the next one only fetches new data.
+
+    Per ticker it keeps the CIK, the START/END range the facts were ingested for, the accession,
+    form and filed date of every filing whose facts are stored, and the downloaded filing documents
+    with their path, size and SHA-256. Saved as JSON next to the data (BASE_DIR/ingest_manifest.json),
+    so wiping BASE_DIR also forgets what was ingested.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_manifest_path()
+        self.tickers: Dict[str, dict] = {}
+        self.load()
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != MANIFEST_VERSION:
+            return False
+        self.tickers = data.get('tickers', {})
+        return True
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': MANIFEST_VERSION, 'updated_at': time.time(), 'tickers': self.tickers}, f)
+        os.replace(tmp_path, self.path)
+
+    def _entry(self, ticker: str) -> dict:
+        return self.tickers.setdefault(ticker, {'cik': None, 'facts': {}, 'filings': {}})
+
+    def forget(self, ticker: str) -> None:
+        self.tickers.pop(ticker, None)
+
+    # Facts
+
+    def can_append_facts(self, ticker: str, start: Optional[str], end: Optional[str]) -> bool:
+        """Whether new facts of `ticker` can be appended to what is stored.
+
+        Only when the stored rows were filtered with the same START_DATE and an END_DATE no later
+        than `end`; otherwise rows outside the old range are missing or extra, and the ticker is
+        rewritten in full.
+        """
+        facts = self.tickers.get(ticker, {}).get('facts')
+        if not facts or not facts.get('accessions'):
+            return False
+        if facts.get('start') != start:
+            return False
+        return end is None or (facts.get('end') is not None and facts['end'] <= end)
+
+    def fact_accessions(self, ticker: str) -> set:
+        return set(self.tickers.get(ticker, {}).get('facts', {}).get('accessions', {}))
+
+    def record_facts(self, ticker: str, cik: str, df: pd.DataFrame, start: Optional[str], end: Optional[str],
+                     replace: bool = False) -> None:
+        """Add the filings (accession, form, filed date) behind the fact rows of `df`."""
+        entry = self._entry(ticker)
+        entry['cik'] = cik
+        accessions = {} if replace else entry['facts'].get('accessions', {})
+        if not df.empty:
+            filings = df.drop_duplicates('Accession')[['Accession', 'Form', 'Filed Date']]
+            for accession, form, filed in filings.itertuples(index=False):
+                accessions[str(accession)] = {'form': None if pd.isna(form) else str(form),
+                                              'filed': None if pd.isna(filed) else str(pd.Timestamp(filed).date())}
+        entry['facts'] = {'start': start, 'end': end, 'accessions': accessions, 'updated_at': time.time()}
+
+    # Filing documents
+
+    def filing(self, ticker: str, accession: str) -> Optional[dict]:
+        return self.tickers.get(ticker, {}).get('filings', {}).get(accession)
+
+    def has_filing(self, ticker: str, accession: str, verify: bool = False) -> bool:
+        """Whether the document of `accession` is on disk as recorded (size, and hash with `verify`)."""
+        record = self.filing(ticker, accession)
+        if record is None:
+            return False
+        try:
+            if os.path.getsize(record['path']) != record['size']:
+                return False
+        except OSError:
+            return False
+        return not verify or file_sha256(record['path']) == record['sha256']
+
+    def record_filing(self, ticker: str, cik: str, accession: str, form: str, filed: str, path: str,
+                      url: Optional[str] = None, sha256: Optional[str] = None) -> dict:
+        """Record a filing saved at `path`; pass `sha256` when it is already known so the file is not read again."""
+        entry = self._entry(ticker)
+        entry['cik'] = cik
+        record = {'form': form, 'filed': filed, 'path': path, 'url': url, 'size': os.path.getsize(path),
+                  'sha256': sha256 or file_sha256(path), 'downloaded_at': time.time()}
+        entry['filings'][accession] = record
+        return record
+
+    def filings(self, ticker: str) -> Dict[str, dict]:
+        return dict(self.tickers.get(ticker, {}).get('filings', {}))
+
+    def summary(self, tickers: Optional[Iterable[str]] = None) -> List[dict]:
+        rows = []
+        for ticker in (tickers if tickers is not None else sorted(self.tickers)):
+            entry = self.tickers.get(ticker, {})
+            facts = entry.get('facts', {})
+            rows.append({'ticker': ticker, 'cik': entry.get('cik'),
+                         'fact_filings': len(facts.get('accessions', {})),
+                         'documents': len(entry.get('filings', {})),
+                         'start': facts.get('start'), 'end': facts.get('end')})
+        return rows
+
+
+# Show what the manifest of BASE_DIR (or the given base_dir) holds:
+#   python sec_manifest.py [base_dir]
+if __name__ == '__main__':
+    import sys
+
+    manifest = IngestManifest(default_manifest_path(sys.argv[1] if len(sys.argv) > 1 else None))
+    if not manifest.tickers:
+        print(f"No ingestion manifest at {manifest.path}")
+    for row in manifest.summary():
+        print(f"{row['ticker']:<8} CIK {row['cik']}  facts from {row['fact_filings']} filings "
+              f"({row['start']} to {row['end']}), {row['documents']} documents downloaded")
@@ -0,0 +1,253 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import CONFIG  # Import the config dictionary
+
+# Histogram bucket bounds in seconds, from a cached lookup to a slow ticker
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+PROMETHEUS_PREFIX = 'sec_'
+STAGE_SECONDS = 'stage_seconds'  # Histogram every span records into, labelled with the stage
+
+REPORT_FILE = 'run_report.json'
+PROMETHEUS_FILE = 'metrics.prom'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def default_metrics_dir(base_dir: Optional[str] = None) -> str:
+    return os.path.join(base_dir or CONFIG['BASE_DIR'], '.cache', 'metrics')
+
+
+def _label_key(labels: dict) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items() if value is not None))
+
+
+class Histogram:
+    """Count, sum, min, max and cumulative bucket counts of observed values."""
+
+    __slots__ = ('bounds', 'bucket_counts', 'count', 'sum', 'min', 'max')
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.bucket_counts = [0] * (len(self.bounds) + 1)  # the last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                return
+        self.bucket_counts[-1] += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate from the buckets (linear within a bucket, clamped to min/max)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, n in zip(self.bounds + (self.max,), self.bucket_counts):
+            if n and seen + n >= rank:
+                value = lower + (bound - lower) * (rank - seen) / n
+                return min(max(value, self.min), self.max)
+            seen += n
+            lower = bound
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'sum': self.sum, 'min': self.min if self.count else None,
+                'max': self.max if self.count else None, 'mean': self.sum / self.count if self.count else None,
+                'p50': self.quantile(0.5), 'p95': self.quantile(0.95),
+                'buckets': dict(zip([str(b) for b in self.bounds] + ['+Inf'], self.bucket_counts))}
+
+
+class Metrics:
+    """Counters and histograms of one pipeline run, keyed by name and labels (stage, ticker, ...).
+
+    span() times a block into the `stage_seconds` histogram, count() adds to a counter and
+    observe() records any other value. Thread-safe, so the download event loop, its storage
+    threads and the extraction loop can share one registry. Exported as a JSON run report and
+    in the Prometheus text format.
+    """
+
+    def __init__(self, run: str = 'pipeline'):
+        self.run = run
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, LabelKey], float] = {}
+        self.histograms: Dict[Tuple[str, LabelKey], Histogram] = {}
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage: str, **labels) -> Iterator[None]:
+        """Time the block as `stage`; a block that raises also counts a `stage_errors`."""
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.count('stage_errors', stage=stage, **labels)
+            raise
+        finally:
+            self.observe(STAGE_SECONDS, time.perf_counter() - started, stage=stage, **labels)
+
+    def report(self) -> dict:
+        """JSON-serialisable snapshot: counters and histograms as lists of {name, labels, ...}."""
+        with self._lock:
+            counters = [{'name': name, 'labels': dict(labels), 'value': value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{'name': name, 'labels': dict(labels), **histogram.to_dict()}
+                          for (name, labels), histogram in sorted(self.histograms.items())]
+        return {'run': self.run, 'started_at': self.started_at, 'elapsed': time.time() - self.started_at,
+                'counters': counters, 'histograms': histograms}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format (counters get the `_total` suffix)."""
+        lines = []
+        with self._lock:
+            counter_names = sorted({name for name, _ in self.counters})
+            for name in counter_names:
+                metric = f'{PROMETHEUS_PREFIX}{name}_total'
+                lines.append(f'# TYPE {metric} counter')
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f'{metric}{_format_labels(labels)} {_format_value(value)}')
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f'{PROMETHEUS_PREFIX}{name}'
+                lines.append(f'# TYPE {metric} histogram')
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip([str(b) for b in histogram.bounds] + ['+Inf'], histogram.bucket_counts):
+                        cumulative += n
+                        lines.append(f'{metric}_bucket{_format_labels(labels + (("le", bound),))} {cumulative}')
+                    lines.append(f'{metric}_sum{_format_labels(labels)} {_format_value(histogram.sum)}')
+                    lines.append(f'{metric}_count{_format_labels(labels)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, metrics_dir: Optional[str] = None) -> Tuple[str, str]:
+        """Write the run report and the Prometheus file (replacing the previous run's); returns their paths."""
+        metrics_dir = metrics_dir or default_metrics_dir()
+        os.makedirs(metrics_dir, exist_ok=True)
+        report_path = os.path.join(metrics_dir, REPORT_FILE)
+        prometheus_path = os.path.join(metrics_dir, PROMETHEUS_FILE)
+        _write_atomic(report_path, json.dumps(self.report(), indent=2))
+        _write_atomic(prometheus_path, self.to_prometheus())
+        return report_path, prometheus_path
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _write_atomic(path: str, text: str) -> None:
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(f'{path}.tmp', path)
+
+
+def load_report(metrics_dir: Optional[str] = None) -> Optional[dict]:
+    """The last run report written to `metrics_dir`, None if there is none."""
+    try:
+        with open(os.path.join(metrics_dir or default_metrics_dir(), REPORT_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def stage_rows(report: dict, by: Tuple[str, ...] = ('stage',)) -> List[dict]:
+    """Span timings of a report summed over the labels not in `by`: calls, total, mean and max seconds."""
+    rows: Dict[tuple, dict] = {}
+    for histogram in report['histograms']:
+        if histogram['name'] != STAGE_SECONDS:
+            continue
+        key = tuple(histogram['labels'].get(label) for label in by)
+        row = rows.setdefault(key, {**dict(zip(by, key)), 'calls': 0, 'total_s': 0.0, 'max_s': 0.0})
+        row['calls'] += histogram['count']
+        row['total_s'] += histogram['sum']
+        row['max_s'] = max(row['max_s'], histogram['max'] or 0.0)
+    for row in rows.values():
+        row['mean_s'] = row['total_s'] / row['calls'] if row['calls'] else 0.0
+    return sorted(rows.values(), key=lambda row: -row['total_s'])
+
+
+# The registry instrumented code records into. start_run() sets it for the calling thread or task only;
+# asyncio tasks and asyncio.to_thread calls started from there inherit it, unrelated threads (other
+# Streamlit sessions) keep recording into the background registry
+_background = Metrics('background')
+_current: ContextVar[Metrics] = ContextVar('sec_metrics', default=_background)
+
+
+def get_metrics() -> Metrics:
+    return _current.get()
+
+
+def start_run(run: str = 'pipeline') -> Metrics:
+    """Start recording this thread's or task's metrics into a fresh registry and return it."""
+    metrics = Metrics(run)
+    _current.set(metrics)
+    return metrics
+
+
+def count(name: str, value: float = 1, **labels) -> None:
+    _current.get().count(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    _current.get().observe(name, value, **labels)
+
+
+def span(stage: str, **labels):
+    """Context manager timing a block as `stage` in the current registry."""
+    return _current.get().span(stage, **labels)
+
+
+# Print the last run report of BASE_DIR:  python sec_metrics.py [metrics_dir]
+if __name__ == '__main__':
+    import sys
+
+    report = load_report(sys.argv[1] if len(sys.argv) > 1 else None)
+    if report is None:
+        print("No run report yet, run the pipeline first")
+        sys.exit(1)
+    print(f"Run {report['run']} started {time.ctime(report['started_at'])}, {report['elapsed']:.1f}s")
+    for row in stage_rows(report):
+        print(f"  {row['stage']:24s} {row['calls']:6d} calls {row['total_s']:9.2f}s total "
+              f"{row['mean_s']:8.3f}s mean {row['max_s']:8.3f}s max")
+    for counter in report['counters']:
+        labels = ','.join(f'{k}={v}' for k, v in counter['labels'].items())
+        print(f"  {counter['name']}{'{' + labels + '}' if labels else ''} = {counter['value']:g}")
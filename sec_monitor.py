@@ -0,0 +1,514 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from glob import glob
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+from config import CONFIG  # Import the config dictionary
+import sec_metrics
+
+DEFAULT_INTERVAL = 60  # Seconds between polls of the submissions API
+DEFAULT_QUEUE_SIZE = 100  # Filings waiting for processing before the feed is paused
+DEFAULT_BATCH_SIZE = 8  # Filings extracted and diffed together
+DEFAULT_BATCH_WAIT = 2.0  # Seconds a partial batch waits for more filings
+MONITOR_DIR = 'monitor'  # Per ticker, one result JSON per accession
+
+_STOP = object()
+
+
+def normalize_cik(cik) -> str:
+    return str(int(cik)).zfill(10)
+
+
+@dataclass
+class FilingEvent:
+    """A filing reported by a feed: what the notebook's filing_callback printed, plus the primary document."""
+    accession: str
+    cik: str
+    form: str
+    filing_date: str
+    document: str = ''
+    company: str = ''
+    ticker: Optional[str] = None
+    received_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self.accession = self.accession.replace('-', '')
+        self.cik = normalize_cik(self.cik)
+
+    @classmethod
+    def from_search_hit(cls, hit: dict) -> 'FilingEvent':
+        """Event of an EDGAR full-text search hit (`{'_id': '<accession>:<document>', '_source': {...}}`)."""
+        source = hit['_source']
+        accession, _, document = hit['_id'].partition(':')
+        return cls(accession=accession, cik=source['ciks'][0], form=source.get('file_type') or source.get('form', ''),
+                   filing_date=source.get('file_date', ''), document=document,
+                   company=(source.get('display_names') or [source.get('company_name', '')])[0])
+
+    def to_filing(self) -> dict:
+        """The entry sec_download.download_filing expects."""
+        return {'accession': self.accession, 'form': self.form, 'filed': self.filing_date, 'document': self.document}
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# Feeds yield FilingEvents; the monitor filters, de-duplicates and processes them
+
+
+class SubmissionsFeed:
+    """Polls the submissions API of every watched CIK. Responses are cached with their ETag, so an
+    unchanged company costs one 304 per poll."""
+
+    def __init__(self, client, ciks: Iterable[str], forms: Optional[List[str]] = None,
+                 interval: float = DEFAULT_INTERVAL, start: Optional[str] = None):
+        self.client = client
+        self.ciks = [normalize_cik(cik) for cik in ciks]
+        self.forms = forms or CONFIG.get('FILING_FORMS', ['10-Q'])
+        self.interval = interval
+        self.start = start if start is not None else CONFIG['START_DATE']
+
+    async def events(self) -> AsyncIterator[FilingEvent]:
+        from sec_download import fetch_filing_index
+
+        while True:
+            started = time.monotonic()
+            for cik in self.ciks:
+                try:
+                    filings = await fetch_filing_index(cik, self.client, self.forms, start=self.start)
+                except Exception as e:
+                    print(f"Failed to poll filings of CIK {cik}: {str(e)}")
+                    continue
+                for filing in filings:
+                    yield FilingEvent(accession=filing['accession'], cik=cik, form=filing['form'],
+                                      filing_date=filing['filed'], document=filing['document'])
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+
+class DatamuleFeed:
+    """The notebook's source: datamule's EDGAR full-text search watcher, one per ticker."""
+
+    def __init__(self, tickers: List[str], forms: Optional[List[str]] = None, interval: float = 10):
+        self.tickers = tickers
+        self.forms = forms or CONFIG.get('FILING_FORMS', ['10-Q'])
+        self.interval = interval
+
+    async def events(self) -> AsyncIterator[FilingEvent]:
+        import datamule as dm
+
+        downloader = dm.Downloader()
+        downloader.set_headers(CONFIG['USER_AGENT'])
+        hits: asyncio.Queue = asyncio.Queue()
+
+        async def callback(data):
+            for hit in data['hits']['hits']:
+                await hits.put(hit)
+
+        watchers = [asyncio.ensure_future(downloader.watch(interval=self.interval, silent=True, form=self.forms,
+                                                           ticker=ticker, callback=callback))
+                    for ticker in self.tickers]
+        try:
+            while True:
+                yield FilingEvent.from_search_hit(await hits.get())
+        finally:
+            for watcher in watchers:
+                watcher.cancel()
+
+
+class RecordedFeed:
+    """Replays a feed recorded by RecordingFeed (JSON lines of `{"offset": seconds, "event": {...}}`).
+
+    `speed` scales the recorded gaps (2 replays twice as fast), 0 replays without waiting.
+    """
+
+    def __init__(self, path: str, speed: float = 0):
+        self.path = path
+        self.speed = speed
+
+    async def events(self) -> AsyncIterator[FilingEvent]:
+        started = time.monotonic()
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if self.speed:
+                    await asyncio.sleep(max(0.0, record['offset'] / self.speed - (time.monotonic() - started)))
+                yield FilingEvent(**record['event'])
+
+
+class RecordingFeed:
+    """Passes a feed through while appending its events to `path`, for RecordedFeed to replay."""
+
+    def __init__(self, feed, path: str):
+        self.feed = feed
+        self.path = path
+
+    async def events(self) -> AsyncIterator[FilingEvent]:
+        started = time.monotonic()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            async for event in self.feed.events():
+                f.write(json.dumps({'offset': round(time.monotonic() - started, 3), 'event': event.to_dict()}) + '\n')
+                f.flush()
+                yield event
+
+
+@dataclass
+class MonitorResult:
+    event: FilingEvent
+    path: Optional[str] = None
+    previous_path: Optional[str] = None
+    sections: List[str] = field(default_factory=list)
+    comparison: Optional[str] = None
+    facts: int = 0
+    facts_path: Optional[str] = None
+    error: Optional[str] = None
+    processed_at: float = 0.0
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data['event'] = self.event.to_dict()
+        return data
+
+
+def print_result(result: MonitorResult) -> None:
+    event = result.event
+    status = f"failed: {result.error}" if result.error else f"{len(result.sections)} sections, {result.facts} facts"
+    print(f"New filing: {event.ticker} {event.form} {event.accession} filed {event.filing_date} ({status})")
+
+
+class SECMonitor:
+    """Long-running filing monitor, promoted from NB_biotech_NLP_monitor_LIVE.ipynb.
+
+    Events from a feed are filtered to the watchlist (CONFIG['TICKERS'] by default), de-duplicated
+    by accession (against this run and the ingestion manifest) and put on a bounded queue; a full
+    queue pauses the feed. A consumer takes them in batches and runs fetch -> extract -> diff:
+    documents are downloaded concurrently through the shared SECClient, then the batch's text is
+    extracted and diffed against each ticker's previous filing of the same form in the process pools
+    of SECFilingLoader and compare_filings. The facts tagged in each new document are extracted
+    (sec_xbrl.py) to <accession>.facts.csv, ahead of the companyfacts API. Results go to `on_result`
+    and to BASE_DIR/<ticker>/monitor/<accession>.json, so same-day filings no longer overwrite each other.
+    The run's metrics are rewritten to BASE_DIR/.cache/metrics/monitor after every batch.
+    """
+
+    def __init__(self, tickers: Optional[List[str]] = None, forms: Optional[List[str]] = None,
+                 base_dir: Optional[str] = None, client=None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 batch_size: int = DEFAULT_BATCH_SIZE, batch_wait: float = DEFAULT_BATCH_WAIT,
+                 on_result: Callable[[MonitorResult], None] = print_result):
+        from sec_manifest import IngestManifest, default_manifest_path
+
+        self.tickers = [t.upper() for t in (tickers if tickers is not None else CONFIG['TICKERS'])]
+        self.forms = forms or CONFIG.get('FILING_FORMS', ['10-Q'])
+        self.base_dir = base_dir or CONFIG['BASE_DIR']
+        self.client = client
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.on_result = on_result
+        self.manifest = IngestManifest(default_manifest_path(self.base_dir))
+        self.watchlist: Dict[str, str] = {}  # CIK -> ticker
+        self.seen = set()
+        self.queue: Optional[asyncio.Queue] = None
+        self.consumer: Optional[asyncio.Task] = None
+        self.stats = {'received': 0, 'ignored': 0, 'duplicates': 0, 'queued': 0, 'processed': 0, 'failed': 0,
+                      'batches': 0, 'batch_errors': 0}
+
+    async def load_watchlist(self) -> Dict[str, str]:
+        """Resolve the tickers to CIKs and mark the filings already in the manifest as seen.
+
+        CIKs already known from earlier downloads (manifest, company concepts file) need no request.
+        """
+        from cik_index import get_cik_index
+
+        self.watchlist = {}
+        unknown = []
+        for ticker in self.tickers:
+            cik = self._known_cik(ticker)
+            if cik is None:
+                unknown.append(ticker)
+            else:
+                self.watchlist[cik] = ticker
+        if unknown:
+            index = get_cik_index()
+            await index.ensure_fresh(self.client)
+            for ticker in unknown:
+                try:
+                    self.watchlist[normalize_cik(index.lookup(ticker))] = ticker
+                except ValueError as e:
+                    print(str(e))
+        for ticker in self.tickers:
+            self.seen.update(self.manifest.filings(ticker))
+        return self.watchlist
+
+    def _known_cik(self, ticker: str) -> Optional[str]:
+        cik = self.manifest.tickers.get(ticker, {}).get('cik')
+        if cik:
+            return normalize_cik(cik)
+        concepts = glob(os.path.join(self.base_dir, ticker, 'company_concepts', 'CIK*.json'))
+        return normalize_cik(os.path.basename(concepts[0])[3:-5]) if concepts else None
+
+    async def offer(self, event: FilingEvent) -> bool:
+        """Queue an event if it is a watched company's form and not seen before; waits while the queue is full."""
+        self.stats['received'] += 1
+        ticker = self.watchlist.get(event.cik)
+        if ticker is None or event.form.split('/')[0] not in self.forms:
+            self.stats['ignored'] += 1
+            return False
+        if event.accession in self.seen:
+            self.stats['duplicates'] += 1
+            return False
+        self.seen.add(event.accession)
+        event.ticker = ticker
+        await self._put(event)
+        self.stats['queued'] += 1
+        return True
+
+    async def _put(self, item) -> None:
+        """queue.put that also watches the consumer: if it has stopped, nothing will make room in a full
+        queue, so its error (or a RuntimeError) is raised instead of waiting forever."""
+        if self.consumer is None:
+            await self.queue.put(item)
+            return
+        put = asyncio.ensure_future(self.queue.put(item))
+        done, _ = await asyncio.wait({put, self.consumer}, return_when=asyncio.FIRST_COMPLETED)
+        if put not in done:
+            put.cancel()
+            if not self.consumer.cancelled() and self.consumer.exception() is not None:
+                raise self.consumer.exception()
+            raise RuntimeError("the monitor's consumer stopped")
+
+    async def _next_batch(self) -> Tuple[List[FilingEvent], bool]:
+        event = await self.queue.get()
+        if event is _STOP:
+            return [], True
+        batch = [event]
+        deadline = asyncio.get_running_loop().time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            try:
+                event = self.queue.get_nowait() if timeout <= 0 else await asyncio.wait_for(self.queue.get(), timeout)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            if event is _STOP:
+                return batch, True
+            batch.append(event)
+        return batch, False
+
+    async def _consume(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            if not batch:
+                continue
+            try:
+                await self.process_batch(batch)
+            except Exception as e:
+                # Failures of the batch's work are already on its results (see process_batch); this is
+                # reporting or metrics failing. Keep serving, and let a later poll offer the filings again.
+                self.stats['batch_errors'] += 1
+                print(f"Monitor batch of {len(batch)} filings failed: {e!r}")
+                for event in batch:
+                    self.seen.discard(event.accession)
+
+    async def _acquire_lock(self):
+        # Batches write the manifest and filings like the download job, so they take turns with it
+        from sec_jobs import LOCK_FILE, PipelineLock
+
+        lock = PipelineLock(os.path.join(self.base_dir, LOCK_FILE))
+        while not lock.acquire():
+            await asyncio.sleep(self.batch_wait)
+        return lock
+
+    async def process_batch(self, batch: List[FilingEvent]) -> List[MonitorResult]:
+        from sec_download import download_filing
+
+        self.stats['batches'] += 1
+        started = time.perf_counter()
+        results = [MonitorResult(event) for event in batch]
+        lock = await self._acquire_lock()
+        try:
+            # Another process may have added filings since the last batch
+            self.manifest.load()
+            downloads = await asyncio.gather(*(
+                download_filing(r.event.ticker, r.event.cik, r.event.to_filing(),
+                                os.path.join(self.base_dir, r.event.ticker, 'filings'), self.client,
+                                manifest=self.manifest)
+                for r in results), return_exceptions=True)
+            for result, download in zip(results, downloads):
+                if isinstance(download, Exception) or download is None:
+                    result.error = str(download) if download is not None else "download failed"
+                else:
+                    result.path = download[0]
+            self.manifest.save()
+
+            # Extraction and diffing are CPU bound, keep the event loop free to read the feed
+            # (to_thread also carries the monitor's metrics registry into the worker thread)
+            await asyncio.to_thread(self._analyse, results)
+        except Exception as e:
+            # A manifest write, extraction, fact or diff error fails the whole batch (its outputs are
+            # incomplete) rather than the monitor
+            for result in results:
+                result.error = result.error or f"batch failed: {e!r}"
+        finally:
+            lock.release()
+
+        for result in results:
+            result.processed_at = time.time()
+            if result.error:
+                self.stats['failed'] += 1
+                # Let a later poll retry it
+                self.seen.discard(result.event.accession)
+            else:
+                self.stats['processed'] += 1
+                self._save_result(result)
+            sec_metrics.count('monitor_filings', status='failed' if result.error else 'processed',
+                              ticker=result.event.ticker)
+            self.on_result(result)
+        sec_metrics.observe(sec_metrics.STAGE_SECONDS, time.perf_counter() - started, stage='monitor_batch')
+        # Refreshed after every batch for a Prometheus textfile collector
+        sec_metrics.get_metrics().write(os.path.join(sec_metrics.default_metrics_dir(self.base_dir), 'monitor'))
+        return results
+
+    def _previous_filing(self, event: FilingEvent) -> Optional[str]:
+        """Path of the ticker's latest earlier filing of the same form. A report is compared with the
+        previous report, an amendment (10-Q/A) with whatever it amends or the previous amendment."""
+        form, amendment = event.form.split('/')[0], '/' in event.form
+
+        def _comparable(record):
+            record_form = record.get('form') or ''
+            return record_form.split('/')[0] == form and (amendment or '/' not in record_form)
+
+        candidates = [record for accession, record in self.manifest.filings(event.ticker).items()
+                      if accession != event.accession and _comparable(record)
+                      and (record.get('filed') or '') <= event.filing_date and os.path.exists(record['path'])]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda record: (record['filed'], record['path']))['path']
+
+    def _analyse(self, results: List[MonitorResult]) -> None:
+        from sec_diff import compare_filings
+        from sec_loader import FilingText, SECFilingLoader
+        from sec_xbrl import format_accession
+
+        loader = SECFilingLoader(base_dir=self.base_dir)
+        ready = [r for r in results if r.path is not None]
+        for result in ready:
+            result.previous_path = self._previous_filing(result.event)
+
+        # One pass over the batch's documents and their predecessors fills the text cache
+        paths = list(dict.fromkeys([r.path for r in ready] + [r.previous_path for r in ready if r.previous_path]))
+        for file_path, clean_text in loader.iter_extracted_texts(paths):
+            if not clean_text:
+                for result in ready:
+                    if result.path == file_path:
+                        result.error = "no text could be extracted"
+                continue
+            index = loader.index_filing(file_path, clean_text)
+            for result in ready:
+                if result.path == file_path:
+                    result.sections = index.names()
+
+        ready = [r for r in ready if r.error is None]
+        facts = loader.load_inline_facts(file_paths=[r.path for r in ready])
+        for result in ready:
+            accession = format_accession(result.event.accession)
+            filing_facts = facts[facts['Accession'] == accession]
+            if filing_facts.empty:
+                continue
+            result_dir = os.path.join(self.base_dir, result.event.ticker, MONITOR_DIR)
+            os.makedirs(result_dir, exist_ok=True)
+            result.facts_path = os.path.join(result_dir, f'{result.event.accession}.facts.csv')
+            filing_facts.to_csv(result.facts_path, index=False)
+            result.facts = len(filing_facts)
+
+        comparisons = compare_filings(
+            (FilingText(r.previous_path, loader.text_cache_path) if r.previous_path else None,
+             FilingText(r.path, loader.text_cache_path)) for r in ready)
+        for result, comparison in zip(ready, comparisons):
+            result.comparison = comparison
+
+    def _save_result(self, result: MonitorResult) -> None:
+        result_dir = os.path.join(self.base_dir, result.event.ticker, MONITOR_DIR)
+        os.makedirs(result_dir, exist_ok=True)
+        path = os.path.join(result_dir, f'{result.event.accession}.json')
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(result.to_dict(), f, indent=2)
+        os.replace(f'{path}.tmp', path)
+
+    async def run(self, feed=None) -> dict:
+        """Monitor until the feed ends (a recorded feed) or the task is cancelled, then drain the queue.
+
+        Without a feed the submissions API of the watched companies is polled.
+        """
+        from http_cache import HTTPCache
+        from sec_client import SECClient
+
+        sec_metrics.start_run('monitor')
+        owns_client = self.client is None
+        if owns_client:
+            self.client = SECClient(cache=HTTPCache())
+        await self.client.open()
+        try:
+            await self.load_watchlist()
+            if feed is None:
+                feed = SubmissionsFeed(self.client, self.watchlist, forms=self.forms)
+            print(f"Starting SEC filing monitor at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} "
+                  f"for {', '.join(self.watchlist.values())} ({', '.join(self.forms)})")
+
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.consumer = consumer = asyncio.create_task(self._consume())
+            try:
+                async for event in feed.events():
+                    # Raises the consumer's error if it stopped, instead of filling the queue forever
+                    await self.offer(event)
+            finally:
+                try:
+                    if not consumer.done():
+                        await self._put(_STOP)
+                    await consumer
+                finally:
+                    self.consumer = None
+        finally:
+            if owns_client:
+                await self.client.close()
+        return self.stats
+
+
+# Run the monitor:
+#   python sec_monitor.py                            # poll the submissions API of CONFIG['TICKERS']
+#   python sec_monitor.py --record feed.jsonl        # ... and record the feed
+#   python sec_monitor.py --replay Input_Data/monitor_feed_PHAT.jsonl [--speed 10]   # offline, with sec_data/PHAT
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Monitor SEC filings of the watched tickers.")
+    parser.add_argument('--replay', help="replay a recorded feed instead of polling EDGAR")
+    parser.add_argument('--speed', type=float, default=0, help="replay speed, 0 = as fast as possible")
+    parser.add_argument('--record', help="append the polled feed to this JSON lines file")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="seconds between polls")
+    args = parser.parse_args()
+
+    async def _main():
+        from http_cache import HTTPCache
+        from sec_client import SECClient
+
+        async with SECClient(cache=HTTPCache()) as client:
+            monitor = SECMonitor(client=client)
+            if args.replay:
+                feed = RecordedFeed(args.replay, speed=args.speed)
+            else:
+                await monitor.load_watchlist()
+                feed = SubmissionsFeed(client, monitor.watchlist, forms=monitor.forms, interval=args.interval)
+                if args.record:
+                    feed = RecordingFeed(feed, args.record)
+            stats = await monitor.run(feed)
+        print(f"Monitor stopped: {stats}")
+
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        print("\nMonitoring stopped by user")
@@ -0,0 +1,110 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, List, Optional
+
+# SEC fair-access policy allows at most 10 requests per second per client
+EDGAR_MAX_REQUESTS_PER_SECOND = 10
+
+
+class RateLimiter:
+    """Global async rate limiter that spaces request starts evenly so the cap is never exceeded."""
+
+    def __init__(self, requests_per_second: float = 8):
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        if requests_per_second > EDGAR_MAX_REQUESTS_PER_SECOND:
+            raise ValueError(f"requests_per_second must not exceed EDGAR's limit of {EDGAR_MAX_REQUESTS_PER_SECOND}")
+        self.requests_per_second = requests_per_second
+        self._interval = 1.0 / requests_per_second
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+        self.total_requests = 0
+
+    async def acquire(self) -> None:
+        """Wait until the next request slot is available."""
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+            self.total_requests += 1
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+@dataclass
+class TickerResult:
+    ticker: str
+    ok: bool = False
+    value: Any = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+
+@dataclass
+class RunSummary:
+    results: List[TickerResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def succeeded(self) -> List[TickerResult]:
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self) -> List[TickerResult]:
+        return [r for r in self.results if not r.ok]
+
+
+def print_progress(done: int, total: int, result: TickerResult) -> None:
+    """Default progress reporter, one line per finished ticker."""
+    if result.ok:
+        print(f"[{done}/{total}] {result.ticker} done in {result.elapsed:.1f}s")
+    else:
+        print(f"[{done}/{total}] {result.ticker} FAILED after {result.elapsed:.1f}s: {result.error}")
+
+
+async def run_tickers(
+    tickers: List[str],
+    worker: Callable[[str], Awaitable[Any]],
+    max_concurrency: int = 8,
+    on_progress: Optional[Callable[[int, int, TickerResult], None]] = print_progress,
+) -> RunSummary:
+    """Run `worker(ticker)` for every ticker with at most `max_concurrency` in flight.
+
+    A failing ticker never cancels the others; its exception is recorded on its TickerResult.
+    Results are returned in the same order as `tickers`.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    total = len(tickers)
+    done = 0
+    run_started = time.monotonic()
+
+    async def run_one(ticker: str) -> TickerResult:
+        nonlocal done
+        async with semaphore:
+            result = TickerResult(ticker=ticker)
+            started = time.monotonic()
+            try:
+                result.value = await worker(ticker)
+                result.ok = True
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+            result.elapsed = time.monotonic() - started
+            done += 1
+            if on_progress is not None:
+                on_progress(done, total, result)
+            return result
+
+    results = await asyncio.gather(*(run_one(ticker) for ticker in tickers))
+    return RunSummary(results=list(results), elapsed=time.monotonic() - run_started)
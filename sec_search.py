@@ -0,0 +1,270 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from config import CONFIG  # Import the config dictionary
+from sec_diff import SENTENCE_BOUNDARY
+from sec_sections import SectionIndex
+
+# Bump when what is indexed changes (tokenizer, passage split) so filings are re-indexed
+SEARCH_VERSION = 1
+
+# Sections are indexed in passages of about this many characters, cut at sentence ends, so ranking
+# and snippets only ever look at a paragraph-sized row
+PASSAGE_LENGTH = 2000
+# Passage rowids are <document id> * PASSAGE_SLOTS + n, so a filing's passages are one rowid range
+PASSAGE_SLOTS = 100_000
+
+# How SQLite reports a MATCH string that is not valid FTS5 query syntax ('PF-07081532' reads as a column filter)
+QUERY_SYNTAX_ERRORS = ('fts5: syntax error', 'no such column', 'unterminated string', 'unknown special query')
+
+RESULT_COLUMNS = ['ticker', 'accession_number', 'filing_date', 'form', 'section', 'snippet', 'rank']
+
+
+def default_index_path(base_dir: Optional[str] = None) -> str:
+    return os.path.join(base_dir or CONFIG['BASE_DIR'], '.cache', 'search_index.sqlite')
+
+
+def phrase(text: str) -> str:
+    """`text` as one FTS5 phrase, e.g. phrase('clinical hold') -> '"clinical hold"'."""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def any_of(terms: Iterable[str]) -> str:
+    """Query matching any of the phrases in `terms`."""
+    return ' OR '.join(phrase(term) for term in terms)
+
+
+def split_passages(text: str, length: int = PASSAGE_LENGTH) -> List[str]:
+    """Consecutive pieces of `text` of about `length` characters, ending at sentence ends where possible."""
+    passages = []
+    start = 0
+    while start < len(text):
+        end = start + length
+        if end < len(text):
+            match = SENTENCE_BOUNDARY.search(text, end, min(len(text), end + length // 2))
+            end = match.start() if match else end
+        passages.append(text[start:end].strip())
+        start = end
+    return [passage for passage in passages if passage]
+
+
+class SearchIndex:
+    """On-disk full-text index of extracted filings, an SQLite FTS5 table of passages labelled with their item section.
+
+    `documents` keeps each filing's ticker, accession, date and form with the size and mtime the
+    file had when indexed, so a build only indexes new or changed filings. Queries use the FTS5
+    syntax: words, "phrases", AND / OR / NOT, NEAR(...), prefix*; see search().
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_index_path()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                file_path TEXT NOT NULL UNIQUE,
+                ticker TEXT NOT NULL,
+                accession_number TEXT NOT NULL,
+                filing_date TEXT,
+                form TEXT,
+                size INTEGER,
+                mtime_ns INTEGER,
+                version INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_documents_ticker ON documents (ticker);
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages USING fts5(
+                text, section UNINDEXED, document_id UNINDEXED,
+                tokenize = 'unicode61 remove_diacritics 2'
+            );
+        """)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def needs_update(self, file_path: str) -> bool:
+        """Whether `file_path` is not indexed yet, changed since, or was indexed by an older version."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._conn.execute('SELECT size, mtime_ns, version FROM documents WHERE file_path = ?',
+                                     (os.path.abspath(file_path),)).fetchone()
+        return row is None or tuple(row) != (stat.st_size, stat.st_mtime_ns, SEARCH_VERSION)
+
+    def add_document(self, file_path: str, ticker: str, accession_number: str, filing_date: Optional[str],
+                     text: str, sections: Optional[SectionIndex] = None, commit: bool = True) -> None:
+        """(Re-)index a filing's text, one passage per item section plus the text before the first item."""
+        key = os.path.abspath(file_path)
+        try:
+            stat = os.stat(file_path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size = mtime_ns = None
+
+        parts = []
+        boundaries = sorted(sections.sections, key=lambda s: s.start) if sections is not None else []
+        if not boundaries or boundaries[0].start > 0:
+            parts.append(('', text[:boundaries[0].start] if boundaries else text))
+        parts.extend((section.name, text[section.start:section.end]) for section in boundaries)
+        rows = [(name, passage) for name, body in parts for passage in split_passages(body)][:PASSAGE_SLOTS]
+
+        with self._lock:
+            self._delete(key)
+            cursor = self._conn.execute(
+                'INSERT INTO documents (file_path, ticker, accession_number, filing_date, form, size, mtime_ns, '
+                'version) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, ticker, accession_number, filing_date, sections.form if sections is not None else None,
+                 size, mtime_ns, SEARCH_VERSION))
+            document_id = cursor.lastrowid
+            self._conn.executemany('INSERT INTO passages (rowid, text, section, document_id) VALUES (?, ?, ?, ?)',
+                                   [(document_id * PASSAGE_SLOTS + n, body, name, document_id)
+                                    for n, (name, body) in enumerate(rows)])
+            if commit:
+                self._conn.commit()
+
+    def commit(self) -> None:
+        with self._lock:
+            self._conn.commit()
+
+    def _delete(self, key: str) -> None:
+        # Caller holds the lock
+        row = self._conn.execute('SELECT id FROM documents WHERE file_path = ?', (key,)).fetchone()
+        if row is not None:
+            self._conn.execute('DELETE FROM passages WHERE rowid >= ? AND rowid < ?',
+                               (row[0] * PASSAGE_SLOTS, (row[0] + 1) * PASSAGE_SLOTS))
+            self._conn.execute('DELETE FROM documents WHERE id = ?', (row[0],))
+
+    def remove_missing(self, tickers: Optional[Iterable[str]] = None) -> int:
+        """Drop filings (of `tickers`, or all) whose file no longer exists."""
+        with self._lock:
+            sql = 'SELECT file_path FROM documents'
+            params: list = []
+            if tickers is not None:
+                tickers = list(tickers)
+                sql += f" WHERE ticker IN ({','.join('?' * len(tickers))})"
+                params = tickers
+            missing = [path for (path,) in self._conn.execute(sql, params) if not os.path.exists(path)]
+            for path in missing:
+                self._delete(path)
+            self._conn.commit()
+        return len(missing)
+
+    def search(self, query: str, tickers: Optional[List[str]] = None, sections: Optional[List[str]] = None,
+               forms: Optional[List[str]] = None, limit: Optional[int] = 100, snippet_tokens: int = 16,
+               snippets: bool = True) -> pd.DataFrame:
+        """Passages matching an FTS5 query, best match first, with a snippet around the hit.
+
+        Examples: 'clinical hold' (both words), '"clinical hold"' (the phrase, see phrase()),
+        '"going concern" OR "substantial doubt"', 'vonoprazan NOT "risk factors"', 'NEAR(fda hold, 5)'.
+        Operators apply within one passage (about PASSAGE_LENGTH characters), not across a whole filing.
+        Snippets are only built for the `limit` passages returned; without `snippets` the column is empty.
+        Text that is not valid query syntax ('PF-07081532', 'risk-factors') is searched as a phrase.
+        """
+        where = 'passages MATCH ?'
+        params: list = [query]
+        for column, values in (('d.ticker', tickers), ('passages.section', sections), ('d.form', forms)):
+            if values:
+                where += f" AND {column} IN ({','.join('?' * len(values))})"
+                params.extend(values)
+        hits = (f"SELECT passages.rowid AS passage_id, d.id AS document_id, passages.section AS section, "
+                f"bm25(passages) AS score FROM passages JOIN documents d ON d.id = passages.document_id "
+                f"WHERE {where} ORDER BY score")
+        if limit is not None:
+            hits += ' LIMIT ?'
+            params.append(int(limit))
+
+        if snippets:
+            snippet = f"snippet(passages, 0, '[', ']', '...', {int(snippet_tokens)})"
+            sql = (f"WITH hits AS ({hits}) SELECT d.ticker, d.accession_number, d.filing_date, d.form, "
+                   f"hits.section, {snippet}, hits.score FROM hits JOIN passages ON passages.rowid = hits.passage_id "
+                   f"JOIN documents d ON d.id = hits.document_id WHERE passages MATCH ? ORDER BY hits.score")
+            params.append(query)
+        else:
+            sql = (f"WITH hits AS ({hits}) SELECT d.ticker, d.accession_number, d.filing_date, d.form, "
+                   f"hits.section, NULL, hits.score FROM hits JOIN documents d ON d.id = hits.document_id "
+                   f"ORDER BY hits.score")
+        try:
+            with self._lock:
+                rows = self._conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            if not str(e).startswith(QUERY_SYNTAX_ERRORS):
+                raise
+            # A phrase is always valid syntax, so this retries at most once
+            return self.search(phrase(query), tickers=tickers, sections=sections, forms=forms, limit=limit,
+                               snippet_tokens=snippet_tokens, snippets=snippets)
+        return pd.DataFrame(rows, columns=RESULT_COLUMNS)
+
+    def mentions(self, terms: Iterable[str], tickers: Optional[List[str]] = None) -> pd.DataFrame:
+        """Per phrase, the tickers and filings mentioning it: term, ticker, accession_number, filing_date, sections."""
+        frames = []
+        for term in terms:
+            hits = self.search(phrase(term), tickers=tickers, limit=None, snippets=False)
+            if hits.empty:
+                continue
+            grouped = (hits.groupby(['ticker', 'accession_number', 'filing_date'])['section']
+                       .agg(lambda s: sorted(set(s))).reset_index(name='sections'))
+            grouped.insert(0, 'term', term)
+            frames.append(grouped)
+        columns = ['term', 'ticker', 'accession_number', 'filing_date', 'sections']
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+    def stats(self) -> dict:
+        with self._lock:
+            documents, tickers = self._conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT ticker) FROM documents').fetchone()
+            passages = self._conn.execute('SELECT COUNT(*) FROM passages').fetchone()[0]
+        wal_path = f'{self.path}-wal'
+        db_bytes = os.path.getsize(self.path) + (os.path.getsize(wal_path) if os.path.exists(wal_path) else 0)
+        return {'documents': documents, 'tickers': tickers, 'passages': passages, 'db_bytes': db_bytes}
+
+    def optimize(self) -> None:
+        """Merge the FTS5 segments written by many small incremental builds."""
+        with self._lock:
+            self._conn.execute("INSERT INTO passages (passages) VALUES ('optimize')")
+            self._conn.commit()
+
+
+_search_indexes: Dict[str, SearchIndex] = {}
+
+
+def shared_search_index(path: str) -> SearchIndex:
+    if path not in _search_indexes:
+        _search_indexes[path] = SearchIndex(path)
+    return _search_indexes[path]
+
+
+def close_search_indexes(under: Optional[str] = None) -> None:
+    """Close the shared indexes (those stored under `under` only), e.g. before their directory is deleted."""
+    prefix = os.path.join(os.path.abspath(under), '') if under else ''
+    for path in [p for p in _search_indexes if os.path.abspath(p).startswith(prefix)]:
+        _search_indexes.pop(path).close()
+
+
+# Search the index of BASE_DIR from the command line (FTS5 query syntax):
+#   python sec_search.py '"clinical hold" OR "going concern"' [TICKER ...]
+#   python sec_search.py --build [TICKER ...]
+if __name__ == '__main__':
+    import sys
+    from sec_loader import SECFilingLoader
+
+    args = sys.argv[1:]
+    loader = SECFilingLoader(base_dir=CONFIG['BASE_DIR'])
+    if args and args[0] == '--build':
+        indexed = loader.build_search_index(args[1:] or None)
+        print(f"Indexed {indexed} new or changed filings, {loader.search_index.stats()}")
+    elif args:
+        if not loader.search_index.stats()['documents']:
+            print("The search index is empty, build it with: python sec_search.py --build")
+        pd.set_option('display.max_colwidth', 120)
+        print(loader.search_index.search(args[0], tickers=args[1:] or None).to_string(index=False))
+    else:
+        print("Usage: python sec_search.py QUERY [TICKER ...] | --build [TICKER ...]")
@@ -0,0 +1,218 @@
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+# Bump when the parser changes so persisted indexes are rebuilt
+SECTIONS_VERSION = 1
+
+# Standard items per form: (part, item) -> (section name, title)
+ITEMS_10Q = {
+    ('I', '1'): ('financial_statements', 'Financial Statements'),
+    ('I', '2'): ('mda', "Management's Discussion and Analysis of Financial Condition and Results of Operations"),
+    ('I', '3'): ('market_risk', 'Quantitative and Qualitative Disclosures About Market Risk'),
+    ('I', '4'): ('controls', 'Controls and Procedures'),
+    ('II', '1'): ('legal_proceedings', 'Legal Proceedings'),
+    ('II', '1A'): ('risk_factors', 'Risk Factors'),
+    ('II', '2'): ('unregistered_sales', 'Unregistered Sales of Equity Securities and Use of Proceeds'),
+    ('II', '3'): ('defaults', 'Defaults Upon Senior Securities'),
+    ('II', '4'): ('mine_safety', 'Mine Safety Disclosures'),
+    ('II', '5'): ('other_information', 'Other Information'),
+    ('II', '6'): ('exhibits', 'Exhibits'),
+}
+ITEMS_10K = {
+    ('I', '1'): ('business', 'Business'),
+    ('I', '1A'): ('risk_factors', 'Risk Factors'),
+    ('I', '1B'): ('unresolved_staff_comments', 'Unresolved Staff Comments'),
+    ('I', '1C'): ('cybersecurity', 'Cybersecurity'),
+    ('I', '2'): ('properties', 'Properties'),
+    ('I', '3'): ('legal_proceedings', 'Legal Proceedings'),
+    ('I', '4'): ('mine_safety', 'Mine Safety Disclosures'),
+    ('II', '5'): ('market_for_equity', "Market for Registrant's Common Equity, Related Stockholder Matters "
+                                       "and Issuer Purchases of Equity Securities"),
+    ('II', '6'): ('reserved', 'Reserved'),
+    ('II', '7'): ('mda', "Management's Discussion and Analysis of Financial Condition and Results of Operations"),
+    ('II', '7A'): ('market_risk', 'Quantitative and Qualitative Disclosures About Market Risk'),
+    ('II', '8'): ('financial_statements', 'Financial Statements and Supplementary Data'),
+    ('II', '9'): ('accountant_changes', 'Changes in and Disagreements with Accountants on Accounting '
+                                        'and Financial Disclosure'),
+    ('II', '9A'): ('controls', 'Controls and Procedures'),
+    ('II', '9B'): ('other_information', 'Other Information'),
+    ('II', '9C'): ('foreign_inspections', 'Disclosure Regarding Foreign Jurisdictions that Prevent Inspections'),
+    ('III', '10'): ('directors', 'Directors, Executive Officers and Corporate Governance'),
+    ('III', '11'): ('executive_compensation', 'Executive Compensation'),
+    ('III', '12'): ('security_ownership', 'Security Ownership of Certain Beneficial Owners and Management '
+                                          'and Related Stockholder Matters'),
+    ('III', '13'): ('relationships', 'Certain Relationships and Related Transactions, and Director Independence'),
+    ('III', '14'): ('accountant_fees', 'Principal Accountant Fees and Services'),
+    ('IV', '15'): ('exhibits', 'Exhibits and Financial Statement Schedules'),
+    ('IV', '16'): ('summary', 'Form 10-K Summary'),
+}
+FORM_ITEMS = {'10-Q': ITEMS_10Q, '10-K': ITEMS_10K}
+
+# The cover page names the form ("FORM 10-Q", "FORM 10-K/A"); other mentions of "Form 10-K"
+# (references to the annual report) come later and must not decide the type
+FORM_PATTERN = re.compile(r'\bFORM\s+(10-[KQ])(\s*/\s*A)?\b')
+REPORT_PATTERN = re.compile(r'\b(QUARTERLY|ANNUAL)\s+REPORT\s+PURSUANT\b')
+PART_PATTERN = re.compile(r'\bPART\s+(IV|III|II|I)\s*[.:\-–—]?\s+(?=[A-Z])')
+ITEM_PATTERN = re.compile(r'\bITEM\s+(\d{1,2}[A-C]?)\b\s*([.:\-–—,]?)', re.IGNORECASE)
+
+# Characters of a heading's title that have to match; extraction can split words ("Ri sk Factors")
+TITLE_MATCH_LETTERS = 12
+
+
+def detect_form(text: str, filename: str = '') -> Optional[str]:
+    """Form type from the cover page: '10-Q', '10-K', '10-Q/A', '10-K/A', or None."""
+    match = FORM_PATTERN.search(text)
+    if match:
+        return match.group(1) + ('/A' if match.group(2) else '')
+    match = REPORT_PATTERN.search(text)
+    if match:
+        return '10-Q' if match.group(1) == 'QUARTERLY' else '10-K'
+    for form in ('10-Q', '10-K'):
+        if form in filename.upper():
+            return form
+    return None
+
+
+def _letters(text: str) -> str:
+    return re.sub(r'[^a-z]', '', text.lower().replace('’', "'"))
+
+
+@dataclass
+class Section:
+    name: str
+    part: str
+    item: str
+    title: str
+    start: int
+    end: int
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start
+
+
+@dataclass
+class SectionIndex:
+    """Character offsets of a filing's items within its extracted text."""
+    form: Optional[str]
+    text_length: int
+    sections: List[Section]
+
+    def get(self, name: str) -> Optional[Section]:
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    def names(self) -> List[str]:
+        return [section.name for section in self.sections]
+
+    def slice(self, text: str, name: str) -> Optional[str]:
+        """Text of section `name`, or None if the filing does not have it."""
+        section = self.get(name)
+        return None if section is None else text[section.start:section.end]
+
+    def section_at(self, offset: int) -> Optional[Section]:
+        for section in self.sections:
+            if section.start <= offset < section.end:
+                return section
+        return None
+
+    def to_dict(self) -> dict:
+        return {'version': SECTIONS_VERSION, 'form': self.form, 'text_length': self.text_length,
+                'sections': [asdict(section) for section in self.sections]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SectionIndex':
+        return cls(data['form'], data['text_length'], [Section(**s) for s in data['sections']])
+
+
+def _heading_candidates(text: str, items: Dict[Tuple[str, str], Tuple[str, str]]):
+    """(offset, part, item) of every 'Item N.' occurrence whose following words are that item's title.
+
+    Cross references ("Part I, Item 1A, “Risk Factors”", "Item 1 of this report") fail the title
+    check or are followed by a comma, so only headings, from the table of contents and body, remain.
+    """
+    parts = [(m.start(), m.group(1)) for m in PART_PATTERN.finditer(text)]
+    titles = {}
+    for (part, item), (_, title) in items.items():
+        titles.setdefault(item, []).append((part, _letters(title)[:TITLE_MATCH_LETTERS]))
+
+    candidates = []
+    part_index = -1
+    for match in ITEM_PATTERN.finditer(text):
+        while part_index + 1 < len(parts) and parts[part_index + 1][0] < match.start():
+            part_index += 1
+        item = match.group(1).upper()
+        if item not in titles or match.group(2) == ',':
+            continue
+        following = _letters(text[match.end():match.end() + 4 * TITLE_MATCH_LETTERS])
+        current_part = parts[part_index][1] if part_index >= 0 else None
+        matching = [part for part, title in titles[item] if following.startswith(title)]
+        if not matching:
+            continue
+        # 10-Q items repeat across parts ("Item 1" is Financial Statements and Legal Proceedings)
+        part = current_part if current_part in matching else matching[0]
+        candidates.append((match.start(), part, item))
+    return candidates
+
+
+def parse_sections(text: str, form: Optional[str] = None, filename: str = '') -> SectionIndex:
+    """Split extracted filing text into its standard items.
+
+    Each item's body is its last heading occurrence (the table of contents comes first); a section
+    runs until the next item found. Items of unknown forms are parsed as 10-Q when the cover page
+    does not say otherwise.
+    """
+    form = form or detect_form(text, filename)
+    items = FORM_ITEMS['10-K' if form and form.startswith('10-K') else '10-Q']
+    order = {key: position for position, key in enumerate(items)}
+
+    last = {}
+    for offset, part, item in _heading_candidates(text, items):
+        last[(part, item)] = offset
+
+    # Keep the headings whose offsets increase in the form's item order
+    chosen = []
+    for key in sorted(last, key=order.get):
+        if not chosen or last[key] > chosen[-1][0]:
+            chosen.append((last[key], key))
+
+    sections = []
+    for position, (start, key) in enumerate(chosen):
+        end = chosen[position + 1][0] if position + 1 < len(chosen) else len(text)
+        name, title = items[key]
+        sections.append(Section(name, key[0], key[1], title, start, end))
+    return SectionIndex(form, len(text), sections)
+
+
+def index_path(filing_path: str) -> str:
+    """The offsets index is persisted next to the filing as `<filing>.sections.json`."""
+    return f'{filing_path}.sections.json'
+
+
+def save_index(filing_path: str, index: SectionIndex) -> None:
+    stat = os.stat(filing_path)
+    data = index.to_dict()
+    data.update({'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns})
+    path = index_path(filing_path)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def load_index(filing_path: str) -> Optional[SectionIndex]:
+    """The persisted index of a filing, or None if it is missing, outdated or the filing changed."""
+    try:
+        with open(index_path(filing_path), 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        stat = os.stat(filing_path)
+    except (OSError, ValueError):
+        return None
+    if (data.get('version') != SECTIONS_VERSION or data.get('source_size') != stat.st_size
+            or data.get('source_mtime_ns') != stat.st_mtime_ns):
+        return None
+    return SectionIndex.from_dict(data)
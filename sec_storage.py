@@ -0,0 +1,334 @@
+import os
+import shutil
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from config import CONFIG  # Import the config dictionary
+from nlp_functions import DATE_COLUMNS, FACT_COLUMNS as FLAT_FACT_COLUMNS
+
+# flatten_json_data's columns plus the ticker the facts were stored under
+FACT_COLUMNS = FLAT_FACT_COLUMNS + ['Ticker']
+# Stored as categoricals (dictionary-encoded in Parquet): the low-cardinality columns of FACT_COLUMNS
+CATEGORICAL_COLUMNS = ['Taxonomy', 'Concept', 'Unit', 'Fiscal Period', 'Form', 'Ticker']
+
+
+class FactStore(ABC):
+    """Where process_sec_data writes flattened companyfacts and load_sec_data reads them back.
+
+    Backends implement `write_ticker`, `write_combined`, `exists` and `read_facts`, plus
+    `has_ticker`, `append_ticker` and `update_combined` for incremental runs.
+    `read_facts` filters on Ticker, Concept and a Filed Date range; backends that can push
+    those predicates down to storage do so, others filter after loading.
+    """
+
+    name = 'base'
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+
+    @abstractmethod
+    def write_ticker(self, ticker: str, df: pd.DataFrame, unit_dfs: Dict[str, pd.DataFrame]) -> None:
+        ...
+
+    @abstractmethod
+    def write_combined(self, df: pd.DataFrame) -> None:
+        ...
+
+    @abstractmethod
+    def has_ticker(self, ticker: str) -> bool:
+        ...
+
+    @abstractmethod
+    def append_ticker(self, ticker: str, df: pd.DataFrame, unit_dfs: Dict[str, pd.DataFrame]) -> None:
+        """Add new fact rows of a ticker to what is already stored for it."""
+
+    @abstractmethod
+    def update_combined(self, df: pd.DataFrame, replaced_tickers: List[str]) -> None:
+        """Bring the combined view up to date after an incremental run: drop the rows of
+        `replaced_tickers` (rewritten in full this run), then add `df`."""
+
+    @abstractmethod
+    def exists(self) -> bool:
+        ...
+
+    @abstractmethod
+    def last_modified(self) -> float:
+        """Modification time of the newest written data (0.0 if there is none)."""
+
+    @abstractmethod
+    def read_facts(self, tickers: Optional[List[str]] = None, concepts: Optional[List[str]] = None,
+                   start: Optional[str] = None, end: Optional[str] = None,
+                   columns: Optional[List[str]] = None) -> pd.DataFrame:
+        ...
+
+    @abstractmethod
+    def iter_facts(self, batch_size: int = 50_000, tickers: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """Stored facts as DataFrames of at most `batch_size` rows, without loading them all at once."""
+
+
+def _filter_facts(df, tickers=None, concepts=None, start=None, end=None):
+    mask = pd.Series(True, index=df.index)
+    if tickers is not None:
+        mask &= df['Ticker'].isin(tickers)
+    if concepts is not None:
+        mask &= df['Concept'].isin(concepts)
+    if start is not None:
+        mask &= df['Filed Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Filed Date'] <= pd.Timestamp(end)
+    return df if mask.all() else df[mask]
+
+
+class CSVFactStore(FactStore):
+    """The original layout: sec_data_{ticker}.csv and df_{unit}_{ticker}.csv per ticker plus
+    a combined sec_data_all_tickers.csv, which every read re-parses in full."""
+
+    name = 'csv'
+
+    @property
+    def combined_path(self) -> str:
+        return os.path.join(self.base_dir, 'sec_data_all_tickers.csv')
+
+    def write_ticker(self, ticker, df, unit_dfs):
+        ticker_dir = os.path.join(self.base_dir, ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        df.to_csv(os.path.join(ticker_dir, f'sec_data_{ticker}.csv'), index=False)
+        for unit_name, unit_df in unit_dfs.items():
+            unit_df.to_csv(os.path.join(ticker_dir, f'{unit_name}_{ticker}.csv'), index=False)
+
+    def write_combined(self, df):
+        df.to_csv(self.combined_path, index=False)
+
+    def has_ticker(self, ticker):
+        return os.path.exists(os.path.join(self.base_dir, ticker, f'sec_data_{ticker}.csv'))
+
+    @staticmethod
+    def _append_csv(df, path):
+        df.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+    def append_ticker(self, ticker, df, unit_dfs):
+        ticker_dir = os.path.join(self.base_dir, ticker)
+        os.makedirs(ticker_dir, exist_ok=True)
+        self._append_csv(df, os.path.join(ticker_dir, f'sec_data_{ticker}.csv'))
+        for unit_name, unit_df in unit_dfs.items():
+            self._append_csv(unit_df, os.path.join(ticker_dir, f'{unit_name}_{ticker}.csv'))
+
+    def update_combined(self, df, replaced_tickers):
+        if not replaced_tickers:
+            if not df.empty:
+                self._append_csv(df, self.combined_path)
+            return
+        existing = pd.read_csv(self.combined_path) if self.exists() else pd.DataFrame()
+        if not existing.empty:
+            existing = existing[~existing['Ticker'].isin(replaced_tickers)]
+        pd.concat([existing, df], ignore_index=True).to_csv(self.combined_path, index=False)
+
+    def exists(self):
+        return os.path.exists(self.combined_path)
+
+    def last_modified(self):
+        return os.path.getmtime(self.combined_path) if self.exists() else 0.0
+
+    def read_facts(self, tickers=None, concepts=None, start=None, end=None, columns=None):
+        usecols = None
+        if columns is not None:
+            # The filter columns have to be loaded too, CSV cannot filter while reading
+            usecols = list(dict.fromkeys(list(columns) + ['Ticker', 'Concept', 'Filed Date']))
+        df = pd.read_csv(self.combined_path, usecols=usecols)
+        for col in DATE_COLUMNS:
+            if col in df.columns:
+                df[col] = pd.to_datetime(df[col], errors='coerce')
+        df = _filter_facts(df, tickers, concepts, start, end)
+        return df if columns is None else df[list(columns)]
+
+    def iter_facts(self, batch_size=50_000, tickers=None):
+        for chunk in pd.read_csv(self.combined_path, chunksize=batch_size):
+            for col in DATE_COLUMNS:
+                chunk[col] = pd.to_datetime(chunk[col], errors='coerce')
+            chunk = _filter_facts(chunk, tickers)
+            if not chunk.empty:
+                yield chunk
+
+
+class ParquetFactStore(FactStore):
+    """Typed, columnar store: one Parquet file per ticker and unit under
+    `<base_dir>/facts/Ticker=<ticker>/<unit>.parquet`.
+
+    Reads go through a pyarrow dataset, so a Ticker filter only opens that ticker's
+    directory and Concept / Filed Date filters skip row groups using the Parquet statistics
+    (rows are written sorted by Taxonomy, Concept and End). There is no combined file, the
+    dataset itself is the all-tickers view.
+    """
+
+    name = 'parquet'
+    row_group_size = 64_000
+
+    @property
+    def root(self) -> str:
+        return os.path.join(self.base_dir, 'facts')
+
+    @staticmethod
+    def schema():
+        import pyarrow as pa
+        return pa.schema([
+            ('Taxonomy', pa.string()),
+            ('Concept', pa.string()),
+            ('Unit', pa.string()),
+            ('Value', pa.float64()),
+            ('Start', pa.timestamp('ns')),
+            ('End', pa.timestamp('ns')),
+            ('Accession', pa.string()),
+            ('Fiscal Year', pa.int64()),
+            ('Fiscal Period', pa.string()),
+            ('Form', pa.string()),
+            ('Filed Date', pa.timestamp('ns')),
+            ('Frame', pa.string()),
+        ])
+
+    def write_ticker(self, ticker, df, unit_dfs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        ticker_dir = os.path.join(self.root, f'Ticker={ticker}')
+        # Replace the ticker's partition wholesale so units that disappeared do not linger
+        tmp_dir = f'{ticker_dir}.tmp'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        schema = self.schema()
+        for unit_name, unit_df in unit_dfs.items():
+            file_name = unit_name[len('df_'):] if unit_name.startswith('df_') else unit_name
+            table = pa.Table.from_pandas(unit_df[schema.names], schema=schema, preserve_index=False)
+            pq.write_table(table, os.path.join(tmp_dir, f'{file_name}.parquet'),
+                           row_group_size=self.row_group_size, compression='zstd')
+        shutil.rmtree(ticker_dir, ignore_errors=True)
+        os.replace(tmp_dir, ticker_dir)
+
+    def write_combined(self, df):
+        # The partitioned dataset already is the combined view
+        pass
+
+    def has_ticker(self, ticker):
+        return os.path.isdir(os.path.join(self.root, f'Ticker={ticker}'))
+
+    def append_ticker(self, ticker, df, unit_dfs):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # New rows go to extra files next to the existing ones; the next full write of the
+        # ticker replaces the partition and so compacts them again
+        ticker_dir = os.path.join(self.root, f'Ticker={ticker}')
+        os.makedirs(ticker_dir, exist_ok=True)
+        schema = self.schema()
+        stamp = time.time_ns() // 1_000_000
+        for unit_name, unit_df in unit_dfs.items():
+            file_name = unit_name[len('df_'):] if unit_name.startswith('df_') else unit_name
+            path = os.path.join(ticker_dir, f'{file_name}.{stamp}.parquet')
+            table = pa.Table.from_pandas(unit_df[schema.names], schema=schema, preserve_index=False)
+            pq.write_table(table, f'{path}.tmp', row_group_size=self.row_group_size, compression='zstd')
+            os.replace(f'{path}.tmp', path)
+
+    def update_combined(self, df, replaced_tickers):
+        pass
+
+    def exists(self):
+        return os.path.isdir(self.root) and any(name.startswith('Ticker=') for name in os.listdir(self.root))
+
+    def last_modified(self):
+        if not self.exists():
+            return 0.0
+        return max(os.path.getmtime(os.path.join(self.root, name))
+                   for name in os.listdir(self.root) if name.startswith('Ticker='))
+
+    def dataset(self):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        # Low-cardinality columns are read straight into dictionary arrays, which become
+        # pandas categoricals without decoding every string
+        dictionary = pa.dictionary(pa.int32(), pa.string())
+        schema = self.schema()
+        for col in CATEGORICAL_COLUMNS:
+            if col in schema.names:
+                schema = schema.set(schema.get_field_index(col), pa.field(col, dictionary))
+        schema = schema.append(pa.field('Ticker', pa.string()))
+        file_format = ds.ParquetFileFormat(read_options=ds.ParquetReadOptions(
+            dictionary_columns=[c for c in CATEGORICAL_COLUMNS if c != 'Ticker']))
+        partitioning = ds.partitioning(pa.schema([('Ticker', pa.string())]), flavor='hive')
+        return ds.dataset(self.root, format=file_format, schema=schema,
+                          partitioning=partitioning, exclude_invalid_files=True)
+
+    def read_facts(self, tickers=None, concepts=None, start=None, end=None, columns=None):
+        import pyarrow.dataset as ds
+
+        expression = None
+
+        def _and(expr):
+            return expr if expression is None else expression & expr
+
+        if tickers is not None:
+            expression = _and(ds.field('Ticker').isin(list(tickers)))
+        if concepts is not None:
+            expression = _and(ds.field('Concept').isin(list(concepts)))
+        if start is not None:
+            expression = _and(ds.field('Filed Date') >= pd.Timestamp(start))
+        if end is not None:
+            expression = _and(ds.field('Filed Date') <= pd.Timestamp(end))
+
+        table = self.dataset().to_table(columns=columns, filter=expression)
+        if 'Ticker' in table.column_names:
+            index = table.column_names.index('Ticker')
+            table = table.set_column(index, 'Ticker', table.column('Ticker').dictionary_encode())
+        df = table.to_pandas()
+        return df[[c for c in FACT_COLUMNS if c in df.columns]] if columns is None else df
+
+    def iter_facts(self, batch_size=50_000, tickers=None):
+        import pyarrow.dataset as ds
+
+        expression = ds.field('Ticker').isin(list(tickers)) if tickers is not None else None
+        for batch in self.dataset().to_batches(filter=expression, batch_size=batch_size):
+            if batch.num_rows:
+                yield batch.to_pandas()[FACT_COLUMNS]
+
+
+BACKENDS = {'csv': CSVFactStore, 'parquet': ParquetFactStore}
+
+
+def get_fact_store(base_dir: Optional[str] = None, backend: Optional[str] = None) -> FactStore:
+    """Fact store for `base_dir` using CONFIG['STORAGE_BACKEND'] unless `backend` is given."""
+    backend = backend or CONFIG.get('STORAGE_BACKEND', 'parquet')
+    try:
+        store_cls = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend {backend!r}, expected one of {sorted(BACKENDS)}") from None
+    return store_cls(base_dir or CONFIG['BASE_DIR'])
+
+
+def convert_csv_to_parquet(base_dir: Optional[str] = None) -> List[str]:
+    """Load every ticker of an existing CSV layout into the Parquet store, returns the tickers."""
+    from nlp_functions import split_by_units
+
+    csv_store = CSVFactStore(base_dir or CONFIG['BASE_DIR'])
+    parquet_store = ParquetFactStore(csv_store.base_dir)
+    df = csv_store.read_facts()
+    for col in CATEGORICAL_COLUMNS:
+        df[col] = df[col].astype('category')
+    tickers = []
+    for ticker, ticker_df in df.groupby('Ticker', observed=True, sort=True):
+        parquet_store.write_ticker(str(ticker), ticker_df, split_by_units(ticker_df))
+        tickers.append(str(ticker))
+    return tickers
+
+
+# Convert the legacy CSV files of BASE_DIR into the Parquet store:
+#   python sec_storage.py convert [base_dir]
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) < 2 or sys.argv[1] != 'convert':
+        print("Usage: python sec_storage.py convert [base_dir]")
+        sys.exit(1)
+    converted = convert_csv_to_parquet(sys.argv[2] if len(sys.argv) > 2 else None)
+    print(f"Converted {len(converted)} tickers to Parquet: {', '.join(converted)}")
@@ -0,0 +1,248 @@
+import os
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from nlp_functions import CATEGORICAL_COLUMNS, DATE_COLUMNS, FACT_COLUMNS
+
+# The taxonomies companyfacts reports; company extensions (e.g. phat:) are left out the same way
+STANDARD_TAXONOMIES = ('us-gaap', 'ifrs-full', 'dei', 'srt', 'invest')
+
+# ixt-sec:numwordsen values ("no", "three", "one hundred five", "two thousand", ...)
+UNIT_WORDS = {word: n for n, word in enumerate(
+    'zero one two three four five six seven eight nine ten eleven twelve thirteen fourteen fifteen sixteen '
+    'seventeen eighteen nineteen'.split())}
+UNIT_WORDS.update({'a': 1, 'an': 1})
+TENS_WORDS = {word: 10 * n for n, word in enumerate('twenty thirty forty fifty sixty seventy eighty ninety'.split(), 2)}
+SCALE_WORDS = {'thousand': 10 ** 3, 'million': 10 ** 6, 'billion': 10 ** 9, 'trillion': 10 ** 12}
+NONE_WORDS = {'no', 'none', 'nil'}
+
+# Document and entity information that labels every fact of the filing
+METADATA_CONCEPTS = {'dei:DocumentType': 'form', 'dei:AmendmentFlag': 'amendment',
+                     'dei:DocumentFiscalYearFocus': 'fy', 'dei:DocumentFiscalPeriodFocus': 'fp',
+                     'dei:EntityCentralIndexKey': 'cik'}
+
+
+def format_accession(accession: str) -> str:
+    """'000095017024056888' -> '0000950170-24-056888', the form companyfacts uses."""
+    digits = accession.replace('-', '')
+    return f'{digits[:10]}-{digits[10:12]}-{digits[12:]}' if len(digits) == 18 else accession
+
+
+def _number_words(words: List[str]) -> Optional[int]:
+    """Integer written in English words ("one hundred and five" -> 105), None if it is not one."""
+    if len(words) == 1 and words[0] in NONE_WORDS:
+        return 0
+    total, group, last, scale = 0, 0, None, None  # `last` is the kind of the previous word in the group
+    for word in words:
+        if word == 'and' and last == 'hundred':
+            continue
+        if word in UNIT_WORDS:
+            # 1-9 may follow a tens word ("twenty one"), 10-19 only a hundred
+            allowed = (None, 'hundred') + (('tens',) if UNIT_WORDS[word] < 10 else ())
+            if last not in allowed:
+                return None
+            group += UNIT_WORDS[word]
+            last = 'unit' if UNIT_WORDS[word] < 10 else 'teen'
+        elif word in TENS_WORDS:
+            if last not in (None, 'hundred'):
+                return None
+            group += TENS_WORDS[word]
+            last = 'tens'
+        elif word == 'hundred':
+            if last not in (None, 'unit') or group >= 100:
+                return None
+            group = (group or 1) * 100
+            last = 'hundred'
+        elif word in SCALE_WORDS:
+            # Scales come in decreasing order: "two million three thousand"
+            if last is None or (scale is not None and SCALE_WORDS[word] >= scale):
+                return None
+            scale = SCALE_WORDS[word]
+            total += group * scale
+            group, last = 0, None
+        else:
+            return None
+    if last is None and scale is None:
+        return None
+    return total + group
+
+
+def parse_number(text: str, fmt: Optional[str]) -> Optional[Decimal]:
+    """Value of an ix:nonFraction's displayed text under its ixt / ixt-sec transformation format."""
+    fmt = (fmt or '').split(':')[-1].replace('-', '')
+    text = text.strip()
+    if fmt in ('fixedzero', 'zerodash') or (text in ('—', '–', '-') and fmt != 'numwordsen'):
+        return Decimal(0)
+    if fmt == 'numwordsen':
+        value = _number_words(text.lower().replace('-', ' ').replace(',', ' ').split())
+        if value is not None:
+            return Decimal(value)
+    if fmt in ('numcommadecimal', 'numdotcomma'):
+        text = text.replace('.', '').replace(' ', '').replace(',', '.')
+    digits = ''.join(ch for ch in text if ch.isdigit() or ch == '.')
+    try:
+        return Decimal(digits) if digits else None
+    except InvalidOperation:
+        return None
+
+
+def _measure_name(measure: str) -> str:
+    # 'iso4217:USD' -> 'USD', 'xbrli:shares' -> 'shares', 'phat:Segment' -> 'Segment'
+    return measure.strip().split(':')[-1]
+
+
+def parse_inline_xbrl(html, accession: Optional[str] = None, filed: Optional[str] = None,
+                      taxonomies: Optional[Iterable[str]] = STANDARD_TAXONOMIES) -> pd.DataFrame:
+    """Numeric facts of an inline-XBRL filing in the flatten_json_data schema (FACT_COLUMNS).
+
+    One traversal of the selectolax tree collects the contexts, units, the dei document facts and
+    every ix:nonFraction; scale and sign are applied to the displayed number. Like companyfacts,
+    only facts without dimensions (no segment / scenario) are kept, one per concept, unit, period
+    and value. Frame is left empty: SEC assigns it across filings.
+    """
+    from selectolax.parser import HTMLParser  # imported on parse, not when sec_loader imports this
+
+    tree = html if isinstance(html, HTMLParser) else HTMLParser(html)
+    contexts: Dict[str, dict] = {}
+    units: Dict[str, Tuple[List[str], List[str]]] = {}
+    metadata: Dict[str, str] = {}
+    facts = []
+
+    context = unit = None
+    denominator = False
+    for node in tree.root.traverse():
+        tag = node.tag
+        if not tag or ':' not in tag:
+            continue
+        if tag == 'ix:nonfraction':
+            attributes = node.attributes
+            if attributes.get('xsi:nil') == 'true':
+                continue
+            facts.append((attributes.get('name') or '', attributes.get('contextref'), attributes.get('unitref'),
+                          attributes.get('format'), attributes.get('scale'), attributes.get('sign'),
+                          node.text(deep=True)))
+        elif tag == 'ix:nonnumeric':
+            key = METADATA_CONCEPTS.get(node.attributes.get('name'))
+            if key is not None and key not in metadata:
+                metadata[key] = node.text(deep=True).strip()
+        elif tag == 'xbrli:context':
+            context = contexts.setdefault(node.attributes.get('id'), {'start': None, 'end': None, 'dimensional': False})
+        elif tag in ('xbrli:instant', 'xbrli:enddate') and context is not None:
+            context['end'] = node.text().strip()
+        elif tag == 'xbrli:startdate' and context is not None:
+            context['start'] = node.text().strip()
+        elif tag in ('xbrli:segment', 'xbrli:scenario') and context is not None:
+            context['dimensional'] = True
+        elif tag == 'xbrli:unit':
+            unit = units.setdefault(node.attributes.get('id'), ([], []))
+            denominator = False
+        elif tag == 'xbrli:unitdenominator':
+            denominator = True
+        elif tag == 'xbrli:measure' and unit is not None:
+            unit[1 if denominator else 0].append(_measure_name(node.text()))
+
+    unit_names = {unit_id: '/'.join(['*'.join(numerator)] + (['*'.join(denominators)] if denominators else []))
+                  for unit_id, (numerator, denominators) in units.items()}
+    taxonomies = set(taxonomies) if taxonomies is not None else None
+    form = metadata.get('form')
+    if form and metadata.get('amendment', '').lower() == 'true' and not form.endswith('/A'):
+        form = f'{form}/A'
+    fiscal_year = int(metadata['fy']) if metadata.get('fy', '').isdigit() else None
+
+    rows = {}
+    for name, context_id, unit_id, fmt, scale, sign, text in facts:
+        taxonomy, _, concept = name.partition(':')
+        context = contexts.get(context_id)
+        if context is None or context['dimensional'] or (taxonomies is not None and taxonomy not in taxonomies):
+            continue
+        number = parse_number(text, fmt)
+        if number is None:
+            continue
+        if scale:
+            number = number.scaleb(int(scale))
+        if sign == '-':
+            number = -number
+        unit = unit_names.get(unit_id, unit_id)
+        key = (taxonomy, concept, unit, context['start'], context['end'], number)
+        rows.setdefault(key, (taxonomy, concept, unit, float(number), context['start'], context['end']))
+
+    df = pd.DataFrame(list(rows.values()), columns=FACT_COLUMNS[:6])
+    df['Accession'] = format_accession(accession) if accession else None
+    df['Fiscal Year'] = fiscal_year
+    df['Fiscal Period'] = metadata.get('fp')
+    df['Form'] = form
+    df['Filed Date'] = filed
+    df['Frame'] = None
+    for column in ('Taxonomy', 'Concept', 'Unit') + tuple(CATEGORICAL_COLUMNS):
+        df[column] = pd.Categorical(df[column])
+    for column in DATE_COLUMNS:
+        df[column] = pd.to_datetime(df[column], format='%Y-%m-%d', errors='coerce')
+    return df[FACT_COLUMNS]
+
+
+def extract_inline_facts(file_path: str, taxonomies: Optional[Iterable[str]] = STANDARD_TAXONOMIES) -> pd.DataFrame:
+    """Facts of a downloaded '<accession>_<filing date>.htm' filing."""
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    accession, _, filed = name.partition('_')
+    with open(file_path, 'rb') as f:
+        return parse_inline_xbrl(f.read(), accession=accession, filed=filed or None, taxonomies=taxonomies)
+
+
+def _facts_worker(file_path: str) -> Tuple[str, Optional[pd.DataFrame], Optional[str]]:
+    """Process-pool entry point, returns (file_path, facts, error) so one bad filing does not stop the pool."""
+    try:
+        return file_path, extract_inline_facts(file_path), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+# Columns identifying a fact when comparing with companyfacts; Frame is only assigned by SEC
+MATCH_COLUMNS = ['Taxonomy', 'Concept', 'Unit', 'Start', 'End', 'Accession']
+
+
+def compare_with_companyfacts(extracted: pd.DataFrame, reference: pd.DataFrame) -> pd.DataFrame:
+    """Per accession of `extracted`, how many of its facts companyfacts (`reference`) has with the
+    same value, with another value, or not at all, and how many companyfacts has that it lacks."""
+    def keyed(df):
+        df = df[MATCH_COLUMNS + ['Value']].copy()
+        for column in ['Taxonomy', 'Concept', 'Unit', 'Accession']:
+            df[column] = df[column].astype(str)
+        for column in ['Start', 'End']:
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+        return df
+
+    extracted = keyed(extracted)
+    reference = keyed(reference[reference['Accession'].isin(set(extracted['Accession']))])
+    merged = extracted.merge(reference, on=MATCH_COLUMNS, how='outer', suffixes=('', '_reference'),
+                             indicator=True)
+    both = merged['_merge'] == 'both'
+    same = both & ((merged['Value'] - merged['Value_reference']).abs()
+                   <= 1e-9 * merged['Value_reference'].abs().clip(lower=1))
+    merged['status'] = 'missing'
+    merged.loc[merged['_merge'] == 'left_only', 'status'] = 'extra'
+    merged.loc[both, 'status'] = 'different'
+    merged.loc[same, 'status'] = 'matched'
+    counts = merged.groupby(['Accession', 'status']).size().unstack(fill_value=0)
+    return counts.reindex(columns=['matched', 'different', 'extra', 'missing'], fill_value=0)
+
+
+# Check the facts extracted from the downloaded filings against the companyfacts data of
+# BASE_DIR/<ticker>/sec_data_<ticker>.csv:  python sec_xbrl.py [TICKER ...]
+if __name__ == '__main__':
+    import sys
+    import time
+    from config import CONFIG
+    from sec_loader import SECFilingLoader
+
+    loader = SECFilingLoader(base_dir=CONFIG['BASE_DIR'])
+    for ticker in sys.argv[1:] or CONFIG['TICKERS']:
+        started = time.perf_counter()
+        extracted = loader.load_inline_facts([ticker])
+        print(f"{ticker}: {len(extracted)} facts from {extracted['Accession'].nunique()} filings "
+              f"in {time.perf_counter() - started:.2f}s")
+        reference_path = os.path.join(CONFIG['BASE_DIR'], ticker, f'sec_data_{ticker}.csv')
+        if extracted.empty or not os.path.exists(reference_path):
+            continue
+        print(compare_with_companyfacts(extracted, pd.read_csv(reference_path)).to_string())
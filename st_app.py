@@ -1,12 +1,50 @@
 import os
-import subprocess
 import time
 import pandas as pd
 import streamlit as st
 from config import CONFIG
-from sec_loader import load_sec_data,read_from_database
-from file_deletion import delete_existing_files  # Import the deletion functions
-from sec_processor import get_latest_10q_info
+from sec_jobs import FAILED, JobAlreadyRunning, get_job_runner, run_pipeline
+from sec_metrics import Metrics, default_metrics_dir, load_report, stage_rows
+from sec_storage import get_fact_store
+
+# sec_loader and sec_processor (filing parsing, diffs) are imported by the steps that load data, so
+# the configuration step renders without them; later reruns find them in sys.modules
+
+# Cached data layer: reruns of steps 3 and 4 reuse the loaded frames and the comparisons instead of
+# re-reading every filing. The cache key is data_version() (config plus data mtimes), so a config
+# change or new data loads again; a finished download also clears the caches explicitly.
+@st.cache_data(show_spinner="Loading SEC data...", max_entries=2)
+def cached_sec_data(version):
+    from sec_loader import load_sec_data
+    return load_sec_data()
+
+
+@st.cache_data(show_spinner="Comparing the latest filings...", max_entries=2)
+def cached_latest_10q_info(version):
+    from sec_processor import get_latest_10q_info
+    df_sec_facts, all_data_df_min = cached_sec_data(version)
+    return get_latest_10q_info(all_data_df_min)
+
+
+def clear_data_caches():
+    cached_sec_data.clear()
+    cached_latest_10q_info.clear()
+
+
+# Timing panel: where a pipeline run's time went (sec_metrics run report), per stage and per ticker
+def show_timings(report, title="Timings"):
+    with st.expander(f"{title} ({report['elapsed']:.1f}s run)"):
+        st.write("Per stage")
+        st.dataframe(pd.DataFrame(stage_rows(report)).round(3), hide_index=True)
+        per_ticker = [row for row in stage_rows(report, by=('ticker', 'stage')) if row['ticker']]
+        if per_ticker:
+            st.write("Per ticker")
+            st.dataframe(pd.DataFrame(per_ticker).round(3), hide_index=True)
+        if report['counters']:
+            st.write("Counters")
+            st.dataframe(pd.DataFrame([{'counter': c['name'], **c['labels'], 'value': c['value']}
+                                       for c in report['counters']]), hide_index=True)
+
 
 # Get the current working directory
 cwd = os.getcwd()
@@ -19,6 +57,17 @@ st.write("""This application allows you to download SEC filings for the selected
 # Initialize session state to track progress if not already initialized
 if 'step' not in st.session_state:
     st.session_state.step = 1  # Start at step 1
+# Load timings of steps 3 and 4 in this session (cache hits included)
+if 'app_metrics' not in st.session_state:
+    st.session_state.app_metrics = Metrics('app')
+app_metrics = st.session_state.app_metrics
+
+# The last pipeline run's report, also when it ran from another session or the command line
+with st.sidebar:
+    last_report = load_report(default_metrics_dir(CONFIG['BASE_DIR']))
+    if last_report is not None:
+        st.caption(f"Last pipeline run: {time.ctime(last_report['started_at'])}")
+        show_timings(last_report, "Last run timings")
 
 # Configuration parameters
 tickers_input = st.text_input("Enter tickers (comma separated)", ','.join(CONFIG['TICKERS']))
@@ -50,12 +99,9 @@ if st.session_state.step == 1:
         st.write(f"Writing updated configuration to {config_file_path}")
         with open(config_file_path, 'w') as f:
             f.write(f"# config.py\nCONFIG = {{\n")
-            f.write(f"    'TICKERS': {tickers},\n")
-            f.write(f"    'START_DATE': '{start_date}',\n")
-            f.write(f"    'END_DATE': '{end_date}',\n")
-            f.write(f"    'BASE_DIR': '{base_dir}',\n")
-            f.write(f"    'USER_AGENT': 'Your Name your@email.com',\n")
-            f.write(f"    'DATABASE_URL': '{db_string}'\n")
+            # Write every key so settings not exposed in the UI are preserved
+            for key, value in CONFIG.items():
+                f.write(f"    {key!r}: {value!r},\n")
             f.write(f"}}\n")
         st.success("Configuration updated successfully!")
         # Move to the next step
@@ -63,39 +109,69 @@ if st.session_state.step == 1:
 
 # Step 2: Download and Process SEC Data (Only available in step 2)
 if st.session_state.step == 2:
-    if st.button('Download and Process SEC Data'):
-        # Delete existing files in the base directory before downloading
-        st.write(f"Deleting existing files in {CONFIG['BASE_DIR']}")
-        delete_existing_files(CONFIG['BASE_DIR'])  # Call to the new module
-
-        # Show a loading spinner while the download process is running
-        with st.spinner("Downloading SEC filings and processing data..."):
-            try:
-                # Run the `sec_download.py` script as an external process
-                st.write("Running SEC data download process...")
-                subprocess.run(['python', 'sec_download.py'], check=True)
-                st.success("SEC data processing completed successfully!")
-
-                # Now check if the file exists after the download process
-                file_path = os.path.join(CONFIG['BASE_DIR'], 'sec_data_all_tickers.csv')
-                st.write(f"Checking if file exists: {file_path}")
-                if not os.path.exists(file_path):
-                    st.error(f"Error: The expected file '{file_path}' was not created. Please check the process.")
-                else:
-                    # Optionally, check if the file has been recently modified (timestamp check)
-                    last_modified = time.ctime(os.path.getmtime(file_path))
-                    st.info(f"File successfully created. Last modified at: {last_modified}")
+    # The pipeline runs as a background job shared by every session (see sec_jobs.py), so the
+    # page stays responsive and a rerun or a second user sees the same run instead of starting another
+    runner = get_job_runner()
+    job = runner.get(st.session_state.get('job_id', '')) or runner.active()
+
+    # Reruns only fetch filings and facts that are new since the last run (see sec_manifest.py)
+    full_refresh = st.checkbox("Full refresh (delete existing data and download everything again)", value=False)
+    keep_cache = st.checkbox("Keep caches (only remove stale files, reuse cached EDGAR responses and text)",
+                             value=False, disabled=not full_refresh)
+    if st.button('Download and Process SEC Data', disabled=job is not None and job.active):
+        try:
+            # A full refresh cleans up BASE_DIR inside the job (see sec_jobs.cleanup_stage)
+            job = runner.start('SEC data download', run_pipeline, full=full_refresh, keep_cache=keep_cache)
+            st.session_state.job_id = job.id
+        except JobAlreadyRunning as e:
+            job = e.job
+            st.warning(str(e))
+
+    if job is not None:
+        state = job.snapshot()
+        st.progress(state['fraction'], text=f"{state['stage'] or 'starting'}: {state['done']}/{state['total']} "
+                                            f"({state['elapsed']:.0f}s)")
+        with st.expander("Job log", expanded=job.active):
+            st.code("\n".join(state['messages'][-20:]) or "Waiting for the job to start...")
 
+        if job.active:
+            # Poll until the job finishes
+            time.sleep(1)
+            st.rerun()
+        elif state['status'] == FAILED:
+            st.error(f"Error occurred while processing SEC data: {state['error']}")
+        else:
+            st.success("SEC data processing completed successfully!")
+            if job.result and job.result['failed']:
+                st.warning(f"Failed tickers: {', '.join(job.result['failed'])}")
+            if job.result and job.result.get('metrics'):
+                show_timings(job.result['metrics'])
+
+            # Now check if the fact store was written by the download job
+            store = get_fact_store(CONFIG['BASE_DIR'])
+            st.write(f"Checking if the {store.name} fact store exists in {CONFIG['BASE_DIR']}")
+            if not store.exists():
+                st.error(f"Error: The {store.name} fact store was not created. Please check the process.")
+            else:
+                # Optionally, check if the data has been recently modified (timestamp check)
+                last_modified = time.ctime(store.last_modified())
+                st.info(f"Fact store successfully created. Last modified at: {last_modified}")
+
+            if st.button('Continue'):
+                # The data changed, do not serve frames loaded before the download
+                clear_data_caches()
                 # Move to the next step
+                st.session_state.pop('job_id', None)
                 st.session_state.step = 3
+                st.rerun()
 
-            except subprocess.CalledProcessError as e:
-                st.error(f"Error occurred while running sec_download.py: {e}")
-
-# Step 3: Load and Display Data (Only available in step 3)
-if st.session_state.step == 3:
+# Step 3: Load and Display Data (Kept on screen in step 4, reruns are served from the cache)
+if st.session_state.step >= 3:
+    from sec_loader import data_version
     st.write("Loading SEC data...")
-    df_sec_facts, all_data_df_min = load_sec_data() #read_from_database()#load_sec_data()
+    version = data_version()
+    with app_metrics.span('load_sec_data'):
+        df_sec_facts, all_data_df_min = cached_sec_data(version)
     st.write("Stock Data")
     st.write(df_sec_facts.head())
     st.write("Filings Data")
@@ -105,7 +181,13 @@ if st.session_state.step == 3:
 # Step 4: Display Latest 10-Q Data (Only available in step 4)
 if st.session_state.step == 4:
     st.write("Loading and displaying latest 10-Q data...")
-    df_clean = get_latest_10q_info()
+    with app_metrics.span('latest_10q_info'):
+        df_clean = cached_latest_10q_info(version)
     st.write(df_clean.head())
     st.write("Comparison for one ticker - example")
     st.write(df_clean.comparison[0])
+
+# After the steps so this run's loads are included
+if app_metrics.histograms:
+    with st.sidebar:
+        show_timings(app_metrics.report(), "Page load timings")
@@ -0,0 +1,28 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PHAT_DIR = os.path.join(ROOT, 'sec_data', 'PHAT')
+PHAT_CIK = '0001783183'
+
+
+@pytest.fixture
+def base_dir(tmp_path):
+    """A BASE_DIR holding a copy of sec_data/PHAT (concepts, the four filings and their section indexes)."""
+    shutil.copytree(PHAT_DIR, tmp_path / 'PHAT')
+    return str(tmp_path)
+
+
+@pytest.fixture
+def facts_base_dir(base_dir):
+    """base_dir plus the PHAT facts: sec_data_all_tickers.csv and the Parquet store converted from it."""
+    from sec_storage import convert_csv_to_parquet
+
+    shutil.copy(os.path.join(ROOT, 'sec_data', 'sec_data_all_tickers.csv'), base_dir)
+    convert_csv_to_parquet(base_dir)
+    return base_dir
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from cik_index import CIKIndex
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'company_tickers.json')
+
+
+class MappingClient:
+    """Answers the company_tickers.json request with the fixture and counts the requests."""
+
+    www_url = 'https://www.sec.gov'
+
+    def __init__(self):
+        self.requests = 0
+
+    async def get_json(self, url):
+        assert url == 'https://www.sec.gov/files/company_tickers.json'
+        self.requests += 1
+        with open(FIXTURE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+
+def test_lookup_from_fixture(tmp_path):
+    index = CIKIndex(str(tmp_path / 'cik_index.json'))
+    index.load_from_file(FIXTURE)
+
+    assert len(index) == 7
+    assert index.lookup('PHAT') == index.lookup('phat') == '0001783183'
+    assert index.name('PHAT') == 'Phathom Pharmaceuticals, Inc.'  # the first listing wins
+    assert index.lookup('GOOG') == index.lookup('GOOGL') == '0001652044'
+    with pytest.raises(ValueError, match='XXXX'):
+        index.lookup('XXXX')
+    assert index.missing(['PHAT', 'XXXX']) == ['XXXX']
+
+    # Persisted: a new index on the same path needs no mapping
+    reloaded = CIKIndex(index.path)
+    assert not reloaded.is_stale()
+    assert reloaded.lookup('AMGN') == '0000318154'
+
+
+def test_restrict_to(tmp_path):
+    index = CIKIndex(str(tmp_path / 'cik_index.json'))
+    index.load_from_file(FIXTURE, restrict_to=['phat', 'MRNA'])
+
+    assert len(index) == 2
+    assert 'MRNA' in index and 'AMGN' not in index
+
+
+def test_refresh_only_when_expired(tmp_path):
+    path = str(tmp_path / 'cik_index.json')
+    client = MappingClient()
+
+    async def _ensure_fresh(index, calls=1):
+        await asyncio.gather(*(index.ensure_fresh(client) for _ in range(calls)))
+
+    index = CIKIndex(path, ttl_seconds=3600)
+    assert index.is_stale()
+    # Concurrent tickers of one run share a single download
+    asyncio.run(_ensure_fresh(index, calls=5))
+    assert client.requests == 1
+    asyncio.run(_ensure_fresh(CIKIndex(path, ttl_seconds=3600)))
+    assert client.requests == 1
+
+    # Past the TTL the mapping is downloaded again
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['updated_at'] = time.time() - 7200
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    expired = CIKIndex(path, ttl_seconds=3600)
+    assert expired.is_stale()
+    asyncio.run(_ensure_fresh(expired))
+    assert client.requests == 2
+    assert not expired.is_stale() and expired.lookup('VRTX') == '0000875320'
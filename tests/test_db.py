@@ -0,0 +1,47 @@
+import sqlite3
+
+import pytest
+
+from config import CONFIG
+
+
+@pytest.fixture
+def database(facts_base_dir, tmp_path, monkeypatch):
+    """An SQLite DATABASE_URL, with BASE_DIR pointing to a copy of the PHAT data and its fact store."""
+    path = tmp_path / 'sec.sqlite'
+    monkeypatch.setitem(CONFIG, 'BASE_DIR', facts_base_dir)
+    monkeypatch.setitem(CONFIG, 'TICKERS', ['PHAT'])
+    monkeypatch.setitem(CONFIG, 'DATABASE_URL', f'sqlite:///{path}')
+    yield str(path)
+    from sec_db import dispose_engines
+    dispose_engines()
+
+
+def test_create_schema_migrates_older_tables(database):
+    from sec_db import load_to_database
+
+    # filings_data as created before filings had a form
+    with sqlite3.connect(database) as conn:
+        conn.execute('CREATE TABLE filings_data ("accession_number" TEXT PRIMARY KEY, "ticker" TEXT NOT NULL, '
+                     '"filing_date" TEXT, "file_size" REAL, "content_length" INTEGER, "content" TEXT)')
+
+    assert load_to_database(['PHAT'])['filings'] == 4
+    with sqlite3.connect(database) as conn:
+        forms = dict(conn.execute('SELECT form, COUNT(*) FROM filings_data GROUP BY form').fetchall())
+        (index_sql,) = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'ix_filings_data_form'").fetchone()
+    assert forms == {'10-Q': 3, '10-Q/A': 1}
+    assert '"form"' in index_sql
+
+
+def test_load_is_idempotent(database):
+    from sec_db import load_to_database, query_facts, query_filings
+
+    for _ in range(2):
+        assert load_to_database(['PHAT']) == {'facts': 1587, 'filings': 4}
+    with sqlite3.connect(database) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM sec_facts').fetchone() == (1587,)
+        assert conn.execute('SELECT COUNT(*) FROM filings_data').fetchone() == (4,)
+
+    assert len(query_facts(tickers=['PHAT'])) == 1587
+    filings = query_filings(tickers=['PHAT'], start='2024-06-01', columns=['ticker', 'filing_date'])
+    assert sorted(filings['filing_date'].dt.strftime('%Y-%m-%d')) == ['2024-06-14', '2024-08-08', '2024-11-07']
@@ -0,0 +1,51 @@
+import random
+
+from sec_diff import myers_diff
+
+
+def edit_distance(a, b):
+    """Insertions plus deletions turning `a` into `b` (no substitutions), by dynamic programming."""
+    previous = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        current = [i]
+        for j, y in enumerate(b, 1):
+            current.append(previous[j - 1] if x == y else min(previous[j], current[j - 1]) + 1)
+        previous = current
+    return previous[-1]
+
+
+def apply_script(a, b, script):
+    """Check that `script` walks both sequences in order; returns its number of edits."""
+    i = j = edits = 0
+    for op, x, y in script:
+        if op == 'equal':
+            assert (x, y) == (i, j) and a[x] == b[y]
+            i, j = i + 1, j + 1
+        elif op == 'delete':
+            assert x == i
+            i, edits = i + 1, edits + 1
+        else:
+            assert y == j
+            j, edits = j + 1, edits + 1
+    assert (i, j) == (len(a), len(b))
+    return edits
+
+
+def test_myers_diff_is_a_shortest_edit_script():
+    rng = random.Random(0)
+    for _ in range(500):
+        a = [rng.randint(0, 4) for _ in range(rng.randint(0, 20))]
+        b = [rng.randint(0, 4) for _ in range(rng.randint(0, 20))]
+        distance = edit_distance(a, b)
+        assert apply_script(a, b, myers_diff(a, b)) == distance
+        assert myers_diff(a, b, max_edits=distance) is not None
+        if distance:
+            assert myers_diff(a, b, max_edits=distance - 1) is None
+
+
+def test_myers_diff_keeps_common_prefix_and_suffix():
+    a = list(range(100)) + [1000, 1001] + list(range(200, 300))
+    b = list(range(100)) + [2000] + list(range(200, 300))
+    script = myers_diff(a, b)
+    assert apply_script(a, b, script) == 3
+    assert [op for op, _, _ in script].count('equal') == 200
@@ -0,0 +1,220 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+import pandas as pd
+import pytest
+from aiohttp import web
+
+from config import CONFIG
+from conftest import PHAT_CIK, PHAT_DIR
+from sec_client import SECClient
+from sec_download import process_sec_data
+from sec_manifest import IngestManifest, default_manifest_path
+from sec_storage import get_fact_store
+from text_cache import file_sha256
+
+TICKERS = [f'T{i}' for i in range(6)]
+REQUESTS_PER_SECOND = 8
+MAX_CONCURRENCY = 3
+RESPONSE_DELAY = 0.2  # Long enough for the tickers' requests to overlap
+
+# The PHAT filings of 2024 the submissions API lists: (accession, form, filing date)
+PHAT_FILINGS = [('0000950170-24-056888', '10-Q', '2024-05-09'), ('0000950170-24-073628', '10-Q/A', '2024-06-14'),
+                ('0000950170-24-093885', '10-Q', '2024-08-08'), ('0000950170-24-123264', '10-Q', '2024-11-07')]
+NEW_ACCESSION = '0000950170-24-123264'
+LAST_MODIFIED = 'Thu, 07 Nov 2024 21:05:00 GMT'
+
+
+class StubEDGAR:
+    """Local stand-in for www.sec.gov and data.sec.gov that records when each request arrived
+    and how many were in flight.
+
+    Every ticker gets the PHAT companyfacts and `filings` in its submissions; accessions in
+    `withheld` are not filed yet and left out of both. Like EDGAR, responses carry an ETag and
+    Last-Modified, and a request whose If-None-Match still matches gets an empty 304.
+    """
+
+    def __init__(self, tickers, filings, delay=0.0):
+        self.tickers = tickers
+        self.filings = filings
+        self.withheld = set()
+        self.delay = delay
+        self.arrivals = []
+        self.paths = []
+        self.validators = []  # (path, If-None-Match, If-Modified-Since) of every request
+        self.in_flight = 0
+        self.max_in_flight = 0
+        with open(os.path.join(PHAT_DIR, 'company_concepts', f'CIK{PHAT_CIK}.json'), 'rb') as f:
+            self.company_facts = f.read()
+
+    def make_app(self):
+        # An application is bound to the event loop of its first run, each asyncio.run needs a new one
+        app = web.Application(middlewares=[self.track])
+        app.router.add_get('/files/company_tickers.json', self.company_tickers)
+        app.router.add_get('/api/xbrl/companyfacts/{name}', self.facts)
+        app.router.add_get('/submissions/{name}', self.submissions)
+        app.router.add_get('/Archives/edgar/data/{cik}/{accession}/{document}', self.document)
+        return app
+
+    @web.middleware
+    async def track(self, request, handler):
+        self.arrivals.append(time.monotonic())
+        self.paths.append(request.path)
+        self.validators.append((request.path, request.headers.get('If-None-Match'),
+                                request.headers.get('If-Modified-Since')))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            response = await handler(request)
+        finally:
+            self.in_flight -= 1
+        etag = '"%s"' % hashlib.sha256(response.body).hexdigest()[:16]
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag, 'Last-Modified': LAST_MODIFIED})
+        response.headers['ETag'] = etag
+        response.headers['Last-Modified'] = LAST_MODIFIED
+        return response
+
+    async def company_tickers(self, request):
+        return web.json_response({str(i): {'cik_str': cik, 'ticker': ticker, 'title': f'Company {ticker}'}
+                                  for i, (ticker, cik) in enumerate(self.tickers.items())})
+
+    async def facts(self, request):
+        if not self.withheld:
+            return web.Response(body=self.company_facts, content_type='application/json')
+        data = json.loads(self.company_facts)
+        for concepts in data['facts'].values():
+            for concept in concepts.values():
+                for unit, records in concept['units'].items():
+                    concept['units'][unit] = [r for r in records if r['accn'] not in self.withheld]
+        return web.json_response(data)
+
+    async def submissions(self, request):
+        filings = [filing for filing in self.filings if filing[0] not in self.withheld]
+        return web.json_response({'filings': {'recent': {
+            'accessionNumber': [accession for accession, _, _ in filings], 'form': [form for _, form, _ in filings],
+            'filingDate': [filed for _, _, filed in filings], 'primaryDocument': ['doc.htm'] * len(filings)}}})
+
+    async def document(self, request):
+        return web.Response(text=f"<html><body><p>Quarterly report {request.match_info['accession']}</p></body></html>",
+                            content_type='text/html')
+
+
+@asynccontextmanager
+async def serve(stub):
+    """Base URL of `stub`, served on a local port while the block runs."""
+    runner = web.AppRunner(stub.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    try:
+        yield 'http://127.0.0.1:%d' % runner.addresses[0][1]
+    finally:
+        await runner.cleanup()
+
+
+async def run_against(stub, tickers, base_dir, requests_per_second=REQUESTS_PER_SECOND, **kwargs):
+    """process_sec_data with a client pointed at `stub`."""
+    async with serve(stub) as url:
+        async with SECClient(www_url=url, data_url=url, requests_per_second=requests_per_second) as client:
+            summary = await process_sec_data(tickers, '2024-01-01', '2025-01-01', base_dir, client=client,
+                                             on_progress=None, **kwargs)
+            # The caller's client is left open for its next use
+            assert client.session is not None and not client.session.closed
+            return summary
+
+
+def test_rate_limit_and_concurrency(tmp_path, monkeypatch):
+    monkeypatch.setitem(CONFIG, 'BASE_DIR', str(tmp_path))
+    stub = StubEDGAR({ticker: 1000 + i for i, ticker in enumerate(TICKERS)}, PHAT_FILINGS[:1], delay=RESPONSE_DELAY)
+
+    summary = asyncio.run(run_against(stub, TICKERS, str(tmp_path), max_concurrency=MAX_CONCURRENCY))
+
+    assert sorted(result.ticker for result in summary.succeeded) == TICKERS
+    # The ticker map once, then the facts, submissions and one filing of every ticker
+    assert len(stub.arrivals) == 1 + 3 * len(TICKERS)
+    manifest = IngestManifest(default_manifest_path(str(tmp_path)))
+    for ticker in TICKERS:
+        path = str(tmp_path / ticker / 'filings' / '000095017024056888_2024-05-09.htm')
+        # Hashed while it was written, the recorded sha256 is the file's
+        record = manifest.filing(ticker, '000095017024056888')
+        assert (record['path'], record['sha256']) == (path, file_sha256(path))
+    # Request starts are spaced by the limiter: no window of (almost) one second holds more than the cap.
+    # Arrivals at the server jitter by tens of ms; one request too many would arrive a whole interval early
+    window = 1.0 - 0.1
+    for i, started in enumerate(stub.arrivals):
+        assert sum(1 for t in stub.arrivals[i:] if t - started < window) <= REQUESTS_PER_SECOND
+    # Tickers overlap, but never more than max_concurrency of them (one request each) at a time
+    assert 1 < stub.max_in_flight <= MAX_CONCURRENCY
+
+
+def stored_files(base_dir):
+    """Size and mtime of every fact store file and filing document under `base_dir`."""
+    files = {}
+    for root, _, names in os.walk(base_dir):
+        if '.cache' in root.split(os.sep) or 'company_concepts' in root:
+            continue
+        for name in names:
+            if name != 'ingest_manifest.json':
+                stat = os.stat(os.path.join(root, name))
+                files[os.path.join(root, name)] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def sorted_facts(store):
+    df = store.read_facts()
+    df = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    return df.sort_values(['Concept', 'Unit', 'Accession', 'End', 'Start', 'Frame']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('backend', ['csv', 'parquet'])
+def test_incremental_ingestion(tmp_path, monkeypatch, backend):
+    monkeypatch.setitem(CONFIG, 'BASE_DIR', str(tmp_path))
+    monkeypatch.setitem(CONFIG, 'STORAGE_BACKEND', backend)
+    stub = StubEDGAR({'PHAT': int(PHAT_CIK)}, PHAT_FILINGS)
+    base_dir = str(tmp_path / 'sec_data')
+    store = get_fact_store(base_dir)
+
+    def run(base_dir, full=False):
+        stub.paths.clear()
+        summary = asyncio.run(run_against(stub, ['PHAT'], base_dir, requests_per_second=10, full=full))
+        (result,) = summary.succeeded
+        return result.value
+
+    # Before the November 10-Q was filed
+    stub.withheld = {NEW_ACCESSION}
+    df_new, appended = run(base_dir)
+    assert (len(df_new), appended) == (1294, False)
+    assert len(store.read_facts()) == 1294
+
+    # Only the rows of the new 10-Q are appended, and only its document is downloaded
+    stub.withheld = set()
+    df_new, appended = run(base_dir)
+    assert (len(df_new), appended) == (293, True)
+    assert set(df_new['Accession']) == {NEW_ACCESSION}
+    assert [path for path in stub.paths if path.startswith('/Archives/')] == [
+        f'/Archives/edgar/data/{int(PHAT_CIK)}/000095017024123264/doc.htm']
+
+    # Nothing new: nothing is written or downloaded
+    before = stored_files(base_dir)
+    df_new, appended = run(base_dir)
+    assert df_new.empty and appended
+    assert stored_files(base_dir) == before
+    assert not [path for path in stub.paths if path.startswith('/Archives/')]
+
+    # The stored facts are those of a fresh full load, without duplicates
+    run(str(tmp_path / 'fresh'))
+    expected = sorted_facts(get_fact_store(str(tmp_path / 'fresh')))
+    actual = sorted_facts(store)
+    assert len(actual) == 1587 and not actual.duplicated().any()
+    pd.testing.assert_frame_equal(actual, expected)
+
+    # full=True rewrites the ticker (compacting the appended Parquet files)
+    df_new, appended = run(base_dir, full=True)
+    assert (len(df_new), appended) == (1587, False)
+    pd.testing.assert_frame_equal(sorted_facts(store), expected)
@@ -0,0 +1,38 @@
+import os
+
+import file_deletion
+from file_deletion import cleanup_base_dir
+
+FILES = ['.cache/pipeline.lock', '.cache/text_cache.sqlite', '.cache/metrics/run_report.json',
+         'PHAT/filings/000095017024056888_2024-05-09.htm', 'sec_data_all_tickers.csv']
+
+
+def make_tree(base_dir):
+    for path in FILES:
+        os.makedirs(os.path.dirname(os.path.join(base_dir, path)), exist_ok=True)
+        with open(os.path.join(base_dir, path), 'w') as f:
+            f.write('x')
+
+
+def remaining(base_dir):
+    return sorted(os.path.relpath(os.path.join(root, name), base_dir).replace(os.sep, '/')
+                  for root, _, names in os.walk(base_dir) for name in names)
+
+
+def test_cleanup_keeps_preserved_paths(tmp_path):
+    make_tree(str(tmp_path))
+    summary = cleanup_base_dir(str(tmp_path), preserve=['.cache/pipeline.lock'], wait=True)
+
+    assert summary['trash'] is not None
+    assert remaining(str(tmp_path)) == ['.cache/pipeline.lock']
+
+
+def test_cleanup_in_place_keeps_preserved_paths(tmp_path, monkeypatch):
+    def move_to_trash(base_dir, preserve=()):
+        raise OSError("base_dir is a mount point")
+
+    monkeypatch.setattr(file_deletion, 'move_to_trash', move_to_trash)
+    make_tree(str(tmp_path))
+    cleanup_base_dir(str(tmp_path), preserve=['.cache/pipeline.lock'], wait=True)
+
+    assert remaining(str(tmp_path)) == ['.cache/pipeline.lock']
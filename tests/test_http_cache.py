@@ -0,0 +1,69 @@
+import asyncio
+import itertools
+
+import http_cache
+import sec_metrics
+from config import CONFIG
+from conftest import PHAT_CIK
+from http_cache import HTTPCache
+from sec_client import SECClient
+from test_download import LAST_MODIFIED, NEW_ACCESSION, PHAT_FILINGS, StubEDGAR, serve
+
+
+def test_conditional_get_is_served_from_cache(tmp_path):
+    stub = StubEDGAR({'PHAT': int(PHAT_CIK)}, PHAT_FILINGS)
+    cache = HTTPCache(str(tmp_path / 'http'))
+    metrics = sec_metrics.start_run('test')
+    path = f'/api/xbrl/companyfacts/CIK{PHAT_CIK}.json'
+
+    async def _run():
+        async with serve(stub) as url:
+            async with SECClient(www_url=url, data_url=url, requests_per_second=10, cache=cache) as client:
+                first = await client.get(f'{url}{path}', use_cache=True)
+                second = await client.get(f'{url}{path}', use_cache=True)
+                # New facts change the ETag, the new body replaces the cached one
+                stub.withheld = {NEW_ACCESSION}
+                changed = await client.get(f'{url}{path}', use_cache=True)
+                return client, first, second, changed
+
+    client, first, second, changed = asyncio.run(_run())
+
+    etag = first.headers['ETag']
+    assert not first.from_cache and first.body == stub.company_facts
+    assert second.from_cache and (second.status, second.body) == (200, first.body)
+    assert not changed.from_cache and changed.body != first.body
+    # The validators of the stored response are sent back
+    assert stub.validators == [(path, None, None), (path, etag, LAST_MODIFIED), (path, etag, LAST_MODIFIED)]
+    assert cache.read(cache.lookup(first.url)) == changed.body
+
+    # Only the 304 saved a download
+    assert (client.stats['cache_hits'], client.stats['bytes_saved']) == (1, len(first.body))
+    assert client.stats['bytes'] == len(first.body) + len(changed.body)
+    counters = {counter['name']: counter['value'] for counter in metrics.report()['counters']}
+    assert counters['http_cache_hits'] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    clock = itertools.count(1000)
+    monkeypatch.setattr(http_cache.time, 'time', lambda: next(clock))
+    cache = HTTPCache(str(tmp_path), max_bytes=250)
+    headers = {'ETag': '"v1"'}
+
+    for name in 'ab':
+        cache.store(f'https://www.sec.gov/{name}', headers, name.encode() * 100)
+    cache.read(cache.lookup('https://www.sec.gov/a'))  # `a` is now used more recently than `b`
+    cache.store('https://www.sec.gov/c', headers, b'c' * 100)
+
+    assert cache.lookup('https://www.sec.gov/b') is None
+    assert [cache.read(cache.lookup(f'https://www.sec.gov/{name}')) for name in 'ac'] == [b'a' * 100, b'c' * 100]
+    assert cache.total_bytes == 200
+    # Bodies over the cap and responses without validators are not stored
+    assert cache.store('https://www.sec.gov/big', headers, b'x' * 251) is None
+    assert cache.store('https://www.sec.gov/plain', {}, b'x') is None
+
+    # The surviving entries are found again on disk
+    reopened = HTTPCache(str(tmp_path), max_bytes=250)
+    assert reopened.total_bytes == 200 and reopened.lookup('https://www.sec.gov/b') is None
+
+    monkeypatch.setitem(CONFIG, 'HTTP_CACHE_MAX_MB', 3)
+    assert HTTPCache(str(tmp_path)).max_bytes == 3 * 1024 ** 2
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+import import_budget  # noqa: E402
+
+
+def test_no_undefined_names():
+    assert import_budget.undefined_names() == []
+
+
+def test_budget_is_consistent():
+    # A module imported by another cannot be allowed more time than its importer, when both load pandas
+    # or neither does
+    saved = import_budget.load_budget()
+    budget = saved['budget']
+    assert set(budget) == set(import_budget.MODULES)
+    assert {'config', 'sec_client', 'sec_diff', 'sec_monitor'} <= set(saved['without_baseline'])
+    for importer, dependency in [('sec_loader', 'nlp_functions'), ('sec_storage', 'nlp_functions'),
+                                 ('sec_loader', 'sec_search'), ('sec_loader', 'sec_storage'),
+                                 ('sec_processor', 'sec_loader'), ('sec_client', 'sec_metrics')]:
+        assert budget[dependency] <= budget[importer]
+
+
+def test_no_heavy_imports():
+    # Timings aside: no heavy dependency, and no pandas for the modules that do without it
+    results = import_budget.check(import_budget.MODULES, repeat=1, warmup=False)
+    assert import_budget.problems(results, import_budget.load_budget()) == {}
+
+
+@pytest.mark.skipif(not os.environ.get('IMPORT_BUDGET'), reason='timing based and slow, set IMPORT_BUDGET=1')
+def test_import_time_budget():
+    baseline_ms = import_budget.measure_baseline(repeat=3)
+    results = import_budget.check(import_budget.MODULES, repeat=3)
+    assert import_budget.problems(results, import_budget.load_budget(), baseline_ms) == {}
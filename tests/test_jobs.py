@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from sec_jobs import FAILED, SUCCEEDED, JobAlreadyRunning, JobRunner
+
+
+def wait_for(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while job.active:
+        assert time.monotonic() < deadline, f"{job.name} still {job.status}"
+        time.sleep(0.01)
+    return job
+
+
+def test_one_active_job_and_lock_released(tmp_path):
+    lock_path = str(tmp_path / '.cache' / 'pipeline.lock')
+    runner = JobRunner(lock_path)
+    release = threading.Event()
+
+    job = runner.start('first', lambda job: release.wait(5) and 'done')
+    with pytest.raises(JobAlreadyRunning) as excinfo:
+        runner.start('second', lambda job: None)
+    assert excinfo.value.job is job
+    with open(lock_path) as f:
+        assert int(f.read()) == os.getpid()
+
+    release.set()
+    assert (wait_for(job).status, job.result) == (SUCCEEDED, 'done')
+    assert not os.path.exists(lock_path)
+
+    def fail(job):
+        assert os.path.exists(lock_path)
+        raise ValueError('no facts')
+
+    job = wait_for(runner.start('failing', fail))
+    assert (job.status, job.error) == (FAILED, 'ValueError: no facts')
+    assert not os.path.exists(lock_path)
+    assert runner.latest() is job and len(runner.jobs()) == 2
+
+
+def test_lock_file_of_another_process(tmp_path):
+    lock_path = tmp_path / '.cache' / 'pipeline.lock'
+    lock_path.parent.mkdir()
+    runner = JobRunner(str(lock_path))
+
+    # Held by a live process (pytest's parent)
+    lock_path.write_text(str(os.getppid()))
+    with pytest.raises(JobAlreadyRunning) as excinfo:
+        runner.start('blocked', lambda job: None)
+    assert excinfo.value.job.status == FAILED
+    assert lock_path.read_text() == str(os.getppid()) and runner.active() is None
+
+    # Left behind by a process that has exited: taken over
+    exited = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+    lock_path.write_text(exited.stdout.strip())
+    release = threading.Event()
+    job = runner.start('takeover', lambda job: release.wait(5))
+    assert lock_path.read_text() == str(os.getpid())
+    release.set()
+    assert wait_for(job).status == SUCCEEDED
+    assert not lock_path.exists()
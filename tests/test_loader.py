@@ -0,0 +1,44 @@
+import os
+import time
+
+import pytest
+
+from config import CONFIG
+from nlp_functions import split_by_units
+from sec_loader import data_version
+from sec_storage import get_fact_store
+
+
+def changed():
+    # File timestamps come from a clock that can be a few ms coarse: let it tick before the next change
+    time.sleep(0.02)
+
+
+@pytest.mark.parametrize('backend', ['csv', 'parquet'])
+def test_data_version(facts_base_dir, monkeypatch, backend):
+    monkeypatch.setitem(CONFIG, 'BASE_DIR', facts_base_dir)
+    monkeypatch.setitem(CONFIG, 'TICKERS', ['PHAT'])
+    monkeypatch.setitem(CONFIG, 'STORAGE_BACKEND', backend)
+    store = get_fact_store(facts_base_dir)
+    versions = [data_version()]
+    assert data_version() == versions[-1]
+
+    # New facts, stored the way an incremental download stores them
+    changed()
+    df_new = store.read_facts().head(3)
+    store.append_ticker('PHAT', df_new, split_by_units(df_new))
+    store.update_combined(df_new, [])
+    versions.append(data_version())
+
+    changed()
+    with open(os.path.join(facts_base_dir, 'PHAT', 'filings', '000095017024150000_2024-12-20.htm'), 'w') as f:
+        f.write('<html><body><p>Current report</p></body></html>')
+    versions.append(data_version())
+
+    monkeypatch.setitem(CONFIG, 'START_DATE', '2023-01-01')
+    versions.append(data_version())
+    monkeypatch.setitem(CONFIG, 'END_DATE', '2024-06-30')
+    versions.append(data_version())
+
+    assert len(set(versions)) == len(versions)
+    assert data_version() == versions[-1]
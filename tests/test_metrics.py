@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+import pytest
+
+import sec_metrics
+from sec_metrics import Histogram, Metrics
+
+
+def test_histogram_buckets():
+    histogram = Histogram(bounds=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    # A value on a bound falls in that bucket, the last bucket is +Inf
+    assert histogram.bucket_counts == [2, 1, 1]
+    assert (histogram.count, histogram.sum, histogram.min, histogram.max) == (4, 3.65, 0.05, 3.0)
+    summary = histogram.to_dict()
+    assert summary['buckets'] == {'0.1': 2, '1.0': 1, '+Inf': 1}
+    assert summary['p50'] == pytest.approx(0.1) and histogram.quantile(1.0) == 3.0
+    assert Histogram().to_dict()['p50'] is None
+
+
+def test_span_counts_errors_and_report():
+    metrics = Metrics('test')
+    with metrics.span('flatten', ticker='PHAT'):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.span('flatten', ticker='PHAT'):
+            raise ValueError('bad facts')
+    metrics.count('facts', 1294, ticker='PHAT')
+    metrics.count('facts', 293, ticker='PHAT')
+    metrics.count('http_requests', host='data.sec.gov', ignored=None)
+
+    report = metrics.report()
+    assert report['run'] == 'test'
+    assert report['counters'] == [
+        {'name': 'facts', 'labels': {'ticker': 'PHAT'}, 'value': 1587},
+        {'name': 'http_requests', 'labels': {'host': 'data.sec.gov'}, 'value': 1},
+        {'name': 'stage_errors', 'labels': {'stage': 'flatten', 'ticker': 'PHAT'}, 'value': 1}]
+    (histogram,) = report['histograms']
+    # Both calls are timed, the failed one included
+    assert (histogram['name'], histogram['labels'], histogram['count']) == (
+        sec_metrics.STAGE_SECONDS, {'stage': 'flatten', 'ticker': 'PHAT'}, 2)
+    assert sec_metrics.stage_rows(report)[0]['calls'] == 2
+
+
+def test_prometheus_text_format():
+    metrics = Metrics()
+    metrics.count('facts', 3, ticker='PH"AT')
+    metrics.count('cache_hits', 0.5)
+    histogram = Histogram(bounds=(0.1, 1.0))
+    for value in (0.05, 0.5, 3.0):
+        histogram.observe(value)
+    metrics.histograms[('http_seconds', (('host', 'data.sec.gov'),))] = histogram
+
+    assert metrics.to_prometheus().splitlines() == [
+        '# TYPE sec_cache_hits_total counter',
+        'sec_cache_hits_total 0.5',
+        '# TYPE sec_facts_total counter',
+        'sec_facts_total{ticker="PH\\"AT"} 3',
+        '# TYPE sec_http_seconds histogram',
+        'sec_http_seconds_bucket{host="data.sec.gov",le="0.1"} 1',
+        'sec_http_seconds_bucket{host="data.sec.gov",le="1.0"} 2',
+        'sec_http_seconds_bucket{host="data.sec.gov",le="+Inf"} 3',
+        'sec_http_seconds_sum{host="data.sec.gov"} 3.55',
+        'sec_http_seconds_count{host="data.sec.gov"} 3',
+    ]
+
+
+def test_run_registry_is_per_thread_and_task():
+    def _run():
+        metrics = sec_metrics.start_run('pipeline')
+        sec_metrics.count('filings_extracted')
+
+        async def _download():
+            # Tasks and to_thread calls of the run record into its registry
+            await asyncio.to_thread(sec_metrics.count, 'filings_downloaded')
+            await asyncio.gather(asyncio.to_thread(sec_metrics.count, 'filings_downloaded'))
+
+            async def _monitor():
+                # A monitor started from here gets its own registry without replacing the run's
+                sec_metrics.start_run('monitor')
+                sec_metrics.count('monitor_filings')
+                return sec_metrics.get_metrics()
+
+            monitor = await asyncio.create_task(_monitor())
+            sec_metrics.count('filings_downloaded')
+            return monitor
+
+        results.update(pipeline=metrics, monitor=asyncio.run(_download()))
+
+    results = {}
+    before = sec_metrics.get_metrics()
+    thread = threading.Thread(target=_run)
+    thread.start()
+    # Another session's thread meanwhile records into its own registry
+    sec_metrics.count('filings_extracted', session='other')
+    thread.join()
+
+    def _counters(metrics):
+        return {(c['name'], tuple(c['labels'].items())): c['value'] for c in metrics.report()['counters']}
+
+    assert _counters(results['pipeline']) == {('filings_extracted', ()): 1, ('filings_downloaded', ()): 3}
+    assert _counters(results['monitor']) == {('monitor_filings', ()): 1}
+    assert sec_metrics.get_metrics() is before
+    assert _counters(before)[('filings_extracted', (('session', 'other'),))] >= 1
@@ -0,0 +1,61 @@
+import asyncio
+import os
+
+import pytest
+
+from conftest import ROOT
+from sec_client import SECClient
+from sec_monitor import RecordedFeed, SECMonitor
+
+FEED = os.path.join(ROOT, 'Input_Data', 'monitor_feed_PHAT.jsonl')
+ACCESSIONS = ['000095017024056888', '000095017024073628', '000095017024093885', '000095017024123264']
+
+
+def run_monitor(base_dir, **kwargs):
+    """Replay the recorded PHAT feed offline: every filing is already on disk, so nothing is fetched."""
+    async def _run():
+        results = []
+        async with SECClient() as client:
+            monitor = SECMonitor(tickers=['PHAT'], base_dir=base_dir, client=client, on_result=results.append,
+                                 **kwargs)
+            stats = await asyncio.wait_for(monitor.run(RecordedFeed(FEED)), timeout=300)
+        return stats, results
+    return asyncio.run(_run())
+
+
+def test_replay_recorded_feed(base_dir):
+    stats, results = run_monitor(base_dir, batch_size=2, batch_wait=0.1)
+
+    assert stats['processed'] == 4
+    assert stats['duplicates'] == 1
+    assert stats['failed'] == 0
+    assert [r.event.accession for r in results] == ACCESSIONS
+    monitor_dir = os.path.join(base_dir, 'PHAT', 'monitor')
+    for accession in ACCESSIONS:
+        assert os.path.exists(os.path.join(monitor_dir, f'{accession}.json'))
+    # The 10-Q/A is compared with the 10-Q it amends, later 10-Qs with the previous 10-Q
+    previous = {r.event.accession: r.previous_path and os.path.basename(r.previous_path)[:18] for r in results}
+    assert previous == {ACCESSIONS[0]: None, ACCESSIONS[1]: ACCESSIONS[0], ACCESSIONS[2]: ACCESSIONS[0],
+                        ACCESSIONS[3]: ACCESSIONS[2]}
+
+
+def test_failing_batch_does_not_hang(base_dir, monkeypatch):
+    def _analyse(self, results):
+        raise RuntimeError("extraction crashed")
+
+    monkeypatch.setattr(SECMonitor, '_analyse', _analyse)
+    stats, results = run_monitor(base_dir, queue_size=1, batch_size=1, batch_wait=0)
+
+    assert stats['processed'] == 0
+    assert stats['failed'] == 4
+    assert all('extraction crashed' in r.error for r in results)
+    assert not os.path.exists(os.path.join(base_dir, 'PHAT', 'monitor'))
+
+
+def test_stopped_consumer_raises_instead_of_hanging(base_dir, monkeypatch):
+    async def _consume(self):
+        raise RuntimeError("consumer crashed")
+
+    monkeypatch.setattr(SECMonitor, '_consume', _consume)
+    with pytest.raises(RuntimeError, match="consumer crashed"):
+        run_monitor(base_dir, queue_size=1)
@@ -0,0 +1,35 @@
+import sqlite3
+
+import pytest
+
+from sec_search import SearchIndex
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / 'search_index.sqlite'))
+    index.add_document(str(tmp_path / 'filing.htm'), 'PHAT', '000095017024056888', '2024-05-09',
+                       'Enrollment in the PF-07081532 trial continued. See the risk-factors discussion below.')
+    index.add_document(str(tmp_path / 'other.htm'), 'PHAT', '000095017024093885', '2024-08-08',
+                       'Vonoprazan risk factors are described in Part II.')
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize('query, accessions', [
+    ('PF-07081532', ['000095017024056888']),
+    ('risk-factors', ['000095017024056888', '000095017024093885']),  # the phrase "risk factors"
+    ('"unterminated', []),
+    ('NEAR(', []),
+    ('risk factors', ['000095017024056888', '000095017024093885']),
+    ('vonoprazan OR enrollment', ['000095017024056888', '000095017024093885']),
+])
+def test_free_text_queries(index, query, accessions):
+    for snippets in (True, False):
+        assert sorted(index.search(query, snippets=snippets)['accession_number']) == accessions
+
+
+def test_other_errors_are_raised(index):
+    index.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        index.search('PF-07081532')
@@ -0,0 +1,48 @@
+import os
+from glob import glob
+
+import pytest
+
+from sec_loader import extract_text_from_html
+from sec_sections import detect_form, index_path, load_index, parse_sections, save_index
+
+ITEMS = ['financial_statements', 'mda', 'market_risk', 'controls', 'legal_proceedings', 'risk_factors',
+         'unregistered_sales', 'defaults', 'mine_safety', 'other_information', 'exhibits']
+# Accession -> form; the 10-Q/A only restates the financial statements and files exhibits
+FILINGS = {'000095017024056888': '10-Q', '000095017024073628': '10-Q/A', '000095017024093885': '10-Q',
+           '000095017024123264': '10-Q'}
+
+
+def filing_path(base_dir, accession):
+    (path,) = glob(os.path.join(base_dir, 'PHAT', 'filings', f'{accession}_*.htm'))
+    return path
+
+
+@pytest.mark.parametrize('accession', sorted(FILINGS))
+def test_phat_sections(base_dir, accession):
+    text = extract_text_from_html(filing_path(base_dir, accession))
+    index = parse_sections(text)
+
+    assert detect_form(text) == FILINGS[accession] == index.form
+    expected = ['financial_statements', 'exhibits'] if index.form == '10-Q/A' else ITEMS
+    assert index.names() == expected
+    # Sections are ordered, disjoint and end where the next one starts
+    for section, following in zip(index.sections, index.sections[1:]):
+        assert 0 <= section.start < section.end == following.start
+    assert index.sections[-1].end == index.text_length == len(text)
+    assert index.slice(text, 'financial_statements').lower().startswith('item 1')
+
+
+def test_sections_json_round_trip(base_dir):
+    path = filing_path(base_dir, '000095017024093885')
+    os.remove(index_path(path))
+    assert load_index(path) is None
+
+    index = parse_sections(extract_text_from_html(path))
+    save_index(path, index)
+    assert load_index(path) == index
+
+    # A changed filing invalidates its index
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('\n')
+    assert load_index(path) is None
@@ -0,0 +1,60 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import PHAT_CIK, PHAT_DIR, ROOT
+from nlp_functions import flatten_json_data, split_by_units
+from sec_storage import CATEGORICAL_COLUMNS, FACT_COLUMNS, ParquetFactStore, get_fact_store
+
+CONCEPTS = ['NetIncomeLoss', 'StockholdersEquity']
+DTYPES = {'Value': 'float64', 'Start': 'datetime64[ns]', 'End': 'datetime64[ns]', 'Fiscal Year': 'int64',
+          'Filed Date': 'datetime64[ns]'}
+
+
+@pytest.fixture(scope='module')
+def facts():
+    """The PHAT companyfacts as process_sec_data stores them, also under a second ticker."""
+    with open(os.path.join(PHAT_DIR, 'company_concepts', f'CIK{PHAT_CIK}.json')) as f:
+        df = flatten_json_data(json.load(f))
+    return {ticker: df.assign(Ticker=ticker) for ticker in ('PHAT', 'COPY')}
+
+
+def comparable(df):
+    df = df.astype({col: object for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)})
+    df = df.sort_values(['Ticker', 'Concept', 'Unit', 'Accession', 'End', 'Start', 'Frame'], na_position='first')
+    return df.reset_index(drop=True).fillna({'Frame': ''})
+
+
+@pytest.mark.parametrize('backend', ['csv', 'parquet'])
+def test_round_trip(tmp_path, backend, facts):
+    store = get_fact_store(str(tmp_path), backend)
+    for ticker, df in facts.items():
+        store.write_ticker(ticker, df, split_by_units(df))
+    store.write_combined(pd.concat(facts.values(), ignore_index=True))
+
+    df = store.read_facts(['PHAT'], CONCEPTS, '2022-01-01', '2024-06-30')
+    expected = facts['PHAT']
+    expected = expected[expected['Concept'].isin(CONCEPTS) & expected['Filed Date'].between('2022-01-01', '2024-06-30')]
+    assert 0 < len(df) < len(facts['PHAT'])
+    assert list(df.columns) == FACT_COLUMNS
+    assert {col: str(df[col].dtype) for col in DTYPES} == DTYPES
+    # The Parquet dictionary columns come back as categoricals
+    categoricals = [col for col in df.columns if isinstance(df[col].dtype, pd.CategoricalDtype)]
+    assert categoricals == (CATEGORICAL_COLUMNS if backend == 'parquet' else [])
+    pd.testing.assert_frame_equal(comparable(df), comparable(expected))
+
+    batches = list(store.iter_facts(batch_size=1000, tickers=['COPY']))
+    assert max(len(batch) for batch in batches) <= 1000
+    assert all(list(batch.columns) == FACT_COLUMNS for batch in batches)
+    pd.testing.assert_frame_equal(comparable(pd.concat(batches)), comparable(facts['COPY']))
+
+
+def test_sample_parquet_matches_csv(facts_base_dir):
+    # sec_data/facts is committed so the bundled sample opens with the default backend, it has to
+    # be what `python sec_storage.py convert` makes of sec_data_all_tickers.csv
+    converted = ParquetFactStore(facts_base_dir).read_facts()
+    assert len(converted) == 1587
+    pd.testing.assert_frame_equal(comparable(ParquetFactStore(os.path.join(ROOT, 'sec_data')).read_facts()),
+                                  comparable(converted))
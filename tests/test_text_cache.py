@@ -0,0 +1,68 @@
+import itertools
+import os
+import shutil
+import sys
+
+import text_cache
+from conftest import PHAT_DIR
+from text_cache import TextCache
+
+FILING = '000095017024093885_2024-08-08.htm'
+
+
+def test_hit_touch_change_and_version(tmp_path, monkeypatch):
+    path = str(tmp_path / FILING)
+    shutil.copy(os.path.join(PHAT_DIR, 'filings', FILING), path)
+    cache = TextCache(str(tmp_path / 'text_cache.sqlite'))
+
+    assert cache.get(path) is None
+    cache.put(path, 'Quarterly report')
+    assert cache.get(path) == 'Quarterly report'
+
+    # A new mtime with the same content is re-hashed and still hits
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.get(path) == 'Quarterly report'
+
+    # New extractor output invalidates every entry
+    monkeypatch.setattr(text_cache, 'EXTRACTOR_VERSION', text_cache.EXTRACTOR_VERSION + 1)
+    assert cache.get(path) is None
+    monkeypatch.undo()
+
+    with open(path, 'ab') as f:
+        f.write(b'<p>Amended</p>')
+    assert cache.get(path) is None
+    assert (cache.hits, cache.misses) == (2, 3)
+    cache.close()
+
+
+def test_prune_deleted_files_and_size(tmp_path, monkeypatch, capsys):
+    clock = itertools.count(1)
+    monkeypatch.setattr(text_cache.time, 'time', lambda: next(clock))
+    cache_path = str(tmp_path / 'text_cache.sqlite')
+    cache = TextCache(cache_path)
+    paths = []
+    for name in sorted(os.listdir(os.path.join(PHAT_DIR, 'filings'))):
+        if name.endswith('.htm'):
+            paths.append(str(tmp_path / name))
+            shutil.copy(os.path.join(PHAT_DIR, 'filings', name), paths[-1])
+            # Random hex compresses to about half: 0.3 MB each
+            cache.put(paths[-1], os.urandom(300 * 1024).hex())
+
+    os.remove(paths[0])
+    assert cache.prune() == {'files': 1, 'texts': 1}
+    assert cache.stats()['texts'] == 3
+
+    # The least recently used text goes first
+    for path in (paths[2], paths[1], paths[3]):
+        assert cache.get(path) is not None
+    cache.close()
+    monkeypatch.setattr(sys, 'argv', ['text_cache.py', '--path', cache_path, 'prune', '--max-mb', '0.7'])
+    text_cache.main()
+    assert 'Removed 1 file entries and 1 texts.' in capsys.readouterr().out
+
+    cache = TextCache(cache_path)
+    assert cache.get(paths[2]) is None
+    assert cache.get(paths[1]) is not None and cache.get(paths[3]) is not None
+    assert cache.stats()['stored_bytes'] <= 0.7 * 1024 ** 2
+    cache.close()
@@ -0,0 +1,36 @@
+import html
+import os
+import re
+
+import pytest
+
+import text_stream
+from conftest import PHAT_DIR
+from sec_loader import extract_text_from_html
+
+FILINGS = sorted(name for name in os.listdir(os.path.join(PHAT_DIR, 'filings')) if name.endswith('.htm'))
+
+
+@pytest.fixture(scope='module')
+def dom_texts():
+    return {name: extract_text_from_html(os.path.join(PHAT_DIR, 'filings', name), streaming=False)
+            for name in FILINGS}
+
+
+@pytest.mark.parametrize('name', FILINGS)
+def test_streaming_matches_dom(name, dom_texts):
+    assert extract_text_from_html(os.path.join(PHAT_DIR, 'filings', name), streaming=True) == dom_texts[name]
+
+
+@pytest.mark.parametrize('chunk_size', [13, 256, 4093])
+def test_small_chunks_split_words_and_characters(tmp_path, chunk_size, dom_texts):
+    for name in FILINGS:
+        # The filings are ASCII with entities; written out, the non-ASCII characters take two or
+        # three bytes in UTF-8 and chunk boundaries fall inside some of them
+        with open(os.path.join(PHAT_DIR, 'filings', name), encoding='utf-8') as f:
+            content = re.sub(r'&#(\d+);', lambda m: html.unescape(m[0]) if int(m[1]) > 127 else m[0], f.read())
+        path = tmp_path / name
+        path.write_text(content, encoding='utf-8')
+        assert os.path.getsize(path) > len(content)
+
+        assert text_stream.extract_text(str(path), chunk_size) == dom_texts[name]
@@ -0,0 +1,21 @@
+from decimal import Decimal
+
+import pytest
+
+from sec_xbrl import parse_number
+
+
+@pytest.mark.parametrize('text, value', [
+    ('no', 0), ('None', 0), ('three', 3), ('eleven', 11), ('twenty-one', 21), ('one hundred', 100),
+    ('two hundred', 200), ('a hundred', 100), ('one hundred and five', 105), ('two hundred fifty-one', 251),
+    ('two thousand', 2000), ('forty five thousand six hundred seventy eight', 45678),
+    ('one million two hundred thousand', 1200000),
+])
+def test_number_words(text, value):
+    assert parse_number(text, 'ixt-sec:numwordsen') == Decimal(value)
+
+
+@pytest.mark.parametrize('text', ['two three', 'twenty thirty', 'twelve hundred', 'one thousand one million',
+                                  'several'])
+def test_number_words_rejects_malformed_quantities(text):
+    assert parse_number(text, 'ixt-sec:numwordsen') is None
@@ -0,0 +1,194 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Optional
+
+from config import CONFIG  # Import the config dictionary
+
+# Bump when extract_text_from_html changes its output so old entries are ignored
+EXTRACTOR_VERSION = 1
+
+
+def default_cache_path() -> str:
+    return os.path.join(CONFIG['BASE_DIR'], '.cache', 'text_cache.sqlite')
+
+
+def file_sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TextCache:
+    """Persistent cache of cleaned filing text, stored zlib-compressed in one SQLite file.
+
+    `files` maps a path to the size, mtime and SHA-256 it had when last seen; `texts` holds the
+    extracted text per content hash. A path whose size and mtime are unchanged is a hit without
+    reading the file; otherwise the file is re-hashed, so touched-but-identical or copied
+    filings still hit, and changed ones miss and are re-extracted.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_cache_path()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                sha256 TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS texts (
+                sha256 TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                text BLOB NOT NULL,
+                raw_size INTEGER NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (sha256, version)
+            );
+        """)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _text_for(self, sha256: str) -> Optional[str]:
+        row = self._conn.execute('SELECT text FROM texts WHERE sha256 = ? AND version = ?',
+                                 (sha256, EXTRACTOR_VERSION)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute('UPDATE texts SET last_access = ? WHERE sha256 = ? AND version = ?',
+                           (time.time(), sha256, EXTRACTOR_VERSION))
+        return zlib.decompress(row[0]).decode('utf-8')
+
+    def get(self, file_path: str) -> Optional[str]:
+        """Cached text for `file_path`, or None if the file is new or changed since it was cached."""
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        with self._lock:
+            row = self._conn.execute('SELECT size, mtime_ns, sha256 FROM files WHERE path = ?', (key,)).fetchone()
+            if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                text = self._text_for(row[2])
+                if text is not None:
+                    self.hits += 1
+                    self._conn.commit()
+                    return text
+
+        # Stat changed (or unknown path): the content may still be known under its hash
+        sha256 = file_sha256(file_path)
+        with self._lock:
+            text = self._text_for(sha256)
+            if text is None:
+                self.misses += 1
+                return None
+            self._conn.execute('INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)',
+                               (key, stat.st_size, stat.st_mtime_ns, sha256))
+            self._conn.commit()
+            self.hits += 1
+            return text
+
+    def put(self, file_path: str, text: str) -> None:
+        key = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        sha256 = file_sha256(file_path)
+        raw = text.encode('utf-8')
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO files (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)',
+                               (key, stat.st_size, stat.st_mtime_ns, sha256))
+            self._conn.execute('INSERT OR REPLACE INTO texts (sha256, version, text, raw_size, last_access) '
+                               'VALUES (?, ?, ?, ?, ?)',
+                               (sha256, EXTRACTOR_VERSION, zlib.compress(raw, 6), len(raw), time.time()))
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            files = self._conn.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+            texts, stored, raw = self._conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(LENGTH(text)), 0), COALESCE(SUM(raw_size), 0) FROM texts').fetchone()
+        return {'files': files, 'texts': texts, 'stored_bytes': stored, 'raw_bytes': raw,
+                'db_bytes': os.path.getsize(self.path)}
+
+    def prune(self, max_bytes: Optional[int] = None, max_age_days: Optional[float] = None) -> dict:
+        """Drop entries for deleted or changed files, unreferenced or outdated texts, texts unused
+        for `max_age_days`, then least recently used texts until the store fits in `max_bytes`."""
+        removed = {'files': 0, 'texts': 0}
+        with self._lock:
+            for path, size, mtime_ns in self._conn.execute('SELECT path, size, mtime_ns FROM files').fetchall():
+                try:
+                    stat = os.stat(path)
+                    stale = stat.st_size != size or stat.st_mtime_ns != mtime_ns
+                except FileNotFoundError:
+                    stale = True
+                if stale:
+                    self._conn.execute('DELETE FROM files WHERE path = ?', (path,))
+                    removed['files'] += 1
+
+            cursor = self._conn.execute('DELETE FROM texts WHERE version != ? OR sha256 NOT IN '
+                                        '(SELECT sha256 FROM files)', (EXTRACTOR_VERSION,))
+            removed['texts'] += cursor.rowcount
+            if max_age_days is not None:
+                cursor = self._conn.execute('DELETE FROM texts WHERE last_access < ?',
+                                            (time.time() - max_age_days * 86400,))
+                removed['texts'] += cursor.rowcount
+            if max_bytes is not None:
+                total = 0
+                rows = self._conn.execute('SELECT sha256, version, LENGTH(text) FROM texts '
+                                          'ORDER BY last_access DESC').fetchall()
+                for sha256, version, size in rows:
+                    total += size
+                    if total > max_bytes:
+                        self._conn.execute('DELETE FROM texts WHERE sha256 = ? AND version = ?', (sha256, version))
+                        removed['texts'] += 1
+            # Paths whose text was evicted would only cost a lookup, drop them too
+            cursor = self._conn.execute('DELETE FROM files WHERE sha256 NOT IN (SELECT sha256 FROM texts)')
+            removed['files'] += cursor.rowcount
+            self._conn.commit()
+            self._conn.execute('VACUUM')
+        return removed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute('DELETE FROM files')
+            self._conn.execute('DELETE FROM texts')
+            self._conn.commit()
+            self._conn.execute('VACUUM')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or prune the extracted filing text cache.")
+    parser.add_argument('--path', help="cache file (default: BASE_DIR/.cache/text_cache.sqlite)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="show entry counts and sizes")
+    prune = commands.add_parser('prune', help="remove stale, old or excess entries")
+    prune.add_argument('--max-mb', type=float, help="keep at most this many MB of compressed text")
+    prune.add_argument('--max-age-days', type=float, help="drop texts not used for this many days")
+    commands.add_parser('clear', help="remove every entry")
+    args = parser.parse_args()
+
+    cache = TextCache(args.path)
+    if args.command == 'prune':
+        max_bytes = int(args.max_mb * 1024 ** 2) if args.max_mb is not None else None
+        removed = cache.prune(max_bytes=max_bytes, max_age_days=args.max_age_days)
+        print(f"Removed {removed['files']} file entries and {removed['texts']} texts.")
+    elif args.command == 'clear':
+        cache.clear()
+        print("Text cache cleared.")
+    stats = cache.stats()
+    print(f"{stats['files']} files, {stats['texts']} texts, {stats['stored_bytes'] / 1024 ** 2:.1f} MB compressed "
+          f"({stats['raw_bytes'] / 1024 ** 2:.1f} MB raw), database {stats['db_bytes'] / 1024 ** 2:.1f} MB")
+    cache.close()
+
+
+# python text_cache.py stats | prune [--max-mb N] [--max-age-days D] | clear
+if __name__ == '__main__':
+    main()
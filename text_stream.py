@@ -0,0 +1,106 @@
+import codecs
+from html.parser import HTMLParser
+from typing import Iterator, List, Optional, TextIO
+
+# Bytes read (and decoded) per step; memory use is about this much plus the longest word
+CHUNK_SIZE = 256 * 1024
+
+# Elements whose content is not filing text (the head, with its <title>, included)
+SKIPPED_ELEMENTS = {'script', 'style', 'head', 'title'}
+
+
+class _TextCollector(HTMLParser):
+    """Collects the whitespace-normalised text of the elements fed so far.
+
+    Text nodes are separated by one space and runs of whitespace inside them collapse to one,
+    which is what `' '.join(tree.body.text(separator='\\n').split())` makes of the selectolax
+    tree. A word cut by a chunk boundary is held back until the rest of it arrives.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.skipped: List[str] = []
+        self.pieces: List[str] = []
+        self.partial = ''
+        self.started = False  # whether a word was emitted yet, i.e. the next one needs a space
+
+    def _emit(self, words: List[str]) -> None:
+        if words:
+            if self.started:
+                self.pieces.append(' ')
+            self.pieces.append(' '.join(words))
+            self.started = True
+
+    def end_node(self) -> None:
+        if self.partial:
+            self._emit([self.partial])
+            self.partial = ''
+
+    def handle_data(self, data: str) -> None:
+        if self.skipped:
+            return
+        data = self.partial + data
+        words = data.split()
+        # Keep the last word back unless whitespace ends the data; the node may continue in the next chunk
+        self.partial = words.pop() if words and not data[-1].isspace() else ''
+        self._emit(words)
+
+    def handle_starttag(self, tag, attrs) -> None:
+        self.end_node()
+        if tag == 'body':
+            self.skipped = [t for t in self.skipped if t != 'head']
+        if tag in SKIPPED_ELEMENTS:
+            self.skipped.append(tag)
+
+    def handle_startendtag(self, tag, attrs) -> None:
+        self.end_node()
+
+    def handle_endtag(self, tag) -> None:
+        self.end_node()
+        if tag in self.skipped:
+            # Also closes elements left open inside it
+            del self.skipped[len(self.skipped) - 1 - self.skipped[::-1].index(tag):]
+
+    def handle_comment(self, data) -> None:
+        self.end_node()
+
+    def take(self) -> str:
+        text = ''.join(self.pieces)
+        self.pieces = []
+        return text
+
+
+def iter_text(file_path: str, chunk_size: int = CHUNK_SIZE, encoding: str = 'utf-8') -> Iterator[str]:
+    """Yield the clean text of an HTML filing piece by piece, reading `chunk_size` bytes at a time.
+
+    No DOM is built and nothing file-sized is held, so memory stays flat however large the filing
+    is. Joining the pieces gives the same text as sec_loader's selectolax extraction for EDGAR
+    filings; unusual markup (text outside <body>, unclosed <head>) can differ slightly.
+    """
+    collector = _TextCollector()
+    decoder = codecs.getincrementaldecoder(encoding)()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            collector.feed(decoder.decode(chunk))
+            text = collector.take()
+            if text:
+                yield text
+    collector.feed(decoder.decode(b'', final=True))
+    collector.close()
+    collector.end_node()
+    text = collector.take()
+    if text:
+        yield text
+
+
+def write_text(file_path: str, sink: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Write the clean text of an HTML filing to `sink` (anything with .write) and return its length."""
+    written = 0
+    for piece in iter_text(file_path, chunk_size):
+        written += sink.write(piece) or 0
+    return written
+
+
+def extract_text(file_path: str, chunk_size: Optional[int] = None) -> str:
+    """The whole clean text as one string; only the text itself, never the HTML or a DOM, is held at full size."""
+    return ''.join(iter_text(file_path, chunk_size or CHUNK_SIZE))